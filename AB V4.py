@@ -6,7 +6,13 @@ import json
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, scrolledtext
 
+from autobackup.index import FileIndex
+from autobackup.logsink import LogSink
+
 SETTINGS_FILE = "settings.json"
+LOG_FILE = "backup.log"
+LOG_MAX_LINES = 1000
+LOG_FLUSH_MS = 200
 
 class BackupApp(tk.Tk):
     def __init__(self):
@@ -26,10 +32,13 @@ class BackupApp(tk.Tk):
 
         self.live_event = tk.BooleanVar(value=False)
         self.seconds_until_backup = self.interval.get()
+        self.log_sink = LogSink(LOG_FILE, max_lines=LOG_MAX_LINES)
 
         self.load_settings()
 
         self.create_widgets()
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.after(LOG_FLUSH_MS, self.flush_log)
 
         # Style anpassen (optional, wenn ttk Themes verfügbar)
         style = ttk.Style(self)
@@ -96,10 +105,27 @@ class BackupApp(tk.Tk):
             self.save_settings()
 
     def log(self, msg):
-        self.log_area.config(state='normal')
-        self.log_area.insert(tk.END, f"{time.strftime('%Y-%m-%d %H:%M:%S')} - {msg}\n")
-        self.log_area.see(tk.END)
-        self.log_area.config(state='disabled')
+        # Aus dem Backup-Thread nur in den Puffer schreiben, die GUI holt gebündelt ab
+        self.log_sink.emit(msg)
+
+    def flush_log(self):
+        records = self.log_sink.drain()
+        if records:
+            text = "".join(f"{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(created))} - {msg}\n"
+                           for created, msg in records)
+            self.log_area.config(state='normal')
+            self.log_area.insert(tk.END, text)
+            lines = int(self.log_area.index("end-1c").split(".")[0])
+            if lines > LOG_MAX_LINES:
+                self.log_area.delete("1.0", f"{lines - LOG_MAX_LINES + 1}.0")
+            self.log_area.see(tk.END)
+            self.log_area.config(state='disabled')
+        self.after(LOG_FLUSH_MS, self.flush_log)
+
+    def on_close(self):
+        self.is_running = False
+        self.log_sink.close()
+        self.destroy()
 
     def start_backup(self):
         if not os.path.isdir(self.source_dir.get()):
@@ -149,31 +175,39 @@ class BackupApp(tk.Tk):
         filter_list = [ft.strip().lower() for ft in self.filter_types.get().split(",") if ft.strip()]
         count = 0
 
-        for foldername, subfolders, filenames in os.walk(source):
-            backup_folder = foldername.replace(source, backup)
-            if not os.path.exists(backup_folder):
-                try:
-                    os.makedirs(backup_folder)
-                except Exception as e:
-                    self.log(f"Fehler beim Erstellen von Ordner {backup_folder}: {e}")
-                    continue
-
-            for filename in filenames:
-                ext = os.path.splitext(filename)[1].lower()
-                if filter_list and ext not in filter_list:
-                    continue  # Datei nicht sichern, wenn Filter gesetzt
-
-                source_file = os.path.join(foldername, filename)
-                backup_file = os.path.join(backup_folder, filename)
-
-                try:
-                    if (not os.path.exists(backup_file)) or \
-                        (os.path.getmtime(source_file) > os.path.getmtime(backup_file)):
+        # Änderungs-Index statt zwei getmtime-Aufrufen pro Datei
+        index = FileIndex(backup)
+        try:
+            for foldername, subfolders, filenames in os.walk(source):
+                rel_folder = os.path.relpath(foldername, source)
+                backup_folder = os.path.normpath(os.path.join(backup, rel_folder))
+                folder_ready = os.path.isdir(backup_folder)
+
+                for filename in filenames:
+                    ext = os.path.splitext(filename)[1].lower()
+                    if filter_list and ext not in filter_list:
+                        continue  # Datei nicht sichern, wenn Filter gesetzt
+
+                    source_file = os.path.join(foldername, filename)
+                    rel_path = os.path.normpath(os.path.join(rel_folder, filename))
+                    backup_file = os.path.join(backup_folder, filename)
+
+                    try:
+                        st = os.stat(source_file)
+                        if not index.is_changed(rel_path, st):
+                            continue
+                        if not folder_ready:
+                            os.makedirs(backup_folder, exist_ok=True)
+                            folder_ready = True
                         shutil.copy2(source_file, backup_file)
+                        index.record(rel_path, st)
                         count += 1
                         self.log(f"Datei gesichert: {source_file}")
-                except Exception as e:
-                    self.log(f"Fehler beim Kopieren von {source_file}: {e}")
+                    except Exception as e:
+                        self.log(f"Fehler beim Kopieren von {source_file}: {e}")
+            index.commit(prune=True)
+        finally:
+            index.close()
 
         self.log(f"Backup-Durchlauf abgeschlossen. {count} Datei(en) gesichert.")
 
@@ -1,13 +1,18 @@
 import os
-import shutil
 import time
 import threading
-import json
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 from tkinter.scrolledtext import ScrolledText
 
+from autobackup.config import BackupConfig
+from autobackup.engine import BackupEngine
+from autobackup.logsink import LogSink
+
 SETTINGS_FILE = "settings.json"
+LOG_FILE = "backup.log"
+LOG_MAX_LINES = 1000  # sichtbare Zeilen im Log-Fenster
+LOG_FLUSH_MS = 200
 
 # Tooltip-Klasse für Info-Hinweise bei Hover
 class ToolTip:
@@ -52,18 +57,23 @@ class BackupApp(tk.Tk):
         self.source_dir = tk.StringVar()
         self.backup_dir = tk.StringVar()
         self.filter_types = tk.StringVar()
+        self.exclude_patterns = tk.StringVar()
         self.interval = tk.IntVar(value=60)
         self.is_running = False
         self.thread = None
         self.live_event = tk.BooleanVar(value=False)
         self.seconds_until_backup = self.interval.get()
-        self.last_backup_time = None
-        self.last_backup_count = 0
+        self.settings = BackupConfig()  # alle Einstellungen, auch die ohne eigenes Eingabefeld
+        self.engine = None
+        self.pending_status = None
+        self.log_sink = LogSink(LOG_FILE, max_lines=LOG_MAX_LINES)
 
         self.load_settings()
         self.create_styles()
         self.create_widgets()
         self.validate_all()
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.after(LOG_FLUSH_MS, self.flush_log)
 
     def create_styles(self):
         style = ttk.Style(self)
@@ -114,19 +124,25 @@ class BackupApp(tk.Tk):
         self.filter_entry = ttk.Entry(frame, textvariable=self.filter_types, width=60)
         self.filter_entry.grid(row=2, column=1, sticky="ew", padx=(0, 8))
         ToolTip(self.filter_entry, "Nur diese Dateitypen werden gesichert (leer = alle).")
-        
+
+        # Ausschluss-Muster
+        ttk.Label(frame, text="Ausschließen (z.B. node_modules,.git,*.tmp):").grid(row=3, column=0, sticky="w", pady=(pad_y, 0))
+        self.exclude_entry = ttk.Entry(frame, textvariable=self.exclude_patterns, width=60)
+        self.exclude_entry.grid(row=3, column=1, sticky="ew", padx=(0, 8), pady=(pad_y, 0))
+        ToolTip(self.exclude_entry, "Ordner und Dateien, die auf diese Muster passen, werden übersprungen.")
+
         # Intervall
-        ttk.Label(frame, text="Backup-Intervall (Sekunden):").grid(row=3, column=0, sticky="w", pady=pad_y)
+        ttk.Label(frame, text="Backup-Intervall (Sekunden):").grid(row=4, column=0, sticky="w", pady=pad_y)
         self.interval_spin = ttk.Spinbox(frame, from_=10, to=3600, textvariable=self.interval, width=10, command=self.reset_countdown)
-        self.interval_spin.grid(row=3, column=1, sticky="w", padx=(0, 8), pady=pad_y)
+        self.interval_spin.grid(row=4, column=1, sticky="w", padx=(0, 8), pady=pad_y)
         ToolTip(self.interval_spin, "Intervall in Sekunden zwischen Backups.")
 
         # Live Event Checkbox + Countdown
         self.live_check = ttk.Checkbutton(frame, text="Live-Countdown anzeigen", variable=self.live_event, command=self.toggle_live_event)
-        self.live_check.grid(row=4, column=0, columnspan=2, sticky="w", pady=(0, 20))
+        self.live_check.grid(row=5, column=0, columnspan=2, sticky="w", pady=(0, 20))
 
         self.countdown_label = ttk.Label(frame, text="", font=("Segoe UI", 12, "bold"), foreground="#88c0d0")
-        self.countdown_label.grid(row=4, column=2, sticky="e")
+        self.countdown_label.grid(row=5, column=2, sticky="e")
 
         frame.columnconfigure(1, weight=1)
 
@@ -205,15 +221,17 @@ class BackupApp(tk.Tk):
 
     def reset_countdown(self):
         self.seconds_until_backup = self.interval.get()
+        if self.engine is not None:
+            # Neues Intervall gilt ab dem nächsten Durchlauf, ohne den Backup-Thread Tk lesen zu lassen
+            self.engine.config.interval = self.interval.get()
 
     def update_countdown(self):
         if not self.live_event.get():
             self.countdown_label.config(text="")
             return
         if self.is_running:
-            self.seconds_until_backup -= 1
-            if self.seconds_until_backup < 0:
-                self.seconds_until_backup = self.interval.get()
+            if self.engine is not None and self.engine.next_backup_at is not None:
+                self.seconds_until_backup = max(0, round(self.engine.next_backup_at - time.monotonic()))
             self.countdown_label.config(text=f"Nächstes Backup in {self.seconds_until_backup} Sek.")
             self.after(1000, self.update_countdown)
         else:
@@ -230,85 +248,81 @@ class BackupApp(tk.Tk):
         self.stop_btn.config(state="normal")
         self.status_var.set("Backup läuft...")
         self.log("🔄 Backup gestartet.")
-        self.thread = threading.Thread(target=self.run_backup_loop, daemon=True)
+        # Die Engine bekommt eine Kopie der Einstellungen und liest nie Tk-Variablen
+        self.save_settings()
+        self.engine = BackupEngine(self.settings.copy(), log=self.log, status=self.set_status)
+        self.thread = threading.Thread(target=self.engine.run_loop, daemon=True)
         self.thread.start()
         if self.live_event.get():
             self.update_countdown()
 
     def stop_backup(self):
         self.is_running = False
+        if self.engine is not None:
+            self.engine.stop()
+            self.engine = None
         self.start_btn.config(state="normal")
         self.stop_btn.config(state="disabled")
         self.status_var.set("Backup gestoppt.")
         self.countdown_label.config(text="")
         self.log("⛔ Backup gestoppt.")
 
-    def run_backup_loop(self):
-        while self.is_running:
-            self.perform_backup()
-            self.last_backup_time = time.strftime("%d.%m.%Y %H:%M:%S")
-            self.seconds_until_backup = self.interval.get()
-            for _ in range(self.interval.get()):
-                if not self.is_running:
-                    break
-                time.sleep(1)
-
-    def perform_backup(self):
-        src = self.source_dir.get()
-        dst = self.backup_dir.get()
-        filetypes = [ftype.strip().lower() for ftype in self.filter_types.get().split(",") if ftype.strip()]
-        count = 0
-
-        for root, _, files in os.walk(src):
-            for file in files:
-                if filetypes and not any(file.lower().endswith(ft) for ft in filetypes):
-                    continue
-                src_file = os.path.join(root, file)
-                rel_path = os.path.relpath(src_file, src)
-                dst_file = os.path.join(dst, rel_path)
-
-                os.makedirs(os.path.dirname(dst_file), exist_ok=True)
-                try:
-                    shutil.copy2(src_file, dst_file)
-                    count += 1
-                except Exception as e:
-                    self.log(f"⚠ Fehler beim Kopieren von {src_file}: {e}")
-
-        self.last_backup_count = count
-        self.log(f"✅ Backup abgeschlossen. {count} Dateien kopiert.")
-        self.status_var.set(f"Letztes Backup: {self.last_backup_time} ({count} Dateien)")
+    def set_status(self, text):
+        # Aus dem Backup-Thread: wird von flush_log() im GUI-Thread übernommen
+        self.pending_status = text
 
     def log(self, message):
-        timestamp = time.strftime("[%H:%M:%S]")
-        self.log_area.config(state="normal")
-        self.log_area.insert("end", f"{timestamp} {message}\n")
-        self.log_area.see("end")
-        self.log_area.config(state="disabled")
+        # Thread-sicher: Meldungen werden gesammelt und von flush_log() gebündelt angezeigt
+        self.log_sink.emit(message)
+
+    def flush_log(self):
+        if self.pending_status is not None:
+            self.status_var.set(self.pending_status)
+            self.pending_status = None
+        records = self.log_sink.drain()
+        if records:
+            text = "".join(f"{time.strftime('[%H:%M:%S]', time.localtime(created))} {message}\n"
+                           for created, message in records)
+            self.log_area.config(state="normal")
+            self.log_area.insert("end", text)
+            # Nur die letzten LOG_MAX_LINES Zeilen behalten
+            lines = int(self.log_area.index("end-1c").split(".")[0])
+            if lines > LOG_MAX_LINES:
+                self.log_area.delete("1.0", f"{lines - LOG_MAX_LINES + 1}.0")
+            self.log_area.see("end")
+            self.log_area.config(state="disabled")
+        self.after(LOG_FLUSH_MS, self.flush_log)
+
+    def on_close(self):
+        self.is_running = False
+        if self.engine is not None:
+            self.engine.stop()
+        self.log_sink.close()
+        self.destroy()
 
     def save_settings(self):
-        settings = {
-            "source_dir": self.source_dir.get(),
-            "backup_dir": self.backup_dir.get(),
-            "filter_types": self.filter_types.get(),
-            "interval": self.interval.get(),
-            "live_event": self.live_event.get()
-        }
+        config = self.settings
+        config.source_dir = self.source_dir.get()
+        config.backup_dir = self.backup_dir.get()
+        config.filter_types = self.filter_types.get()
+        config.exclude_patterns = self.exclude_patterns.get()
+        config.interval = self.interval.get()
+        config.live_event = self.live_event.get()
         try:
-            with open(SETTINGS_FILE, "w") as f:
-                json.dump(settings, f)
+            config.save(SETTINGS_FILE)
         except Exception as e:
             self.log(f"⚠ Fehler beim Speichern der Einstellungen: {e}")
 
     def load_settings(self):
         if os.path.exists(SETTINGS_FILE):
             try:
-                with open(SETTINGS_FILE, "r") as f:
-                    settings = json.load(f)
-                    self.source_dir.set(settings.get("source_dir", ""))
-                    self.backup_dir.set(settings.get("backup_dir", ""))
-                    self.filter_types.set(settings.get("filter_types", ""))
-                    self.interval.set(settings.get("interval", 60))
-                    self.live_event.set(settings.get("live_event", False))
+                config = self.settings = BackupConfig.load(SETTINGS_FILE)
+                self.source_dir.set(config.source_dir)
+                self.backup_dir.set(config.backup_dir)
+                self.filter_types.set(config.filter_types)
+                self.exclude_patterns.set(config.exclude_patterns)
+                self.interval.set(config.interval)
+                self.live_event.set(config.live_event)
             except Exception as e:
                 self.log(f"⚠ Fehler beim Laden der Einstellungen: {e}")
 
@@ -0,0 +1 @@
+"""Hilfsmodule für die Automatische Sicherung (ohne GUI-Abhängigkeiten)."""
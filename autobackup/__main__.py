@@ -0,0 +1,5 @@
+import sys
+
+from autobackup.cli import main
+
+sys.exit(main())
@@ -0,0 +1,187 @@
+"""Deduplizierender Chunk-Store: Dateien werden inhaltsdefiniert zerlegt und jeder Chunk nur einmal gespeichert."""
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+
+CHUNK_DIR = "chunks"
+SNAPSHOT_DIR = "snapshots"
+PARTIAL_FILE = "partial.json"  # bereits gesicherte Dateien eines unterbrochenen Laufs
+
+MIN_CHUNK_SIZE = 512 * 1024
+MAX_CHUNK_SIZE = 4 * 1024 * 1024
+CUT_BITS = 19  # Schnittpunkt im Mittel alle 512 KiB nach MIN_CHUNK_SIZE
+READ_SIZE = 8 * 1024 * 1024
+SCAN_SIZE = 1024 * 1024  # so viel wird pro Suchschritt abgebildet und durchsucht
+
+# Feste Zufallstabellen (müssen über alle Läufe gleich bleiben): jedes Byte wird auf 0 oder 1 abgebildet,
+# ein Chunk endet hinter der ersten Stelle, an der die letzten CUT_BITS Bytes abgebildet CUT_PATTERN ergeben
+_rng = random.Random(0x41420006)
+_bits = [0, 1] * 128
+_rng.shuffle(_bits)
+CUT_TABLE = bytes(_bits)
+CUT_PATTERN = bytes(_rng.getrandbits(1) for _ in range(CUT_BITS))
+
+
+def find_cut(data, start=0):
+    """Ende des Chunks, der in data bei start beginnt
+
+    Statt eines Rolling-Hashes Byte für Byte in Python: bytes.translate bildet
+    einen ganzen Block über CUT_TABLE ab, bytes.find sucht darin das Muster.
+    Beides läuft in C, sodass der Schnitt nicht mehr den Durchsatz bestimmt.
+    Gesucht wird erst ab MIN_CHUNK_SIZE.
+    """
+    end = min(len(data), start + MAX_CHUNK_SIZE)
+    first = start + MIN_CHUNK_SIZE
+    pos = first
+    while pos < end:
+        stop = min(end, pos + SCAN_SIZE)
+        # Mit Überlappung, damit auch ein Muster über die Blockgrenze gefunden wird
+        begin = max(first, pos - (CUT_BITS - 1))
+        hit = data[begin:stop].translate(CUT_TABLE).find(CUT_PATTERN)
+        if hit >= 0:
+            return begin + hit + CUT_BITS
+        pos = stop
+    return end
+
+
+def iter_chunks(f):
+    """Datei-Objekt in inhaltsdefinierte Chunks zerlegen
+
+    Ein einziger Puffer, in dem nur der Beginn des nächsten Chunks wandert; der
+    Rest wird erst beim Nachladen nach vorn geschoben, nicht nach jedem Schnitt.
+    """
+    buf = bytearray()
+    start = 0
+    eof = False
+    while True:
+        if not eof and len(buf) - start < MAX_CHUNK_SIZE:
+            del buf[:start]
+            start = 0
+            while not eof and len(buf) < MAX_CHUNK_SIZE:
+                data = f.read(READ_SIZE)
+                if not data:
+                    eof = True
+                buf += data
+        if start >= len(buf):
+            return
+        cut = find_cut(buf, start)
+        yield bytes(memoryview(buf)[start:cut])
+        start = cut
+
+
+def write_atomic(path, data):
+    """Datei über temporären Namen, fsync und rename schreiben, damit nie halbe Dateien entstehen"""
+    tmp_path = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class ChunkStore:
+    """Repository-Format mit chunks/<xx>/<digest> und snapshots/<zeitstempel>.json."""
+
+    def __init__(self, root):
+        self.root = root
+        self.chunk_dir = os.path.join(root, CHUNK_DIR)
+        self.snapshot_dir = os.path.join(root, SNAPSHOT_DIR)
+        os.makedirs(self.chunk_dir, exist_ok=True)
+        os.makedirs(self.snapshot_dir, exist_ok=True)
+
+    def chunk_path(self, digest):
+        return os.path.join(self.chunk_dir, digest[:2], digest)
+
+    def put_chunk(self, data):
+        """Chunk speichern, falls noch nicht vorhanden; liefert (Digest, neu geschriebene Bytes)"""
+        digest = hashlib.blake2b(data, digest_size=32).hexdigest()
+        path = self.chunk_path(digest)
+        if os.path.exists(path):
+            return digest, 0
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        write_atomic(path, data)
+        return digest, len(data)
+
+    def get_chunk(self, digest):
+        with open(self.chunk_path(digest), "rb") as f:
+            data = f.read()
+        if hashlib.blake2b(data, digest_size=32).hexdigest() != digest:
+            raise ValueError(f"Chunk {digest} ist beschädigt")
+        return data
+
+    def store_file(self, path, throttle=None):
+        """Datei zerlegen und speichern; liefert (Liste der Digests, neu geschriebene Bytes)"""
+        digests = []
+        written = 0
+        with open(path, "rb") as f:
+            start = time.perf_counter()
+            for chunk in iter_chunks(f):
+                if throttle:
+                    throttle.data(len(chunk), time.perf_counter() - start)
+                digest, n = self.put_chunk(chunk)
+                digests.append(digest)
+                written += n
+                start = time.perf_counter()
+        return digests, written
+
+    def list_snapshots(self):
+        """Namen aller Snapshots, älteste zuerst"""
+        return sorted(name[:-5] for name in os.listdir(self.snapshot_dir) if name.endswith(".json"))
+
+    def load_snapshot(self, name):
+        with open(os.path.join(self.snapshot_dir, name + ".json"), "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def load_latest(self):
+        names = self.list_snapshots()
+        return self.load_snapshot(names[-1]) if names else None
+
+    def save_partial(self, files):
+        write_atomic(os.path.join(self.root, PARTIAL_FILE), json.dumps(files, separators=(",", ":")).encode("utf-8"))
+
+    def load_partial(self):
+        try:
+            with open(os.path.join(self.root, PARTIAL_FILE), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def clear_partial(self):
+        try:
+            os.remove(os.path.join(self.root, PARTIAL_FILE))
+        except FileNotFoundError:
+            pass
+
+    def delete_snapshot(self, name):
+        os.remove(os.path.join(self.snapshot_dir, name + ".json"))
+
+    def delete_chunk(self, digest):
+        """Chunk löschen; liefert die freigegebenen Bytes (0, falls schon weg)"""
+        path = self.chunk_path(digest)
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+        except FileNotFoundError:
+            return 0
+        return size
+
+    def write_snapshot(self, source, files):
+        """Snapshot-Manifest atomar anlegen; erst danach gilt der Lauf als abgeschlossen"""
+        name = time.strftime("%Y-%m-%d_%H-%M-%S")
+        existing = set(self.list_snapshots())
+        suffix = 1
+        while name in existing:
+            suffix += 1
+            name = f"{time.strftime('%Y-%m-%d_%H-%M-%S')}_{suffix}"
+        manifest = {
+            "name": name,
+            "created": time.time(),
+            "source": source,
+            "files": files,
+        }
+        write_atomic(os.path.join(self.snapshot_dir, name + ".json"),
+                     json.dumps(manifest, separators=(",", ":")).encode("utf-8"))
+        return name
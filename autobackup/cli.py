@@ -0,0 +1,234 @@
+"""Kommandozeile und Dienst-Betrieb ohne GUI, z.B. "python -m autobackup --once"."""
+import argparse
+import os
+import signal
+import sys
+import time
+
+from autobackup.config import BACKUP_FORMATS
+
+SETTINGS_FILE = "settings.json"
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="autobackup",
+        description="Automatische Sicherung ohne GUI (einmalig oder als Dienst).")
+    parser.add_argument("--settings", default=SETTINGS_FILE,
+                        help="Einstellungsdatei (Standard: settings.json)")
+    parser.add_argument("--source", help="Quellordner")
+    parser.add_argument("--dest", help="Backup-Ordner")
+    parser.add_argument("--also-dest", dest="extra_backup_dirs", action="append",
+                        help="Zusätzliches Ziel im Mirror-Format, aus demselben Lesevorgang beschrieben (mehrfach möglich)")
+    parser.add_argument("--storage", help="Ziel für --format packs: Ordner oder s3://bucket/präfix")
+    parser.add_argument("--compress", dest="compression", choices=("zlib", "lzma", "zstd"),
+                        help="Mit --format packs: jede Datei komprimieren (bereits komprimierte Typen ausgenommen)")
+    parser.add_argument("--compress-level", dest="compression_level", type=int, help="Kompressionsstufe")
+    parser.add_argument("--encryption-key-file", help="Mit --format packs: mit der Passphrase aus dieser Datei verschlüsseln")
+    parser.add_argument("--filter", dest="filter_types", help="Dateitypen, z.B. .txt,.pdf")
+    parser.add_argument("--exclude", dest="exclude_patterns", help="Ausschluss-Muster, z.B. node_modules,.git,*.tmp")
+    parser.add_argument("--format", dest="backup_format", choices=BACKUP_FORMATS,
+                        help="Backup-Format")
+    parser.add_argument("--interval", type=int, help="Intervall in Sekunden zwischen Backups")
+    parser.add_argument("--cron", help='Zeitplan als Cron-Ausdruck statt Intervall, z.B. "0 */2 * * *"')
+    parser.add_argument("--job", dest="job_names", action="append",
+                        help="Nur diesen Job aus \"jobs\" ausführen (mehrfach möglich)")
+    parser.add_argument("--limit-mb", type=float, help="Höchstens so viele MB/s lesen (0 = unbegrenzt)")
+    parser.add_argument("--limit-files", type=float, help="Höchstens so viele Dateien/s kopieren (0 = unbegrenzt)")
+    parser.add_argument("--adaptive-throttle", action="store_true",
+                        help="Bremsen, sobald die Leselatenz des Quell-Laufwerks steigt")
+    parser.add_argument("--nice", type=int, help="CPU-Priorität der Backup-Threads (Linux, 0-19)")
+    parser.add_argument("--ionice", dest="io_priority", choices=("idle", "best-effort"),
+                        help="I/O-Priorität der Backup-Threads")
+    parser.add_argument("--watch", action="store_true", help="Änderungen überwachen statt im Intervall zu scannen")
+    parser.add_argument("--once", action="store_true", help="Nur ein Backup ausführen und beenden")
+    parser.add_argument("--restore", metavar="ZIEL", help="Backup in diesen Ordner wiederherstellen statt zu sichern")
+    parser.add_argument("--path", default="", help="Nur diese Datei bzw. diesen Unterordner wiederherstellen")
+    parser.add_argument("--snapshot", help="Älteren Snapshot wiederherstellen (Standard: neuester)")
+    parser.add_argument("--no-verify", dest="restore_verify", action="store_false",
+                        help="Prüfsummen und Größen beim Wiederherstellen nicht prüfen")
+    parser.add_argument("--verify", nargs="?", const="source", choices=("source", "backup"),
+                        help="Backup prüfen: gegen die Quelle (Standard) oder nur gegen gespeicherte Prüfsummen")
+    parser.add_argument("--prune", action="store_true",
+                        help="Nur alte Stände nach den keep_*-Regeln löschen (nicht parallel zu einem Backup desselben Ziels)")
+    parser.add_argument("--keep-last", type=int, help="Die neuesten N Stände behalten")
+    parser.add_argument("--keep-hourly", type=int, help="Je einen Stand der letzten N Stunden behalten")
+    parser.add_argument("--keep-daily", type=int, help="Je einen Stand der letzten N Tage behalten")
+    parser.add_argument("--keep-weekly", type=int, help="Je einen Stand der letzten N Wochen behalten")
+    parser.add_argument("--keep-monthly", type=int, help="Je einen Stand der letzten N Monate behalten")
+    parser.add_argument("--dry-run", action="store_true", help="Mit --prune nur anzeigen, was gelöscht würde")
+    parser.add_argument("--log-file", help="Meldungen zusätzlich in diese rotierende Log-Datei schreiben")
+    parser.add_argument("--metrics-textfile", help="Kennzahlen pro Lauf als Prometheus-Textfile schreiben")
+    parser.add_argument("--profile", metavar="DATEI",
+                        help="Ersten Lauf mit cProfile aufzeichnen (auswerten mit python -m pstats DATEI)")
+    return parser
+
+
+def load_config(args):
+    from autobackup.config import BackupConfig
+
+    config = BackupConfig.load(args.settings)
+    if args.source is not None:
+        config.source_dir = args.source
+    if args.dest is not None:
+        config.backup_dir = args.dest
+    if args.extra_backup_dirs:
+        config.extra_backup_dirs = args.extra_backup_dirs
+    if args.storage is not None:
+        config.storage = args.storage
+    for key in ("compression", "compression_level", "encryption_key_file"):
+        if getattr(args, key) is not None:
+            setattr(config, key, getattr(args, key))
+    if args.filter_types is not None:
+        config.filter_types = args.filter_types
+    if args.exclude_patterns is not None:
+        config.exclude_patterns = args.exclude_patterns
+    if args.backup_format is not None:
+        config.backup_format = args.backup_format
+    if args.interval is not None:
+        config.interval = args.interval
+    if args.cron is not None:
+        config.cron = args.cron
+    if args.limit_mb is not None:
+        config.max_bytes_per_second = int(args.limit_mb * 1024 * 1024)
+    if args.limit_files is not None:
+        config.max_files_per_second = args.limit_files
+    if args.adaptive_throttle:
+        config.adaptive_throttle = True
+    if args.nice is not None:
+        config.nice = args.nice
+    if args.io_priority is not None:
+        config.io_priority = args.io_priority
+    for key in ("keep_last", "keep_hourly", "keep_daily", "keep_weekly", "keep_monthly"):
+        if getattr(args, key) is not None:
+            setattr(config, key, getattr(args, key))
+    if args.watch:
+        config.watch_mode = True
+    if args.metrics_textfile is not None:
+        config.metrics_textfile = args.metrics_textfile
+    return config
+
+
+def restore(parser, args, jobs, log):
+    from autobackup.restore import RestoreEngine
+
+    if len(jobs) > 1:
+        parser.error("Bei mehreren Jobs mit --job angeben, welcher wiederhergestellt werden soll")
+    config = jobs[0].config
+    if not os.path.isdir(config.backup_dir):
+        parser.error(f"Backup-Ordner ist ungültig: {config.backup_dir!r}")
+    os.makedirs(args.restore, exist_ok=True)
+    try:
+        count, failed = RestoreEngine(config, log=log).restore(args.restore, args.path, args.snapshot, args.restore_verify)
+    except (OSError, ValueError) as e:
+        log(f"⚠ Wiederherstellung fehlgeschlagen: {e}")
+        return 1
+    return 1 if failed or not count else 0
+
+
+def verify(parser, args, jobs, log):
+    problems = 0
+    for job in jobs:
+        if not os.path.isdir(job.config.backup_dir):
+            parser.error(f"{job.name}: Backup-Ordner ist ungültig: {job.config.backup_dir!r}")
+        try:
+            counts = job.engine.new_verifier().verify(compare_source=args.verify == "source")
+        except (OSError, ValueError) as e:
+            job.engine.log(f"⚠ Prüfung fehlgeschlagen: {e}")
+            problems += 1
+            continue
+        problems += counts["corrupt"] + counts["missing"] + counts["error"]
+    return 1 if problems else 0
+
+
+def prune(parser, args, jobs):
+    from autobackup.retention import policy_enabled
+
+    for job in jobs:
+        if not os.path.isdir(job.config.backup_dir):
+            parser.error(f"{job.name}: Backup-Ordner ist ungültig: {job.config.backup_dir!r}")
+        if not policy_enabled(job.config):
+            job.engine.log("ℹ Keine Aufbewahrungsregeln (keep_*) gesetzt, nichts zu löschen.")
+            continue
+        removed, _ = job.engine.prune(args.dry_run)
+        if not removed:
+            job.engine.log("✅ Keine abgelaufenen Stände.")
+    return 0
+
+
+def reload_limits(args, scheduler, log):
+    """SIGHUP: Drosselung aus der Einstellungsdatei neu lesen"""
+    try:
+        scheduler.update_limits(load_config(args))
+        log("🔄 Drosselung neu geladen.")
+    except (OSError, ValueError) as e:
+        log(f"⚠ Einstellungen konnten nicht neu geladen werden: {e}")
+
+
+def make_logger(log_file=None):
+    sink = None
+    if log_file:
+        from autobackup.logsink import LogSink
+
+        sink = LogSink(log_file)
+
+    def log(message):
+        print(f"{time.strftime('[%Y-%m-%d %H:%M:%S]')} {message}", flush=True)
+        if sink is not None:
+            sink.emit(message)
+
+    log.close = sink.close if sink is not None else (lambda: None)
+    return log
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    try:
+        config = load_config(args)
+    except (OSError, ValueError) as e:
+        parser.error(f"Einstellungen konnten nicht geladen werden: {e}")
+
+    from autobackup.scheduler import Scheduler, build_jobs
+
+    log = make_logger(args.log_file)
+    try:
+        try:
+            jobs = build_jobs(config, log)
+        except (TypeError, ValueError) as e:
+            parser.error(f"Ungültige Job-Konfiguration: {e}")
+        if args.job_names:
+            jobs = [job for job in jobs if job.name in args.job_names]
+            if not jobs:
+                parser.error(f"Kein Job mit diesem Namen: {', '.join(args.job_names)}")
+        if args.restore:
+            return restore(parser, args, jobs, log)
+        if args.verify:
+            return verify(parser, args, jobs, log)
+        if args.prune:
+            return prune(parser, args, jobs)
+        for job in jobs:
+            if not os.path.isdir(job.config.source_dir):
+                parser.error(f"{job.name}: Quellordner ist ungültig: {job.config.source_dir!r}")
+            if not os.path.isdir(job.config.backup_dir):
+                parser.error(f"{job.name}: Backup-Ordner ist ungültig: {job.config.backup_dir!r}")
+        jobs[0].engine.profile_path = args.profile
+        scheduler = Scheduler(jobs, config.max_concurrent_jobs, config.max_jobs_per_device, log)
+        if args.once:
+            return 1 if scheduler.run_all_once() else 0
+
+        # systemd und Strg+C beenden den Dienst sauber nach dem laufenden Durchgang
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda *_: scheduler.stop())
+        if hasattr(signal, "SIGHUP"):
+            signal.signal(signal.SIGHUP, lambda *_: reload_limits(args, scheduler, log))
+        log("🔄 Backup-Dienst gestartet.")
+        scheduler.run()
+        log("⛔ Backup-Dienst beendet.")
+        return 0
+    finally:
+        log.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
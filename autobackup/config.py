@@ -0,0 +1,104 @@
+"""Einstellungen eines Backup-Jobs (settings.json), ohne GUI- oder Engine-Abhängigkeiten."""
+import json
+import os
+
+DEFAULT_WORKERS = min(8, (os.cpu_count() or 1) + 2)
+DEFAULT_LARGE_FILE_SIZE = 64 * 1024 * 1024
+DEFAULT_DELTA_THRESHOLD = 64 * 1024 * 1024
+DEFAULT_DEBOUNCE = 2.0
+DEFAULT_FANOUT_BUFFER = 64 * 1024 * 1024
+DEFAULT_PACK_SIZE = 32 * 1024 * 1024
+DEFAULT_PACK_THRESHOLD = 1024 * 1024
+DEFAULT_UPLOAD_PART_SIZE = 8 * 1024 * 1024
+BACKUP_FORMATS = ("mirror", "snapshots", "chunks", "packs")
+OVERRUN_POLICIES = ("skip", "coalesce", "queue")
+
+DEFAULTS = {
+    "source_dir": "",
+    "backup_dir": "",
+    "filter_types": "",
+    "exclude_patterns": "",
+    "interval": 60,
+    "live_event": False,
+    "index_hash": False,  # optional: BLAKE2b-Hash im Änderungs-Index speichern
+    "copy_workers": DEFAULT_WORKERS,
+    "large_file_size": DEFAULT_LARGE_FILE_SIZE,
+    "delta_threshold": DEFAULT_DELTA_THRESHOLD,  # ab dieser Größe nur geänderte Blöcke schreiben (0 = aus)
+    # "mirror" = 1:1-Kopie, "snapshots" = Ordner pro Lauf mit Hardlinks, "chunks" = deduplizierender Chunk-Store,
+    # "packs" = kleine Dateien gebündelt auf einem Speicher-Backend (Ordner oder S3)
+    "backup_format": "mirror",
+    # Weitere Ziele für das Mirror-Format (3-2-1): die Quelle wird nur einmal gescannt und gelesen
+    "extra_backup_dirs": [],
+    "fanout_buffer": DEFAULT_FANOUT_BUFFER,  # Puffer pro Ziel, bevor ein langsames Ziel die übrigen aufhält
+    # Format "packs": Ziel ist ein Ordner (leer = backup_dir) oder s3://bucket/präfix; backup_dir hält dann nur Index und Kennzahlen
+    "storage": "",
+    "s3_endpoint": "",  # z.B. http://localhost:9000 für MinIO; leer = AWS in s3_region
+    "s3_region": "us-east-1",
+    "s3_access_key": "",  # leer = Umgebungsvariablen AWS_ACCESS_KEY_ID / AWS_SECRET_ACCESS_KEY
+    "s3_secret_key": "",
+    "upload_connections": 8,  # Verbindungs-Pool und parallele Multipart-Teile
+    "upload_part_size": DEFAULT_UPLOAD_PART_SIZE,
+    "pack_size": DEFAULT_PACK_SIZE,  # Größe einer Pack-Datei
+    "pack_threshold": DEFAULT_PACK_THRESHOLD,  # kleinere Dateien werden in Packs gebündelt
+    # Format "packs": Kompression pro Datei ("zlib", "lzma" oder "zstd" mit dem Paket zstandard; 0 = Standardstufe)
+    "compression": "",
+    "compression_level": 0,
+    "encryption_key_file": "",  # Datei mit Passphrase: AES-256-GCM (Paket cryptography)
+    "watch_mode": False,  # Änderungen per inotify/Polling verfolgen statt festem Intervall
+    "watch_debounce": DEFAULT_DEBOUNCE,
+    "reconcile_interval": 3600,  # vollständiger Abgleich-Scan im Watch-Modus
+    "checkpoint_interval": 30,  # Sekunden zwischen zwei Sicherungspunkten eines laufenden Backups
+    "job_name": "default",  # Name in Kennzahlen und Prometheus-Labels
+    "metrics_history": True,  # Kennzahlen pro Lauf nach .autobackup/metrics.jsonl schreiben
+    "metrics_textfile": "",  # optional: Prometheus-Textfile für node_exporter, z.B. /var/lib/node_exporter/autobackup.prom
+    # Mehrere Jobs: Liste von Einträgen, die einzelne der obigen Werte überschreiben (Scheduler im Dienst-Betrieb)
+    "jobs": [],
+    "cron": "",  # statt interval, z.B. "*/15 * * * *" oder "@daily"
+    "priority": 0,  # höher = wird bei knappen Plätzen zuerst gestartet
+    "overrun": "skip",  # Termin während eines laufenden Backups: "skip", "coalesce" oder "queue"
+    "max_concurrent_jobs": 2,
+    "max_jobs_per_device": 1,
+    # Drosselung pro Job (0 = unbegrenzt); im Dienst per SIGHUP ohne Neustart änderbar
+    "max_bytes_per_second": 0,
+    "max_files_per_second": 0,
+    "adaptive_throttle": False,  # bremsen, wenn die Leselatenz des Quell-Laufwerks steigt
+    "nice": 0,  # CPU-Priorität der Backup-Threads (Linux, 0-19)
+    "io_priority": "",  # "idle" oder "best-effort" (niedrigste Stufe); unter Windows Hintergrundmodus
+    # Aufbewahrung für snapshots/chunks nach jedem Lauf (alle 0 = nichts löschen)
+    "keep_last": 0,
+    "keep_hourly": 0,
+    "keep_daily": 0,
+    "keep_weekly": 0,
+    "keep_monthly": 0,
+    "scrub_period": 30 * 24 * 3600,  # jede Backup-Datei innerhalb dieser Sekunden einmal nachprüfen (0 = aus)
+}
+
+
+class BackupConfig:
+    """Alle Einstellungen als Attribute; unbekannte Schlüssel bleiben beim Speichern erhalten."""
+
+    def __init__(self, **values):
+        for key, default in DEFAULTS.items():
+            setattr(self, key, values.pop(key, default))
+        self.extra = values
+
+    @classmethod
+    def load(cls, path):
+        """Lade Einstellungen aus JSON-Datei (fehlende Datei = Standardwerte)"""
+        if not os.path.isfile(path):
+            return cls()
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(**json.load(f))
+
+    def save(self, path):
+        """Speichere Einstellungen in JSON-Datei"""
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=4, ensure_ascii=False)
+
+    def to_dict(self):
+        data = dict(self.extra)
+        data.update((key, getattr(self, key)) for key in DEFAULTS)
+        return data
+
+    def copy(self, **changes):
+        return BackupConfig(**{**self.to_dict(), **changes})
@@ -0,0 +1,117 @@
+"""Block-Delta-Übertragung: bei großen geänderten Dateien nur die geänderten Blöcke neu schreiben."""
+import hashlib
+import os
+import shutil
+import sqlite3
+import threading
+import time
+
+from autobackup.config import DEFAULT_DELTA_THRESHOLD
+from autobackup.index import INDEX_DIR, same_stat
+
+DEFAULT_BLOCK_SIZE = 1024 * 1024
+SIGNATURE_FILE = "signatures.sqlite"
+DIGEST_SIZE = 16
+
+
+def block_digest(block):
+    return hashlib.blake2b(block, digest_size=DIGEST_SIZE).digest()
+
+
+def compute_signatures(path, block_size=DEFAULT_BLOCK_SIZE):
+    """Block-Prüfsummen einer Datei als zusammenhängende Bytes"""
+    sigs = []
+    with open(path, "rb") as f:
+        while True:
+            block = f.read(block_size)
+            if not block:
+                break
+            sigs.append(block_digest(block))
+    return b"".join(sigs)
+
+
+class SignatureCache:
+    """Block-Signaturen der Backup-Kopien, damit das Ziel nicht in jedem Lauf neu gelesen werden muss.
+
+    Ein Eintrag gilt nur, solange Größe, mtime_ns und Inode der Backup-Datei
+    unverändert sind.
+    """
+
+    def __init__(self, backup_dir):
+        path = os.path.join(backup_dir, INDEX_DIR, SIGNATURE_FILE)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS signatures ("
+            " path TEXT PRIMARY KEY,"
+            " block_size INTEGER NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " mtime_ns INTEGER NOT NULL,"
+            " inode INTEGER NOT NULL,"
+            " sigs BLOB NOT NULL"
+            ") WITHOUT ROWID")
+
+    def get(self, path, st, block_size):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT block_size, size, mtime_ns, inode, sigs FROM signatures WHERE path = ?", (path,)).fetchone()
+        if row is None or row[0] != block_size or not same_stat(*row[1:4], st):
+            return None
+        return row[4]
+
+    def put(self, path, st, block_size, sigs):
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO signatures (path, block_size, size, mtime_ns, inode, sigs) VALUES (?, ?, ?, ?, ?, ?)",
+                (path, block_size, st.st_size, st.st_mtime_ns, st.st_ino, sigs))
+
+    def close(self):
+        with self.lock:
+            self.conn.commit()
+            self.conn.close()
+
+
+def delta_copy(src, dst, cache, threshold=DEFAULT_DELTA_THRESHOLD, block_size=DEFAULT_BLOCK_SIZE, throttle=None):
+    """Geänderte Blöcke von src in die vorhandene Kopie dst schreiben.
+
+    Liefert die Anzahl geschriebener Bytes oder None, wenn sich Delta nicht
+    lohnt (Datei zu klein oder noch keine Kopie vorhanden) und normal kopiert
+    werden soll.
+    """
+    try:
+        st_dst = os.stat(dst)
+    except FileNotFoundError:
+        return None
+    with open(src, "rb") as fsrc:
+        size = os.fstat(fsrc.fileno()).st_size
+        if size < threshold:
+            return None
+        old_sigs = cache.get(dst, st_dst, block_size)
+        if old_sigs is None:
+            old_sigs = compute_signatures(dst, block_size)
+
+        new_sigs = []
+        written = 0
+        with open(dst, "r+b") as fdst:
+            offset = 0
+            while True:
+                start = time.perf_counter()
+                block = fsrc.read(block_size)
+                if not block:
+                    break
+                if throttle:
+                    throttle.data(len(block), time.perf_counter() - start)
+                digest = block_digest(block)
+                i = len(new_sigs)
+                if old_sigs[i * DIGEST_SIZE:(i + 1) * DIGEST_SIZE] != digest:
+                    fdst.seek(offset)
+                    fdst.write(block)
+                    written += len(block)
+                new_sigs.append(digest)
+                offset += len(block)
+            fdst.truncate(offset)
+    shutil.copystat(src, dst)
+    cache.put(dst, os.stat(dst), block_size, b"".join(new_sigs))
+    return written
@@ -0,0 +1,803 @@
+"""Backup-Engine ohne GUI: Scan, Vergleich und Kopie für alle Backup-Formate.
+
+Module für einzelne Modi (Watch, Chunk-Store, Snapshots, Block-Delta) werden
+erst importiert, wenn der Modus tatsächlich verwendet wird.
+"""
+import os
+import threading
+import time
+from collections import Counter
+
+from autobackup.index import FileIndex, INDEX_DIR, file_digest, same_stat
+from autobackup.metrics import RunMetrics, METRICS_FILE, timed, append_history, write_prometheus
+from autobackup.scan import TreeScanner, DestinationDirs, in_scope
+from autobackup.throttle import Throttle, lower_priority
+
+
+TEMP_SUFFIX = ".autobackup-tmp"
+
+
+class BackupEngine:
+    """Führt Backups für eine BackupConfig aus; Meldungen gehen an log(), Statuszeilen an status()."""
+
+    def __init__(self, config, log=print, status=None):
+        self.config = config
+        self.log = log
+        self.status = status or (lambda text: None)
+        self.stop_event = threading.Event()
+        self.next_backup_at = None  # time.monotonic() des nächsten geplanten Laufs
+        self.last_backup_time = None
+        self.last_backup_count = 0
+        self.last_backup_failed = 0
+        self.signatures = None
+        self.metrics = None  # RunMetrics des laufenden bzw. letzten Laufs
+        self.profile_path = None  # nächsten Lauf mit cProfile aufzeichnen und dorthin schreiben
+        self.throttle = Throttle(config, self.stop_event)
+        self.scrub_thread = None
+        self.scrub_stop = threading.Event()
+
+    @property
+    def is_running(self):
+        return not self.stop_event.is_set()
+
+    def stop(self):
+        self.stop_event.set()
+        self.scrub_stop.set()
+
+    def update_limits(self, **limits):
+        """Drosselung zur Laufzeit ändern, z.B. update_limits(max_bytes_per_second=50 * 1024 * 1024)"""
+        for key, value in limits.items():
+            setattr(self.config, key, value)
+        self.throttle.configure(self.config)
+
+    def run_loop(self):
+        """Backups im festen Intervall (oder im Watch-Modus) bis stop()"""
+        try:
+            if self.config.watch_mode:
+                self.run_watch_loop()
+            else:
+                self.run_interval_loop()
+        finally:
+            self.wait_scrub(cancel=True)
+
+    def run_interval_loop(self):
+        next_at = time.monotonic()
+        while self.is_running:
+            self.run_once()
+            # Termine ab dem Start rechnen, damit sich der Takt nicht um die Laufzeit verschiebt
+            interval = max(1, self.config.interval)
+            now = time.monotonic()
+            next_at += interval
+            if next_at <= now:
+                # Lauf dauerte länger als das Intervall: verpasste Termine auslassen
+                next_at += ((now - next_at) // interval + 1) * interval
+            self.next_backup_at = next_at
+            self.stop_event.wait(next_at - now)
+
+    def run_watch_loop(self):
+        from autobackup.watch import create_watcher
+
+        watcher = create_watcher(self.config.source_dir)
+        self.log(f"👁 Watch-Modus aktiv ({type(watcher).__name__}).")
+        try:
+            self.run_once()
+            last_full_scan = time.monotonic()
+            while self.is_running:
+                dirty = watcher.wait_for_changes(1.0, self.config.watch_debounce)
+                if not self.is_running:
+                    break
+                if dirty is None or time.monotonic() - last_full_scan >= self.config.reconcile_interval:
+                    # Ereignisse verloren oder Abgleich fällig: vollständiger Scan
+                    self.run_once()
+                    last_full_scan = time.monotonic()
+                elif dirty:
+                    self.run_once(dirty)
+        finally:
+            watcher.close()
+
+    def run_once(self, paths=None):
+        """Einen Backup-Lauf ausführen; Fehler werden gemeldet statt die Schleife zu beenden"""
+        # Scrubbing läuft nur zwischen den Läufen und gibt das Backup sofort frei
+        self.wait_scrub(cancel=True)
+        self.last_backup_count = 0
+        self.last_backup_failed = 0
+        self.metrics = RunMetrics(self.config.job_name, self.config.backup_format,
+                                  None if self.config.watch_mode else self.config.interval)
+        lower_priority(self.config)
+        profiler = None
+        if self.profile_path:
+            import cProfile
+
+            # Erfasst nur den Scan-Thread; die Worker tauchen als Wartezeit in drain/finish auf
+            profiler = cProfile.Profile()
+            profiler.enable()
+        if self.config.extra_backup_dirs and self.config.backup_format != "mirror":
+            self.log("ℹ Zusätzliche Ziele (extra_backup_dirs) werden nur im Mirror-Format beschrieben.")
+        try:
+            if self.config.backup_format == "chunks":
+                self.perform_chunk_backup(paths)
+            elif self.config.backup_format == "packs":
+                self.perform_pack_backup(paths)
+            elif self.config.backup_format == "snapshots":
+                self.perform_snapshot_backup(paths)
+            else:
+                self.perform_mirror_backup(paths)
+        except Exception as e:
+            self.last_backup_failed += 1
+            self.metrics.count("failed")
+            self.log(f"⚠ Backup fehlgeschlagen: {e}")
+        finally:
+            if profiler is not None:
+                profiler.disable()
+                profiler.dump_stats(self.profile_path)
+                self.log(f"ℹ Profil gespeichert: {self.profile_path}")
+                self.profile_path = None
+        self.metrics.finish()
+        self.export_metrics(self.metrics)
+        if self.is_running and self.config.backup_format != "mirror":
+            self.prune()
+        if self.config.scrub_period and self.is_running:
+            self.start_scrub()
+        self.last_backup_time = time.strftime("%d.%m.%Y %H:%M:%S")
+        self.status(f"Letztes Backup: {self.last_backup_time} ({self.last_backup_count} Dateien)")
+
+    def prune(self, dry_run=False):
+        """Abgelaufene Snapshots nach den keep_*-Regeln löschen (im selben Thread wie das Backup)"""
+        from autobackup.retention import Retention
+
+        try:
+            return Retention(self.config, self.log).prune(dry_run)
+        except Exception as e:
+            self.log(f"⚠ Aufräumen fehlgeschlagen: {e}")
+            return [], 0
+
+    def new_verifier(self):
+        from autobackup.verify import Verifier
+
+        # Prüfen läuft immer mit niedriger I/O-Priorität, auch wenn das Backup selbst normal läuft
+        quiet = self.config.copy(io_priority=self.config.io_priority or "idle")
+        return Verifier(self.config, self.log, self.throttle if self.throttle.active else None,
+                        initializer=lambda: lower_priority(quiet), cancelled=self.scrub_stop.is_set)
+
+    def start_scrub(self):
+        """Scrubbing im Hintergrund starten; der nächste Lauf oder stop() bricht es zwischen zwei Dateien ab"""
+        self.scrub_stop.clear()
+        self.scrub_thread = threading.Thread(target=self.scrub, name=f"scrub-{self.config.job_name}", daemon=True)
+        self.scrub_thread.start()
+
+    def wait_scrub(self, cancel=False):
+        """Auf ein laufendes Scrubbing warten (z.B. vor dem Beenden mit --once), mit cancel=True abbrechen"""
+        if self.scrub_thread is None:
+            return
+        if cancel:
+            self.scrub_stop.set()
+        self.scrub_thread.join()
+        self.scrub_thread = None
+
+    def scrub(self):
+        """Rotierenden Ausschnitt des Backups gegen die gespeicherten Prüfsummen prüfen"""
+        try:
+            verifier = self.new_verifier()
+            verifier.initializer()
+            verifier.scrub(self.config.scrub_period)
+        except Exception as e:
+            self.log(f"⚠ Scrubbing fehlgeschlagen: {e}")
+
+    def export_metrics(self, metrics):
+        """Kennzahlen protokollieren und als JSONL-Verlauf bzw. Prometheus-Textfile ablegen"""
+        self.log(metrics.summary())
+        try:
+            if self.config.metrics_history:
+                append_history(os.path.join(self.config.backup_dir, INDEX_DIR, METRICS_FILE), metrics)
+            if self.config.metrics_textfile:
+                write_prometheus(self.config.metrics_textfile, metrics)
+        except OSError as e:
+            self.log(f"⚠ Kennzahlen konnten nicht geschrieben werden: {e}")
+
+    def new_scanner(self, src):
+        return TreeScanner(src, self.config.filter_types, self.config.exclude_patterns,
+                           on_error=lambda path, e: self.log(f"⚠ Fehler beim Lesen von {path}: {e}"))
+
+    def scan_source(self, src, paths=None):
+        """Liefert (relativer Pfad, Quellpfad, stat) für den ganzen Baum oder nur für die angegebenen relativen Pfade"""
+        scanner = self.new_scanner(src)
+        files = scanner.scan() if paths is None else scanner.scan_paths(paths)
+        return timed(files, self.metrics, "scan")
+
+    def resume_scan(self, scanner, state):
+        """Unterbrochenen Lauf fortsetzen: erst die damals laufenden Dateien, dann die offenen Ordner"""
+        retried = set()
+        for item in scanner.scan_paths(state["files"]):
+            retried.add(item[0])
+            yield item
+        for item in scanner.scan(resume=state["dirs"]):
+            if item[0] not in retried:
+                yield item
+
+    def new_pipeline(self, copy_func):
+        from autobackup.pipeline import CopyPipeline
+
+        return CopyPipeline(copy_func, workers=self.config.copy_workers, large_file_size=self.config.large_file_size,
+                            initializer=lambda: lower_priority(self.config))
+
+    def open_targets(self):
+        """Backup-Ordner und erreichbare zusätzliche Ziele mit ihrem Änderungs-Index; liefert auch die Fehlschläge"""
+        targets = [(self.config.backup_dir, FileIndex(self.config.backup_dir))]
+        unreachable = 0
+        for path in self.config.extra_backup_dirs:
+            try:
+                if not os.path.isdir(path):
+                    raise FileNotFoundError("Ordner existiert nicht")
+                targets.append((path, FileIndex(path)))
+            except Exception as e:
+                unreachable += 1
+                self.log(f"⚠ Ziel {path} nicht erreichbar, wird übersprungen: {e}")
+        return targets, unreachable
+
+    def perform_mirror_backup(self, paths=None):
+        """1:1-Spiegel im Backup-Ordner (und in extra_backup_dirs); nur neue oder geänderte Dateien werden kopiert"""
+        src = self.config.source_dir
+        count = 0
+        unchanged = 0
+        failed = 0
+        strategies = Counter()
+
+        # Änderungs-Index pro Ziel: unveränderte Dateien kosten nur einen stat-Aufruf
+        targets, unreachable = self.open_targets()
+        indexes = [index for _, index in targets]
+        index = indexes[0]
+        copied = [0] * len(targets)
+        errors = [0] * len(targets)
+        dirs = DestinationDirs()
+        # Block-Delta nur im Mirror-Format mit einem Ziel: Snapshots teilen sich Inodes per Hardlink,
+        # und mehrere Ziele werden aus einem einzigen Lesevorgang beschrieben
+        if self.config.delta_threshold and len(targets) == 1:
+            from autobackup.delta import SignatureCache
+
+            self.signatures = SignatureCache(self.config.backup_dir)
+        pipeline = self.new_pipeline(self.copy_to_targets)
+
+        metrics = self.metrics
+        scanner = self.new_scanner(src)
+        # Journal eines abgebrochenen Laufs: dort weitermachen statt den ganzen Baum erneut zu scannen
+        resume = index.load_journal() if paths is None else None
+        if resume is not None:
+            self.log(f"🔄 Unterbrochenen Lauf fortsetzen ({len(resume['dirs'])} offene Ordner).")
+            files = self.resume_scan(scanner, resume)
+        else:
+            files = scanner.scan() if paths is None else scanner.scan_paths(paths)
+        inflight = set()
+        next_checkpoint = time.monotonic() + self.config.checkpoint_interval
+
+        def checkpoint():
+            state = {"dirs": scanner.pending_dirs(), "files": sorted(inflight)}
+            for target_index in indexes:
+                target_index.checkpoint(state)
+
+        def collect(results):
+            nonlocal count, failed
+            for result in results:
+                rel_path, st, pending, missed = result.tag
+                inflight.discard(rel_path)
+                if result.error is not None:
+                    strategy, digest, outcomes = None, None, [result.error] * len(pending)
+                else:
+                    strategy, digest, outcomes = result.info
+                for i, error in zip(pending, outcomes):
+                    if error is not None:
+                        errors[i] += 1
+                        target = f" nach {targets[i][0]}" if len(targets) > 1 else ""
+                        self.log(f"⚠ Fehler beim Kopieren von {result.src}{target}: {error}")
+                        continue
+                    indexes[i].record(rel_path, st, digest)
+                    copied[i] += 1
+                if missed or any(error is not None for error in outcomes):
+                    failed += 1
+                    metrics.count("failed")
+                    continue
+                strategies[strategy] += 1
+                count += 1
+                metrics.count("changed")
+
+        scan_complete = False
+        try:
+            for rel_path, src_file, st in timed(files, metrics, "scan"):
+                if not self.is_running:
+                    break
+                metrics.count("scanned")
+                with metrics.timer("compare"):
+                    # Jedes Ziel hat seinen eigenen Stand; gelesen wird trotzdem nur einmal
+                    pending = [i for i, target_index in enumerate(indexes) if target_index.is_changed(rel_path, st)]
+                if not pending:
+                    unchanged += 1
+                    metrics.count("unchanged")
+                    continue
+
+                dst_files = []
+                missed = False
+                with metrics.timer("mkdir"):
+                    for i in list(pending):
+                        dst_file = os.path.join(targets[i][0], rel_path)
+                        try:
+                            dirs.ensure(os.path.dirname(dst_file))
+                        except OSError as e:
+                            if len(targets) == 1:
+                                raise
+                            # Nur dieses Ziel verfehlt die Datei, die übrigen werden trotzdem beschrieben
+                            pending.remove(i)
+                            missed = True
+                            errors[i] += 1
+                            self.log(f"⚠ Fehler beim Kopieren von {src_file} nach {targets[i][0]}: {e}")
+                            continue
+                        dst_files.append(dst_file)
+                if not dst_files:
+                    failed += 1
+                    metrics.count("failed")
+                    continue
+                inflight.add(rel_path)
+                pipeline.submit(src_file, dst_files, st.st_size, (rel_path, st, pending, missed))
+                collect(pipeline.drain())
+                if paths is None and time.monotonic() >= next_checkpoint:
+                    checkpoint()
+                    next_checkpoint = time.monotonic() + self.config.checkpoint_interval
+            else:
+                scan_complete = True
+        finally:
+            collect(pipeline.finish())
+            if paths is not None:
+                # Teil-Scan (Watch-Modus): gelöschte Dateien nur innerhalb der gescannten Pfade austragen
+                for target_index in indexes:
+                    target_index.commit(prune=scan_complete, paths=paths)
+            elif scan_complete:
+                # Nur ein vollständiger Scan in einem Durchgang darf verschwundene Pfade aus dem Index entfernen
+                for target_index in indexes:
+                    target_index.clear_journal()
+                    target_index.commit(prune=resume is None)
+            else:
+                checkpoint()
+            for target_index in indexes:
+                target_index.close()
+            if self.signatures is not None:
+                self.signatures.close()
+                self.signatures = None
+
+        self.last_backup_count = count
+        self.last_backup_failed = failed + unreachable
+        if not scan_complete:
+            self.log(f"⛔ Backup unterbrochen nach {count} Dateien; der nächste Lauf setzt dort fort.")
+            return
+        summary = f"✅ Backup abgeschlossen. {count} Dateien kopiert, {unchanged} unverändert."
+        if failed:
+            summary += f" {failed} Fehler."
+        self.log(summary)
+        if len(targets) > 1:
+            for (path, _), n, target_failed in zip(targets, copied, errors):
+                if target_failed:
+                    self.log(f"⚠ Ziel {path}: {n} Dateien kopiert, {target_failed} Fehler.")
+                else:
+                    self.log(f"✅ Ziel {path}: {n} Dateien kopiert.")
+        self.log_strategies(strategies)
+
+    def perform_snapshot_backup(self, paths=None):
+        """Backup als neuer Snapshot-Ordner; unveränderte Dateien werden aus dem letzten Snapshot verlinkt"""
+        from autobackup.snapshots import SnapshotStore, SNAPSHOT_INDEX_FILE
+
+        src = self.config.source_dir
+        dst = self.config.backup_dir
+        store = SnapshotStore(dst)
+        previous = store.latest()
+        prev_path = store.path(previous) if previous else None
+        index = FileIndex(dst, SNAPSHOT_INDEX_FILE)
+        count = 0
+        linked = 0
+        failed = 0
+        strategies = Counter()
+        name = None
+        completed = False
+        metrics = self.metrics
+
+        try:
+            # Erst scannen: ohne Änderungen wird kein neuer Snapshot angelegt
+            changed = []
+            for rel_path, src_file, st in self.scan_source(src, paths):
+                metrics.count("scanned")
+                with metrics.timer("compare"):
+                    if index.is_changed(rel_path, st) or previous is None:
+                        changed.append((rel_path, src_file, st))
+            removed = set(index.removed(paths))
+            if not changed and not removed:
+                self.log("✅ Keine Änderungen, kein neuer Snapshot.")
+                return
+
+            name = store.begin()
+            work = store.work_path(name)
+            dirs = DestinationDirs()
+            pipeline = self.new_pipeline(self.copy_file)
+
+            def link_previous(rel_path):
+                target = os.path.join(work, rel_path)
+                with metrics.timer("mkdir"):
+                    dirs.ensure(os.path.dirname(target))
+                with metrics.timer("metadata"):
+                    os.link(os.path.join(prev_path, rel_path), target)
+
+            def collect(results):
+                nonlocal count, failed
+                for result in results:
+                    rel_path, st = result.tag
+                    if result.error is not None:
+                        failed += 1
+                        metrics.count("failed")
+                        self.log(f"⚠ Fehler beim Kopieren von {result.src}: {result.error}")
+                        if prev_path:
+                            # Wenigstens die vorherige Version im Snapshot behalten
+                            try:
+                                link_previous(rel_path)
+                            except OSError:
+                                pass
+                        continue
+                    strategy, digest = result.info
+                    index.record(rel_path, st, digest)
+                    strategies[strategy] += 1
+                    count += 1
+                    metrics.count("changed")
+
+            try:
+                if prev_path:
+                    changed_paths = {rel_path for rel_path, _, _ in changed}
+                    for rel_path in index.entries:
+                        if rel_path in changed_paths or rel_path in removed:
+                            continue
+                        try:
+                            link_previous(rel_path)
+                            linked += 1
+                            metrics.count("unchanged")
+                        except OSError:
+                            # Im letzten Snapshot nicht (mehr) vorhanden: neu aus der Quelle kopieren
+                            src_file = os.path.join(src, rel_path)
+                            try:
+                                changed.append((rel_path, src_file, os.stat(src_file)))
+                            except OSError:
+                                pass
+
+                for rel_path, src_file, st in changed:
+                    dst_file = os.path.join(work, rel_path)
+                    with metrics.timer("mkdir"):
+                        dirs.ensure(os.path.dirname(dst_file))
+                    pipeline.submit(src_file, dst_file, st.st_size, (rel_path, st))
+                    collect(pipeline.drain())
+            finally:
+                collect(pipeline.finish())
+            store.finish(name)
+            completed = True
+        finally:
+            if completed:
+                index.commit(prune=True, paths=paths)
+            else:
+                if name:
+                    store.abort(name)
+                index.rollback()
+            index.close()
+
+        self.last_backup_count = count
+        self.last_backup_failed = failed
+        summary = f"✅ Snapshot {name} angelegt. {count} Dateien kopiert, {linked} verlinkt."
+        if failed:
+            summary += f" {failed} Fehler."
+        self.log(summary)
+        self.log_strategies(strategies)
+
+    def perform_chunk_backup(self, paths=None):
+        """Backup in den deduplizierenden Chunk-Store; jeder Lauf mit Änderungen wird ein Snapshot"""
+        from autobackup.chunkstore import ChunkStore
+
+        src = self.config.source_dir
+        store = ChunkStore(self.config.backup_dir)
+        previous = (store.load_latest() or {}).get("files", {})
+        # Bei Teil-Scans (Watch-Modus) bleiben alle Einträge außerhalb der gescannten Pfade erhalten
+        files = {} if paths is None else {rel_path: entry for rel_path, entry in previous.items()
+                                          if not in_scope(rel_path, paths)}
+        # Bereits zerlegte Dateien eines abgebrochenen Laufs nicht erneut lesen
+        partial = store.load_partial() if paths is None else {}
+        completed = {}
+        count = 0
+        unchanged = 0
+        failed = 0
+        written = 0
+        metrics = self.metrics
+        next_checkpoint = time.monotonic() + self.config.checkpoint_interval
+
+        def store_file(src_file, _):
+            throttle = self.throttle if self.throttle.active else None
+            if throttle:
+                throttle.file()
+            start = time.perf_counter()
+            digests, new_bytes = store.store_file(src_file, throttle)
+            seconds = time.perf_counter() - start
+            metrics.add_phase("copy", seconds)
+            metrics.record_copy(os.path.getsize(src_file), new_bytes, seconds)
+            return digests, new_bytes
+
+        pipeline = self.new_pipeline(store_file)
+
+        def collect(results):
+            nonlocal count, failed, written
+            for result in results:
+                rel_path, st = result.tag
+                if result.error is not None:
+                    failed += 1
+                    metrics.count("failed")
+                    self.log(f"⚠ Fehler beim Sichern von {result.src}: {result.error}")
+                    if rel_path in previous:
+                        files[rel_path] = previous[rel_path]
+                    continue
+                digests, new_bytes = result.info
+                files[rel_path] = completed[rel_path] = {
+                    "size": st.st_size,
+                    "mtime_ns": st.st_mtime_ns,
+                    "inode": st.st_ino,
+                    "mode": st.st_mode,
+                    "chunks": digests,
+                }
+                written += new_bytes
+                count += 1
+                metrics.count("changed")
+
+        scan_complete = False
+        try:
+            for rel_path, src_file, st in self.scan_source(src, paths):
+                if not self.is_running:
+                    break
+                metrics.count("scanned")
+                entry = previous.get(rel_path)
+                if entry and same_stat(entry["size"], entry["mtime_ns"], entry["inode"], st):
+                    files[rel_path] = entry
+                    unchanged += 1
+                    metrics.count("unchanged")
+                    continue
+                entry = partial.get(rel_path)
+                if entry and same_stat(entry["size"], entry["mtime_ns"], entry["inode"], st):
+                    files[rel_path] = completed[rel_path] = entry
+                    count += 1
+                    metrics.count("changed")
+                    continue
+                pipeline.submit(src_file, None, st.st_size, (rel_path, st))
+                collect(pipeline.drain())
+                if paths is None and time.monotonic() >= next_checkpoint:
+                    store.save_partial(completed)
+                    next_checkpoint = time.monotonic() + self.config.checkpoint_interval
+            else:
+                scan_complete = True
+        finally:
+            collect(pipeline.finish())
+            if paths is None and not scan_complete:
+                store.save_partial(completed)
+
+        if not scan_complete:
+            self.last_backup_count = count
+            self.last_backup_failed = failed
+            self.log(f"⛔ Backup unterbrochen nach {count} Dateien; der nächste Lauf setzt dort fort.")
+            return
+
+        # Snapshot erst schreiben, wenn alle Chunks sicher liegen; ohne Änderungen keinen neuen anlegen
+        if files != previous:
+            name = store.write_snapshot(src, files)
+            self.log(f"📦 Snapshot {name} gespeichert.")
+        if paths is None:
+            store.clear_partial()
+        self.last_backup_count = count
+        self.last_backup_failed = failed
+        summary = (f"✅ Backup abgeschlossen. {count} Dateien gesichert, {unchanged} unverändert, "
+                   f"{written / (1024 * 1024):.1f} MB neu gespeichert.")
+        if failed:
+            summary += f" {failed} Fehler."
+        self.log(summary)
+
+    def perform_pack_backup(self, paths=None):
+        """Backup auf ein Speicher-Backend (Ordner oder S3); kleine Dateien werden zu Pack-Dateien gebündelt"""
+        from autobackup.packs import PackStore
+        from autobackup.storage import open_backend
+        from autobackup.transform import Transform
+
+        src = self.config.source_dir
+        # Vor dem Öffnen des Backends: fehlende Pakete oder Schlüssel sollen nichts anlegen
+        transform = Transform.from_config(self.config)
+        backend = open_backend(self.config)
+        store = PackStore(backend, os.path.join(self.config.backup_dir, INDEX_DIR),
+                          self.config.pack_size, self.config.pack_threshold, transform)
+        try:
+            previous = (store.load_latest() or {}).get("files", {})
+            # Bei Teil-Scans (Watch-Modus) bleiben alle Einträge außerhalb der gescannten Pfade erhalten
+            files = {} if paths is None else {rel_path: entry for rel_path, entry in previous.items()
+                                              if not in_scope(rel_path, paths)}
+            # Bereits hochgeladene Dateien eines abgebrochenen Laufs nicht erneut senden
+            partial = store.load_partial() if paths is None else {}
+            completed = {}
+            count = 0
+            unchanged = 0
+            failed = 0
+            uploaded = 0
+            read = 0
+            metrics = self.metrics
+            next_checkpoint = time.monotonic() + self.config.checkpoint_interval
+
+            def store_file(src_file, item):
+                rel_path, st = item
+                throttle = self.throttle if self.throttle.active else None
+                if throttle:
+                    throttle.file()
+                start = time.perf_counter()
+                stored, done = store.store_file(rel_path, src_file, st, throttle)
+                seconds = time.perf_counter() - start
+                metrics.add_phase("copy", seconds)
+                # Geschrieben = nach Kompression; der Unterschied zu "gelesen" ist die Ersparnis
+                metrics.record_copy(st.st_size, stored, seconds)
+                return done
+
+            pipeline = self.new_pipeline(store_file)
+
+            def finish(done):
+                nonlocal count, failed, uploaded, read
+                for rel_path, entry, error in done:
+                    if error is not None:
+                        failed += 1
+                        metrics.count("failed")
+                        self.log(f"⚠ Fehler beim Hochladen von {rel_path}: {error}")
+                        if rel_path in previous:
+                            files[rel_path] = previous[rel_path]
+                        continue
+                    files[rel_path] = completed[rel_path] = entry
+                    uploaded += entry["length"]
+                    read += entry["size"]
+                    count += 1
+                    metrics.count("changed")
+
+            def collect(results):
+                nonlocal failed
+                for result in results:
+                    if result.error is not None:
+                        rel_path, _ = result.tag
+                        failed += 1
+                        metrics.count("failed")
+                        self.log(f"⚠ Fehler beim Sichern von {result.src}: {result.error}")
+                        if rel_path in previous:
+                            files[rel_path] = previous[rel_path]
+                        continue
+                    finish(result.info)
+
+            scan_complete = False
+            try:
+                for rel_path, src_file, st in self.scan_source(src, paths):
+                    if not self.is_running:
+                        break
+                    metrics.count("scanned")
+                    entry = previous.get(rel_path)
+                    if entry and same_stat(entry["size"], entry["mtime_ns"], entry["inode"], st):
+                        files[rel_path] = entry
+                        unchanged += 1
+                        metrics.count("unchanged")
+                        continue
+                    entry = partial.get(rel_path)
+                    if entry and same_stat(entry["size"], entry["mtime_ns"], entry["inode"], st):
+                        files[rel_path] = completed[rel_path] = entry
+                        count += 1
+                        metrics.count("changed")
+                        continue
+                    pipeline.submit(src_file, (rel_path, st), st.st_size, (rel_path, st))
+                    collect(pipeline.drain())
+                    if paths is None and time.monotonic() >= next_checkpoint:
+                        store.save_partial(completed)
+                        next_checkpoint = time.monotonic() + self.config.checkpoint_interval
+                else:
+                    scan_complete = True
+            finally:
+                collect(pipeline.finish())
+                # Das angefangene Pack auch bei einem Abbruch hochladen, damit der nächste Lauf es weiterverwendet
+                finish(store.flush())
+                if paths is None and not scan_complete:
+                    store.save_partial(completed)
+
+            self.last_backup_count = count
+            self.last_backup_failed = failed
+            if not scan_complete:
+                self.log(f"⛔ Backup unterbrochen nach {count} Dateien; der nächste Lauf setzt dort fort.")
+                return
+            # Manifest erst schreiben, wenn alle Packs sicher liegen; ohne Änderungen keines anlegen
+            if files != previous:
+                name = store.write_manifest(src, files)
+                self.log(f"📦 Manifest {name} gespeichert.")
+            if paths is None:
+                store.clear_partial()
+        finally:
+            backend.close()
+        summary = (f"✅ Backup abgeschlossen. {count} Dateien gesichert, {unchanged} unverändert, "
+                   f"{uploaded / (1024 * 1024):.1f} MB hochgeladen")
+        if uploaded != read:
+            summary += f" ({read / (1024 * 1024):.1f} MB vor Kompression)"
+        summary += "."
+        if failed:
+            summary += f" {failed} Fehler."
+        self.log(summary)
+
+    def log_strategies(self, strategies):
+        if strategies:
+            self.log("ℹ Kopierstrategie: " + ", ".join(f"{strategy} {n}" for strategy, n in strategies.most_common()))
+
+    def copy_to_targets(self, src_file, dst_files):
+        """Eine Datei in ein oder mehrere Ziele kopieren; liefert Strategie, Hash und den Fehler pro Ziel
+
+        Mehrere Ziele werden aus einem einzigen Lesevorgang beschrieben (siehe autobackup.fanout).
+        """
+        if len(dst_files) == 1:
+            strategy, digest = self.copy_file(src_file, dst_files[0])
+            return strategy, digest, [None]
+        from autobackup.fanout import fan_out_copy
+
+        metrics = self.metrics
+        throttle = self.throttle if self.throttle.active else None
+        if throttle:
+            throttle.file()
+        tmp_files = [dst_file + TEMP_SUFFIX for dst_file in dst_files]
+        start = time.perf_counter()
+        try:
+            outcomes, read, digest = fan_out_copy(src_file, tmp_files, self.config.fanout_buffer, throttle,
+                                                  self.config.index_hash)
+        except BaseException:
+            # Quelle nicht lesbar: kein Ziel bekommt die Datei
+            outcomes = None
+            raise
+        finally:
+            # Erfolgreiche Ziele unter den echten Namen, angefangene wieder entfernen
+            for i, (tmp_file, dst_file) in enumerate(zip(tmp_files, dst_files)):
+                if outcomes is not None and outcomes[i] is None:
+                    try:
+                        os.replace(tmp_file, dst_file)
+                        continue
+                    except OSError as e:
+                        outcomes[i] = e
+                try:
+                    os.remove(tmp_file)
+                except OSError:
+                    pass
+        seconds = time.perf_counter() - start
+        metrics.add_phase("copy", seconds)
+        metrics.record_copy(read, read * outcomes.count(None), seconds)
+        return "fanout", digest, outcomes
+
+    def copy_file(self, src_file, dst_file):
+        """Eine Datei kopieren (läuft im Worker-Pool); liefert Strategie und optional den Hash für den Index"""
+        from autobackup.fastcopy import copy_file
+
+        metrics = self.metrics
+        throttle = self.throttle if self.throttle.active else None
+        if throttle:
+            throttle.file()
+        strategy = None
+        if self.signatures is not None:
+            from autobackup.delta import delta_copy
+
+            start = time.perf_counter()
+            written = delta_copy(src_file, dst_file, self.signatures, self.config.delta_threshold, throttle=throttle)
+            if written is not None:
+                strategy = "delta"
+                seconds = time.perf_counter() - start
+                metrics.add_phase("copy", seconds)
+                metrics.record_copy(os.path.getsize(src_file), written, seconds)
+        if strategy is None:
+            # Unter temporärem Namen schreiben: ein Abbruch hinterlässt nie eine halbe Datei unter dem echten Namen.
+            # Delta schreibt dagegen an Ort und Stelle, wird aber bei einem Abbruch im nächsten Lauf wiederholt,
+            # weil der Index erst nach Abschluss aktualisiert wird.
+            tmp_file = dst_file + TEMP_SUFFIX
+            try:
+                strategy = copy_file(src_file, tmp_file, metrics, throttle)
+                os.replace(tmp_file, dst_file)
+            except BaseException:
+                try:
+                    os.remove(tmp_file)
+                except OSError:
+                    pass
+                raise
+        if not self.config.index_hash:
+            return strategy, None
+        with metrics.timer("hash"):
+            return strategy, file_digest(dst_file)
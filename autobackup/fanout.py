@@ -0,0 +1,146 @@
+"""Einmal lesen, mehrfach schreiben: eine Quelldatei gleichzeitig in mehrere Backup-Ziele kopieren."""
+import hashlib
+import os
+import queue
+import shutil
+import threading
+import time
+
+from autobackup.config import DEFAULT_FANOUT_BUFFER
+from autobackup.fastcopy import is_sparse, preallocate
+
+CHUNK_SIZE = 4 * 1024 * 1024
+OPEN_FLAGS = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0)
+
+
+def _write_all(fd, view):
+    while view:
+        view = view[os.write(fd, view):]
+
+
+def _size_changed(size, expected):
+    return ValueError(f"Quelle hat sich beim Kopieren geändert ({size} statt {expected} Bytes gelesen)")
+
+
+class TargetWriter:
+    """Schreibt einen Blockstrom in eine Zieldatei, in eigenem Thread mit begrenztem Puffer.
+
+    Blöcke sind bytes oder eine Zahl (Länge einer Lücke), None beendet den Strom.
+    Ein langsames Ziel hält den Leser erst auf, wenn sein Puffer voll ist; ein
+    fehlgeschlagenes Ziel verwirft den Rest, damit die übrigen Ziele weiterlaufen.
+    """
+
+    def __init__(self, path, size, max_chunks, reserve=True):
+        self.path = path
+        self.size = size
+        self.reserve = reserve
+        self.queue = queue.Queue(max(1, max_chunks))
+        self.error = None
+        self.thread = threading.Thread(target=self.run, name="backup-fanout", daemon=True)
+        self.thread.start()
+
+    def put(self, chunk):
+        if self.error is None:
+            self.queue.put(chunk)
+
+    def finish(self):
+        self.queue.put(None)
+        self.thread.join()
+        return self.error
+
+    def run(self):
+        finished = False
+        try:
+            fd = os.open(self.path, OPEN_FLAGS, 0o666)
+            try:
+                if self.reserve:
+                    preallocate(fd, self.size)
+                position = 0
+                while True:
+                    chunk = self.queue.get()
+                    if chunk is None:
+                        finished = True
+                        break
+                    if isinstance(chunk, int):
+                        os.lseek(fd, chunk, os.SEEK_CUR)
+                        position += chunk
+                    else:
+                        _write_all(fd, memoryview(chunk))
+                        position += len(chunk)
+                # Auf das tatsächlich Geschriebene kürzen; setzt auch die Größe, wenn die Datei mit einer Lücke endet
+                os.ftruncate(fd, position)
+                if position != self.size:
+                    raise _size_changed(position, self.size)
+            finally:
+                os.close(fd)
+        except Exception as e:
+            self.error = e
+            # Restliche Blöcke verwerfen, damit der Leser nicht an diesem Ziel hängen bleibt
+            while not finished:
+                finished = self.queue.get() is None
+
+
+def _write_file(path, data):
+    fd = os.open(path, OPEN_FLAGS, 0o666)
+    try:
+        _write_all(fd, memoryview(data))
+    finally:
+        os.close(fd)
+
+
+def fan_out_copy(src, dsts, buffer_size=DEFAULT_FANOUT_BUFFER, throttle=None, digest=False):
+    """Quelle einmal lesen und in alle Ziele schreiben, samt Metadaten (wie shutil.copy2)
+
+    Liefert (Fehler pro Ziel bzw. None bei Erfolg, gelesene Bytes, BLAKE2b-Hash oder None).
+    Lesefehler der Quelle werden ausgelöst; angefangene Ziele räumt der Aufrufer weg.
+    """
+    errors = [None] * len(dsts)
+    h = hashlib.blake2b(digest_size=32) if digest else None
+    read = 0
+    with open(src, "rb", buffering=0) as f:
+        st = os.fstat(f.fileno())
+        if st.st_size <= CHUNK_SIZE:
+            # Kleine Datei: einmal lesen und nacheinander schreiben, ohne eigene Threads
+            start = time.perf_counter()
+            data = f.read()
+            if throttle:
+                throttle.data(len(data), time.perf_counter() - start)
+            if h is not None:
+                h.update(data)
+            read = len(data)
+            for i, dst in enumerate(dsts):
+                if read != st.st_size:
+                    errors[i] = _size_changed(read, st.st_size)
+                    continue
+                try:
+                    _write_file(dst, data)
+                except OSError as e:
+                    errors[i] = e
+        else:
+            sparse = is_sparse(st)
+            writers = [TargetWriter(dst, st.st_size, buffer_size // CHUNK_SIZE, not sparse) for dst in dsts]
+            try:
+                while True:
+                    start = time.perf_counter()
+                    data = f.read(CHUNK_SIZE)
+                    if not data:
+                        break
+                    if throttle:
+                        throttle.data(len(data), time.perf_counter() - start)
+                    if h is not None:
+                        h.update(data)
+                    read += len(data)
+                    # Lücken lückenhafter Quellen nur überspringen statt Nullen zu schreiben
+                    chunk = len(data) if sparse and data.count(0) == len(data) else data
+                    for writer in writers:
+                        writer.put(chunk)
+            finally:
+                for i, writer in enumerate(writers):
+                    errors[i] = writer.finish()
+    for i, dst in enumerate(dsts):
+        if errors[i] is None:
+            try:
+                shutil.copystat(src, dst)
+            except OSError as e:
+                errors[i] = e
+    return errors, read, h.hexdigest() if h is not None else None
@@ -0,0 +1,221 @@
+"""Kopier-Backend mit Kernel-Kopierpfaden (Reflink, copy_file_range, sendfile)."""
+import ctypes
+import ctypes.util
+import errno
+import os
+import shutil
+import sys
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+FICLONE = 0x40049409  # _IOW(0x94, 9, int) aus <linux/fs.h>
+BUFFER_SIZE = 8 * 1024 * 1024
+CHUNK_SIZE = 1024 * 1024 * 1024
+PREALLOCATE_SIZE = 16 * 1024 * 1024  # größere, nicht lückenhafte Ziele vorab am Stück reservieren
+FALLOC_FL_KEEP_SIZE = 1  # nur Blöcke reservieren, Dateigröße wächst erst beim Schreiben
+
+STRATEGIES = ("reflink", "sparse", "copy_file_range", "sendfile", "buffer")
+
+# Fehler, bei denen eine Strategie auf diesem Dateisystem-Paar nicht funktioniert
+UNSUPPORTED_ERRNOS = {
+    errno.EXDEV, errno.EINVAL, errno.ENOSYS, errno.ENOTTY, errno.EBADF, errno.EPERM,
+    getattr(errno, "EOPNOTSUPP", errno.ENOTSUP), errno.ENOTSUP,
+}
+
+# (Strategie, Quell-Gerät, Ziel-Gerät), die bereits fehlgeschlagen sind
+_unsupported = set()
+_fallocate = None
+
+
+def is_sparse(st):
+    """Datei belegt weniger Blöcke als ihre Größe: enthält Lücken (nur wo st_blocks existiert)"""
+    return getattr(st, "st_blocks", None) is not None and st.st_blocks * 512 < st.st_size
+
+
+def _load_fallocate():
+    # fallocate(2) statt os.posix_fallocate: glibc emuliert letzteres auf Dateisystemen ohne
+    # Unterstützung durch Schreiben jedes Blocks, was die Schreiblast verdoppeln würde
+    global _fallocate
+    if _fallocate is None:
+        _fallocate = False
+        if sys.platform.startswith("linux"):
+            try:
+                libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+                func = getattr(libc, "fallocate64", None) or libc.fallocate
+                func.argtypes = (ctypes.c_int, ctypes.c_int, ctypes.c_longlong, ctypes.c_longlong)
+                _fallocate = func
+            except (OSError, AttributeError):
+                pass
+    return _fallocate
+
+
+def preallocate(fd, size):
+    """Zielgröße vorab reservieren, damit große Dateien nicht fragmentieren; ohne Unterstützung stillschweigend nicht"""
+    if size < PREALLOCATE_SIZE:
+        return False
+    fallocate = _load_fallocate()
+    if not fallocate:
+        return False
+    return fallocate(fd, FALLOC_FL_KEEP_SIZE, 0, size) == 0
+
+
+def _reflink(fsrc, fdst, size, throttle=None):
+    # Teilt nur Blöcke, liest keine Daten: wird nicht gedrosselt
+    fcntl.ioctl(fdst, FICLONE, fsrc)
+
+
+def _data_extents(fd, size):
+    """(Anfang, Ende) der belegten Bereiche einer Datei über SEEK_DATA/SEEK_HOLE"""
+    offset = 0
+    while offset < size:
+        try:
+            start = os.lseek(fd, offset, os.SEEK_DATA)
+        except OSError as e:
+            if e.errno == errno.ENXIO:  # nur noch eine Lücke bis zum Dateiende
+                return
+            raise
+        end = min(os.lseek(fd, start, os.SEEK_HOLE), size)
+        yield start, end
+        offset = end
+
+
+def _sparse(fsrc, fdst, size, throttle=None):
+    # Nur belegte Bereiche an dieselbe Position kopieren; Lücken bleiben im Ziel Lücken
+    chunk = min(CHUNK_SIZE, throttle.chunk_size) if throttle else CHUNK_SIZE
+    use_range = hasattr(os, "copy_file_range")
+    for start, end in _data_extents(fsrc, size):
+        pos = start
+        while pos < end:
+            begin = time.perf_counter()
+            n = min(chunk if use_range else BUFFER_SIZE, end - pos)
+            if use_range:
+                try:
+                    n = os.copy_file_range(fsrc, fdst, n, pos, pos)
+                except OSError as e:
+                    if e.errno not in UNSUPPORTED_ERRNOS:
+                        raise
+                    use_range = False
+                    continue
+            else:
+                data = os.pread(fsrc, n, pos)
+                n = len(data)
+                view = memoryview(data)
+                offset = pos
+                while view:
+                    written = os.pwrite(fdst, view, offset)
+                    view = view[written:]
+                    offset += written
+            if n == 0:
+                break
+            pos += n
+            if throttle:
+                throttle.data(n, time.perf_counter() - begin)
+    os.ftruncate(fdst, size)
+
+
+def _copy_file_range(fsrc, fdst, size, throttle=None):
+    chunk = min(CHUNK_SIZE, throttle.chunk_size) if throttle else CHUNK_SIZE
+    copied = 0
+    while copied < size:
+        start = time.perf_counter()
+        n = os.copy_file_range(fsrc, fdst, min(chunk, size - copied))
+        if n == 0:
+            break
+        copied += n
+        if throttle:
+            throttle.data(n, time.perf_counter() - start)
+
+
+def _sendfile(fsrc, fdst, size, throttle=None):
+    chunk = min(CHUNK_SIZE, throttle.chunk_size) if throttle else CHUNK_SIZE
+    copied = 0
+    while copied < size:
+        start = time.perf_counter()
+        n = os.sendfile(fdst, fsrc, copied, min(chunk, size - copied))
+        if n == 0:
+            break
+        copied += n
+        if throttle:
+            throttle.data(n, time.perf_counter() - start)
+
+
+def _buffered(fsrc, fdst, size, throttle=None):
+    while True:
+        start = time.perf_counter()
+        data = os.read(fsrc, BUFFER_SIZE)
+        if not data:
+            break
+        if throttle:
+            throttle.data(len(data), time.perf_counter() - start)
+        _write_all(fdst, memoryview(data))
+
+
+def _write_all(fd, view):
+    while view:
+        view = view[os.write(fd, view):]
+
+
+def _candidates(sparse=False):
+    if sys.platform.startswith("linux"):
+        if fcntl is not None:
+            yield "reflink", _reflink
+        if sparse and hasattr(os, "SEEK_DATA"):
+            yield "sparse", _sparse
+        if hasattr(os, "copy_file_range"):
+            yield "copy_file_range", _copy_file_range
+        if hasattr(os, "sendfile"):
+            yield "sendfile", _sendfile
+
+
+def copy_data(fsrc, fdst, size, devices=None, throttle=None):
+    """Dateiinhalt zwischen zwei Dateideskriptoren kopieren; liefert die verwendete Strategie
+
+    Mit throttle (siehe autobackup.throttle) wird nach jedem Block gebremst.
+    Lückenhafte Quellen bleiben im Ziel lückenhaft, große dichte Ziele werden vorab reserviert.
+    """
+    sparse = is_sparse(os.fstat(fsrc))
+    for name, func in _candidates(sparse):
+        key = (name,) + tuple(devices or ())
+        if devices and key in _unsupported:
+            continue
+        try:
+            if name != "reflink" and not sparse:
+                preallocate(fdst, size)
+            func(fsrc, fdst, size, throttle)
+            return name
+        except OSError as e:
+            if e.errno not in UNSUPPORTED_ERRNOS:
+                raise
+            if devices:
+                _unsupported.add(key)
+            # Teilweise kopierte Daten verwerfen und mit der nächsten Strategie neu beginnen
+            os.lseek(fsrc, 0, os.SEEK_SET)
+            os.lseek(fdst, 0, os.SEEK_SET)
+            os.ftruncate(fdst, 0)
+    if not sparse:
+        preallocate(fdst, size)
+    _buffered(fsrc, fdst, size, throttle)
+    return "buffer"
+
+
+def copy_file(src, dst, metrics=None, throttle=None):
+    """Datei samt Metadaten kopieren (wie shutil.copy2); liefert die verwendete Strategie
+
+    Mit metrics (RunMetrics) werden Kopier- und Metadatenzeit sowie die Bytes erfasst.
+    """
+    start = time.perf_counter()
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        st_src = os.fstat(fsrc.fileno())
+        st_dst = os.fstat(fdst.fileno())
+        strategy = copy_data(fsrc.fileno(), fdst.fileno(), st_src.st_size, (st_src.st_dev, st_dst.st_dev), throttle)
+    copied = time.perf_counter()
+    shutil.copystat(src, dst)
+    if metrics is not None:
+        metrics.add_phase("copy", copied - start)
+        metrics.add_phase("metadata", time.perf_counter() - copied)
+        metrics.record_copy(st_src.st_size, st_src.st_size, copied - start)
+    return strategy
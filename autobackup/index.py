@@ -0,0 +1,176 @@
+"""Persistenter Änderungs-Index für inkrementelle Backups."""
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+from autobackup.scan import in_scope
+
+INDEX_DIR = ".autobackup"
+INDEX_FILE = "index.sqlite"
+
+
+def file_digest(path, block_size=8 * 1024 * 1024, throttle=None, new_hash=None):
+    """Berechne den BLAKE2b-Hash einer Datei
+
+    Große Blöcke per readinto in einen wiederverwendeten Puffer; hashlib gibt
+    dabei die GIL frei, sodass mehrere Worker-Threads parallel hashen.
+    new_hash liefert statt BLAKE2b einen anderen Hash (z.B. mit Schlüssel, Format packs).
+    """
+    h = new_hash() if new_hash is not None else hashlib.blake2b(digest_size=32)
+    with open(path, "rb", buffering=0) as f:
+        buf = bytearray(max(1, min(block_size, os.fstat(f.fileno()).st_size + 1)))
+        view = memoryview(buf)
+        while True:
+            start = time.perf_counter()
+            n = f.readinto(buf)
+            if not n:
+                break
+            if throttle:
+                throttle.data(n, time.perf_counter() - start)
+            h.update(view[:n])
+    return h.hexdigest()
+
+
+def same_stat(size, mtime_ns, inode, st):
+    """Gespeicherte Werte gegen ein stat-Ergebnis prüfen
+
+    Inode 0 gilt als unbekannt: unter Windows liefert DirEntry.stat() beim Scan
+    keine Inode-Nummer, os.stat() dagegen schon.
+    """
+    return (size == st.st_size and mtime_ns == st.st_mtime_ns
+            and (not inode or not st.st_ino or inode == st.st_ino))
+
+
+def prefix_bounds(prefix):
+    """Grenzen für eine Bereichsabfrage aller Pfade unterhalb von prefix (Trenner + 1 als Obergrenze)"""
+    base = prefix.rstrip(os.sep) + os.sep
+    return base, base[:-1] + chr(ord(os.sep) + 1)
+
+
+def query_prefix(backup_dir, prefix="", name=INDEX_FILE):
+    """(Pfad, Größe, Hash) aller Index-Einträge unter prefix, ohne den ganzen Index zu laden"""
+    path = os.path.join(backup_dir, INDEX_DIR, name)
+    if not os.path.isfile(path):
+        return
+    conn = sqlite3.connect(path)
+    try:
+        if not prefix:
+            rows = conn.execute("SELECT path, size, hash FROM files ORDER BY path")
+        else:
+            low, high = prefix_bounds(prefix)
+            # Über den Primärschlüssel: die Datei selbst oder alles im Bereich [prefix/, prefix0)
+            rows = conn.execute(
+                "SELECT path, size, hash FROM files WHERE path = ? OR (path >= ? AND path < ?) ORDER BY path",
+                (prefix, low, high))
+        yield from rows
+    finally:
+        conn.close()
+
+
+def query_paths(backup_dir, paths, name=INDEX_FILE, batch=500):
+    """(Pfad, Größe, Hash) für eine Liste relativer Pfade; unbekannte Pfade fehlen im Ergebnis"""
+    path = os.path.join(backup_dir, INDEX_DIR, name)
+    if not os.path.isfile(path):
+        return
+    paths = list(paths)
+    conn = sqlite3.connect(path)
+    try:
+        for i in range(0, len(paths), batch):
+            part = paths[i:i + batch]
+            yield from conn.execute(
+                f"SELECT path, size, hash FROM files WHERE path IN ({', '.join('?' * len(part))})", part)
+    finally:
+        conn.close()
+
+
+class FileIndex:
+    """Manifest mit Größe, mtime_ns, Inode und optionalem Hash pro relativem Pfad.
+
+    Der Index liegt als SQLite-Datei im Backup-Ordner. Pro Durchlauf wird der
+    Scan gegen den Index verglichen, sodass unveränderte Dateien nur einen
+    einzigen stat-Aufruf kosten und nicht kopiert werden.
+    """
+
+    def __init__(self, backup_dir, name=INDEX_FILE):
+        self.path = os.path.join(backup_dir, INDEX_DIR, name)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS files ("
+            " path TEXT PRIMARY KEY,"
+            " size INTEGER NOT NULL,"
+            " mtime_ns INTEGER NOT NULL,"
+            " inode INTEGER NOT NULL,"
+            " hash TEXT"
+            ") WITHOUT ROWID")
+        # Fortschritt eines unterbrochenen Laufs; wird zusammen mit den Index-Einträgen festgeschrieben
+        self.conn.execute("CREATE TABLE IF NOT EXISTS journal (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self.entries = {
+            row[0]: row[1:]
+            for row in self.conn.execute("SELECT path, size, mtime_ns, inode, hash FROM files")
+        }
+        self.pending = {}
+        self.seen = set()
+
+    def is_changed(self, rel_path, st):
+        """Prüfe anhand eines stat-Ergebnisses, ob die Datei neu oder geändert ist"""
+        self.seen.add(rel_path)
+        entry = self.entries.get(rel_path)
+        if entry is None:
+            return True
+        size, mtime_ns, inode, _ = entry
+        return not same_stat(size, mtime_ns, inode, st)
+
+    def get(self, rel_path):
+        return self.entries.get(rel_path)
+
+    def record(self, rel_path, st, digest=None):
+        """Merke eine erfolgreich gesicherte Datei für den nächsten commit()"""
+        self.pending[rel_path] = (st.st_size, st.st_mtime_ns, st.st_ino, digest)
+
+    def removed(self, paths=None):
+        """Nicht mehr gesehene Pfade; bei einem Teil-Scan nur die innerhalb der gescannten Pfade"""
+        return [path for path in self.entries
+                if path not in self.seen and (paths is None or in_scope(path, paths))]
+
+    def commit(self, prune=False, paths=None):
+        """Schreibe vorgemerkte Einträge; mit prune=True werden nicht mehr gesehene Pfade (unter paths) entfernt"""
+        if self.pending:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO files (path, size, mtime_ns, inode, hash) VALUES (?, ?, ?, ?, ?)",
+                [(path,) + values for path, values in self.pending.items()])
+            self.entries.update(self.pending)
+            self.pending = {}
+        if prune:
+            removed = self.removed(paths)
+            if removed:
+                self.conn.executemany("DELETE FROM files WHERE path = ?", [(path,) for path in removed])
+                for path in removed:
+                    del self.entries[path]
+        self.conn.commit()
+
+    def checkpoint(self, state):
+        """Bisher gesicherte Einträge und den Lauf-Fortschritt (JSON-fähig) in einer Transaktion schreiben"""
+        self.conn.execute("INSERT OR REPLACE INTO journal (key, value) VALUES ('run', ?)", (json.dumps(state),))
+        self.commit()
+
+    def load_journal(self):
+        row = self.conn.execute("SELECT value FROM journal WHERE key = 'run'").fetchone()
+        return json.loads(row[0]) if row else None
+
+    def clear_journal(self):
+        """Lauf ist vollständig; wird mit dem nächsten commit() wirksam"""
+        self.conn.execute("DELETE FROM journal")
+
+    def rollback(self):
+        """Vorgemerkte Einträge verwerfen (z.B. wenn der Lauf abgebrochen wurde)"""
+        self.pending = {}
+        self.conn.rollback()
+
+    def close(self):
+        self.commit()
+        self.conn.close()
@@ -0,0 +1,59 @@
+"""Thread-sichere Log-Senke: begrenzter Puffer für die GUI und rotierende Log-Datei."""
+import collections
+import logging
+import logging.handlers
+import queue
+
+DEFAULT_LOG_FILE = "backup.log"
+DEFAULT_MAX_BYTES = 5 * 1024 * 1024
+DEFAULT_BACKUP_COUNT = 5
+DEFAULT_MAX_LINES = 1000
+
+
+class LogSink:
+    """Nimmt Meldungen aus beliebigen Threads an, ohne den Kopierpfad zu bremsen.
+
+    Die GUI holt sich die Meldungen gebündelt per drain() ab; der Puffer ist
+    auf max_lines begrenzt, ältere Meldungen fallen heraus. Alle Meldungen
+    landen zusätzlich über einen eigenen Thread in einer rotierenden Datei.
+    """
+
+    def __init__(self, log_file=DEFAULT_LOG_FILE, max_lines=DEFAULT_MAX_LINES,
+                 max_bytes=DEFAULT_MAX_BYTES, backup_count=DEFAULT_BACKUP_COUNT):
+        self.buffer = collections.deque(maxlen=max_lines)
+        self.listener = None
+        self.logger = logging.getLogger(f"autobackup.{id(self)}")
+        self.logger.propagate = False
+        self.logger.setLevel(logging.INFO)
+        if log_file:
+            handler = logging.handlers.RotatingFileHandler(
+                log_file, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8", delay=True)
+            handler.setFormatter(logging.Formatter("%(asctime)s %(message)s", "%Y-%m-%d %H:%M:%S"))
+            records = queue.SimpleQueue()
+            self.logger.addHandler(logging.handlers.QueueHandler(records))
+            self.listener = logging.handlers.QueueListener(records, handler)
+            self.listener.start()
+
+    def emit(self, message):
+        """Meldung ablegen (thread-sicher, blockiert nie)"""
+        record = self.logger.makeRecord(self.logger.name, logging.INFO, "", 0, message, None, None)
+        self.buffer.append((record.created, message))
+        if self.listener is not None:
+            self.logger.handle(record)
+
+    def drain(self, max_records=None):
+        """Bis zu max_records gepufferte Meldungen als Liste (Zeitstempel, Text) entnehmen"""
+        records = []
+        while self.buffer and (max_records is None or len(records) < max_records):
+            try:
+                records.append(self.buffer.popleft())
+            except IndexError:
+                break
+        return records
+
+    def close(self):
+        if self.listener is not None:
+            self.listener.stop()
+            for handler in self.listener.handlers:
+                handler.close()
+            self.listener = None
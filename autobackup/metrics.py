@@ -0,0 +1,189 @@
+"""Kennzahlen pro Backup-Lauf: Phasen-Timer, Zähler, Durchsatz und Export (JSONL, Prometheus)."""
+import json
+import os
+import re
+import threading
+import time
+
+PHASES = ("scan", "compare", "mkdir", "copy", "metadata", "hash")
+QUANTILES = (0.5, 0.9, 0.99)
+METRICS_FILE = "metrics.jsonl"
+HISTORY_MAX_BYTES = 16 * 1024 * 1024
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    pos = min(len(sorted_values) - 1, max(0, round(q * (len(sorted_values) - 1))))
+    return sorted_values[pos]
+
+
+class PhaseTimer:
+    """with metrics.timer("compare"): ... addiert die Wandzeit des Blocks zur Phase"""
+
+    __slots__ = ("metrics", "phase", "start")
+
+    def __init__(self, metrics, phase):
+        self.metrics = metrics
+        self.phase = phase
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc):
+        self.metrics.add_phase(self.phase, time.perf_counter() - self.start)
+
+
+def timed(iterable, metrics, phase):
+    """Iterator durchreichen und die Zeit in next() (z.B. scandir/stat) der Phase zuschreiben"""
+    clock = time.perf_counter
+    it = iter(iterable)
+    total = 0.0
+    try:
+        while True:
+            start = clock()
+            try:
+                item = next(it)
+            except StopIteration:
+                total += clock() - start
+                return
+            total += clock() - start
+            yield item
+    finally:
+        metrics.add_phase(phase, total)
+
+
+class RunMetrics:
+    """Sammelt Kennzahlen eines Laufs; add_* und record_* sind aus Worker-Threads aufrufbar.
+
+    scan, compare und mkdir laufen im Scan-Thread und ergeben Wandzeit; copy und
+    metadata werden über alle Worker aufsummiert (Thread-Sekunden).
+    """
+
+    def __init__(self, job, backup_format, interval=None):
+        self.job = job
+        self.backup_format = backup_format
+        self.interval = interval
+        self.started = time.time()
+        self.start_counter = time.perf_counter()
+        self.duration = None
+        self.lock = threading.Lock()
+        self.phases = dict.fromkeys(PHASES, 0.0)
+        self.files = {"scanned": 0, "changed": 0, "unchanged": 0, "failed": 0}
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.throughputs = []
+
+    def timer(self, phase):
+        return PhaseTimer(self, phase)
+
+    def add_phase(self, phase, seconds):
+        with self.lock:
+            self.phases[phase] += seconds
+
+    def count(self, state, n=1):
+        with self.lock:
+            self.files[state] += n
+
+    def record_copy(self, bytes_read, bytes_written, seconds):
+        with self.lock:
+            self.bytes_read += bytes_read
+            self.bytes_written += bytes_written
+            if seconds > 0 and bytes_read:
+                self.throughputs.append(bytes_read / seconds)
+
+    def finish(self):
+        self.duration = time.perf_counter() - self.start_counter
+
+    def throughput_quantiles(self):
+        values = sorted(self.throughputs)
+        return {str(q): percentile(values, q) for q in QUANTILES}
+
+    def to_dict(self):
+        return {
+            "job": self.job,
+            "format": self.backup_format,
+            "started": self.started,
+            "duration_seconds": self.duration,
+            "interval_seconds": self.interval,
+            "phases_seconds": dict(self.phases),
+            "files": dict(self.files),
+            "bytes_read": self.bytes_read,
+            "bytes_written": self.bytes_written,
+            "throughput_bytes_per_second": self.throughput_quantiles(),
+        }
+
+    def summary(self):
+        phases = ", ".join(f"{name} {seconds:.2f} s" for name, seconds in self.phases.items() if seconds)
+        return f"⏱ Laufzeit {self.duration:.2f} s ({phases or 'keine Arbeit'})"
+
+
+def append_history(path, metrics):
+    """Kennzahlen eines Laufs als eine JSON-Zeile anhängen; große Verläufe werden nach .1 verschoben"""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    try:
+        if os.path.getsize(path) > HISTORY_MAX_BYTES:
+            os.replace(path, path + ".1")
+    except OSError:
+        pass
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(metrics.to_dict(), separators=(",", ":")) + "\n")
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def prometheus_text(metrics):
+    """Kennzahlen im Textformat für den textfile-Collector von node_exporter"""
+    job = f'job="{_escape(metrics.job)}"'
+    lines = [
+        "# HELP autobackup_last_run_timestamp_seconds Startzeit des letzten Backup-Laufs.",
+        "# TYPE autobackup_last_run_timestamp_seconds gauge",
+        f"autobackup_last_run_timestamp_seconds{{{job}}} {metrics.started:.3f}",
+        "# HELP autobackup_run_duration_seconds Dauer des letzten Backup-Laufs.",
+        "# TYPE autobackup_run_duration_seconds gauge",
+        f"autobackup_run_duration_seconds{{{job}}} {metrics.duration or 0:.6f}",
+    ]
+    if metrics.interval:
+        lines += [
+            "# HELP autobackup_interval_seconds Konfiguriertes Backup-Intervall.",
+            "# TYPE autobackup_interval_seconds gauge",
+            f"autobackup_interval_seconds{{{job}}} {metrics.interval}",
+        ]
+    lines += [
+        "# HELP autobackup_phase_duration_seconds Zeit pro Phase im letzten Lauf.",
+        "# TYPE autobackup_phase_duration_seconds gauge",
+    ]
+    lines += [f'autobackup_phase_duration_seconds{{{job},phase="{phase}"}} {seconds:.6f}'
+              for phase, seconds in metrics.phases.items()]
+    lines += [
+        "# HELP autobackup_files Dateien im letzten Lauf nach Zustand.",
+        "# TYPE autobackup_files gauge",
+    ]
+    lines += [f'autobackup_files{{{job},state="{state}"}} {n}' for state, n in metrics.files.items()]
+    lines += [
+        "# HELP autobackup_bytes Gelesene und geschriebene Bytes im letzten Lauf.",
+        "# TYPE autobackup_bytes gauge",
+        f'autobackup_bytes{{{job},direction="read"}} {metrics.bytes_read}',
+        f'autobackup_bytes{{{job},direction="written"}} {metrics.bytes_written}',
+        "# HELP autobackup_file_throughput_bytes_per_second Durchsatz pro kopierter Datei.",
+        "# TYPE autobackup_file_throughput_bytes_per_second gauge",
+    ]
+    lines += [f'autobackup_file_throughput_bytes_per_second{{{job},quantile="{q}"}} {value:.1f}'
+              for q, value in metrics.throughput_quantiles().items()]
+    return "\n".join(lines) + "\n"
+
+
+def job_textfile(path, job):
+    """Eigenes Textfile pro Job (autobackup.prom -> autobackup-<job>.prom); node_exporter liest alle *.prom"""
+    stem, ext = os.path.splitext(path)
+    return f"{stem}-{re.sub(r'[^A-Za-z0-9_.-]', '_', job)}{ext or '.prom'}"
+
+
+def write_prometheus(path, metrics):
+    """Textfile atomar ersetzen, damit node_exporter nie eine halbe Datei liest"""
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(prometheus_text(metrics))
+    os.replace(tmp_path, path)
@@ -0,0 +1,222 @@
+"""Backup-Format "packs" auf einem Speicher-Backend (Ordner oder S3).
+
+Kleine Dateien werden in Pack-Dateien gebündelt, sodass ein einziger Upload
+tausende Dateien abdeckt; große Dateien gehen einzeln (bei S3 als Multipart)
+hoch. Jeder Lauf mit Änderungen schreibt ein Manifest, das als Index dient:
+Pfad -> Pack, Offset und Länge bzw. eigenes Objekt, dazu Metadaten, Hash und
+die Kodierung (Kompression/Verschlüsselung, siehe autobackup.transform).
+Mit Schlüssel werden auch Manifest und lokaler Zwischenstand verschlüsselt,
+und der Hash verschlüsselter Dateien ist mit einem daraus abgeleiteten
+Schlüssel gebildet.
+
+    packs/<id>.pack           aneinandergehängte kleine Dateien
+    objects/<id>              große Dateien
+    manifests/<zeit>.json     Manifest eines Laufs (JSON oder verschlüsselt)
+"""
+import hashlib
+import itertools
+import json
+import os
+import threading
+import time
+import uuid
+
+from autobackup.chunkstore import write_atomic
+from autobackup.config import DEFAULT_PACK_SIZE, DEFAULT_PACK_THRESHOLD
+from autobackup.storage import read_blocks
+
+PACK_DIR = "packs"
+OBJECT_DIR = "objects"
+MANIFEST_DIR = "manifests"
+PARTIAL_FILE = "packs-partial.json"  # lokal: bereits hochgeladene Dateien eines unterbrochenen Laufs
+
+
+def is_encoded(entry):
+    return bool(entry.get("compression") or entry.get("encrypted"))
+
+
+class PackStore:
+    """Sammelt kleine Dateien zu Packs und lädt sie hoch; aus mehreren Worker-Threads nutzbar."""
+
+    def __init__(self, backend, state_dir, pack_size=DEFAULT_PACK_SIZE, pack_threshold=DEFAULT_PACK_THRESHOLD,
+                 transform=None):
+        self.backend = backend
+        self.state_dir = state_dir
+        self.transform = transform if transform is not None and transform.active else None
+        self.pack_size = pack_size
+        self.pack_threshold = pack_threshold
+        self.lock = threading.Lock()
+        self.buffer = bytearray()
+        self.members = []  # (relativer Pfad, Eintrag ohne "pack") im offenen Pack
+
+    def store_file(self, rel_path, path, st, throttle=None):
+        """Datei sichern (läuft im Worker-Pool); liefert (gespeicherte Bytes, fertige Einträge)
+
+        Fertige Einträge sind [(relativer Pfad, Eintrag, Fehler)]: große Dateien
+        sofort, kleine erst mit dem Upload ihres Packs, der auch Dateien anderer
+        Aufrufer enthalten kann.
+        """
+        meta = {"mtime_ns": st.st_mtime_ns, "inode": st.st_ino, "mode": st.st_mode}
+        encoding = self.transform.encoding_for(rel_path) if self.transform else {}
+        if encoding.get("encrypted"):
+            meta["salt"] = self.transform.salt.hex()
+        if st.st_size >= self.pack_threshold:
+            key = f"{OBJECT_DIR}/{uuid.uuid4().hex}"
+            h = self.hasher(meta)
+            size = 0
+            with open(path, "rb") as f:
+                def blocks():
+                    nonlocal size
+                    for data in read_blocks(f, throttle):
+                        h.update(data)
+                        size += len(data)
+                        yield data
+
+                stream = blocks()
+                if encoding:
+                    # Erster Block entscheidet, ob sich Kompression lohnt (z.B. nicht bei Zufallsdaten)
+                    first = next(stream, b"")
+                    encoding = self.transform.probe(first, encoding)
+                    stream = itertools.chain((first,), stream)
+                    if encoding:
+                        stream = self.transform.encode_blocks(stream, encoding)
+                length = self.backend.put_blocks(key, stream)
+            meta.update(encoding, size=size, object=key, length=length, hash=h.hexdigest())
+            return length, [(rel_path, meta, None)]
+        with open(path, "rb") as f:
+            data = b"".join(read_blocks(f, throttle))
+        h = self.hasher(meta)
+        h.update(data)
+        meta.update(size=len(data), hash=h.hexdigest())
+        if encoding:
+            # Kompression vor der Sperre, damit alle Worker gleichzeitig komprimieren
+            encoded = self.transform.encode(data, encoding)
+            if encoding.get("compression") and len(encoded) >= len(data):
+                # Bringt nichts (z.B. sehr kleine oder zufällige Dateien): nur verschlüsseln bzw. roh ablegen
+                encoding = {key: value for key, value in encoding.items() if key != "compression"}
+                encoded = self.transform.encode(data, encoding) if encoding else data
+            data = encoded
+            meta.update(encoding)
+        with self.lock:
+            meta.update(offset=len(self.buffer), length=len(data))
+            self.buffer += data
+            self.members.append((rel_path, meta))
+            if len(self.buffer) < self.pack_size:
+                return len(data), []
+            buffer, members = self.take()
+        return len(data), self.upload(buffer, members)
+
+    def take(self):
+        buffer, members = self.buffer, self.members
+        self.buffer = bytearray()
+        self.members = []
+        return buffer, members
+
+    def upload(self, buffer, members):
+        # Ein Upload für alle Dateien im Pack; schlägt er fehl, gelten alle als nicht gesichert
+        key = f"{PACK_DIR}/{uuid.uuid4().hex}.pack"
+        try:
+            self.backend.put(key, buffer)
+        except Exception as e:
+            return [(rel_path, None, e) for rel_path, _ in members]
+        return [(rel_path, dict(entry, pack=key), None) for rel_path, entry in members]
+
+    def flush(self):
+        """Offenes Pack hochladen (am Ende eines Laufs)"""
+        with self.lock:
+            buffer, members = self.take()
+        return self.upload(buffer, members) if members else []
+
+    def read(self, entry):
+        """Inhalt einer kleinen Datei aus ihrem Pack (ein Bereichs-Abruf), dekodiert"""
+        data = self.backend.get(entry["pack"], entry["offset"], entry["length"])
+        return self.decoder().decode(data, entry) if is_encoded(entry) else data
+
+    def read_into(self, entry, f):
+        """Große Datei blockweise abrufen und dekodiert nach f schreiben"""
+        if not is_encoded(entry):
+            self.backend.get_into(entry["object"], f)
+            return
+        from autobackup.transform import DecodingWriter
+
+        writer = DecodingWriter(f, self.decoder(), entry)
+        self.backend.get_into(entry["object"], writer)
+        writer.close()
+
+    def hasher(self, entry):
+        """Neuer Hash für den Klartext eines Eintrags; verschlüsselte Einträge tragen das Salz ihres Schlüssels"""
+        if entry.get("salt"):
+            return self.decoder().hasher(bytes.fromhex(entry["salt"]))
+        return hashlib.blake2b(digest_size=32)
+
+    def seal(self, data):
+        """Manifest bzw. Zwischenstand verschlüsseln, sofern ein Schlüssel gesetzt ist"""
+        if self.transform is None or not self.transform.passphrase:
+            return data
+        return self.transform.encode(data, {"encrypted": True})
+
+    def unseal(self, data):
+        from autobackup.transform import MAGIC
+
+        if data[:len(MAGIC)] != MAGIC:
+            return data  # unverschlüsselt (JSON)
+        return self.decoder().decode(data, {"encrypted": True})
+
+    def decoder(self):
+        if self.transform is None:
+            from autobackup.transform import Transform
+
+            # Zum Lesen genügt eine Transformation ohne Schlüssel, solange nichts verschlüsselt ist
+            self.transform = Transform()
+        return self.transform
+
+    def list_manifests(self):
+        """Namen aller Manifeste, älteste zuerst"""
+        prefix = MANIFEST_DIR + "/"
+        return [key[len(prefix):-5] for key in self.backend.list(prefix) if key.endswith(".json")]
+
+    def load_manifest(self, name):
+        return json.loads(self.unseal(self.backend.get(f"{MANIFEST_DIR}/{name}.json")).decode("utf-8"))
+
+    def delete_manifest(self, name):
+        self.backend.delete(f"{MANIFEST_DIR}/{name}.json")
+
+    def load_latest(self):
+        names = self.list_manifests()
+        return self.load_manifest(names[-1]) if names else None
+
+    def write_manifest(self, source, files):
+        """Manifest ablegen; erst danach gilt der Lauf als abgeschlossen"""
+        name = time.strftime("%Y-%m-%d_%H-%M-%S")
+        existing = set(self.list_manifests())
+        suffix = 1
+        while name in existing:
+            suffix += 1
+            name = f"{time.strftime('%Y-%m-%d_%H-%M-%S')}_{suffix}"
+        manifest = {
+            "name": name,
+            "created": time.time(),
+            "source": source,
+            "files": files,
+        }
+        data = json.dumps(manifest, separators=(",", ":")).encode("utf-8")
+        self.backend.put(f"{MANIFEST_DIR}/{name}.json", self.seal(data))
+        return name
+
+    def save_partial(self, files):
+        os.makedirs(self.state_dir, exist_ok=True)
+        data = json.dumps(files, separators=(",", ":")).encode("utf-8")
+        write_atomic(os.path.join(self.state_dir, PARTIAL_FILE), self.seal(data))
+
+    def load_partial(self):
+        try:
+            with open(os.path.join(self.state_dir, PARTIAL_FILE), "rb") as f:
+                return json.loads(self.unseal(f.read()).decode("utf-8"))
+        except FileNotFoundError:
+            return {}
+
+    def clear_partial(self):
+        try:
+            os.remove(os.path.join(self.state_dir, PARTIAL_FILE))
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,64 @@
+"""Parallele Kopier-Pipeline mit begrenztem Worker-Pool."""
+import collections
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from autobackup.config import DEFAULT_WORKERS, DEFAULT_LARGE_FILE_SIZE
+
+# Ergebnis pro Datei: error ist None bei Erfolg, info ist der Rückgabewert der Kopierfunktion
+CopyResult = collections.namedtuple("CopyResult", "tag src dst size error info")
+
+
+class CopyPipeline:
+    """Verteilt Kopieraufträge auf einen Thread-Pool.
+
+    Große Dateien laufen in einem eigenen, kleineren Pool, damit einige
+    riesige Dateien nicht tausende kleine Dateien ausbremsen. Die Anzahl
+    offener Aufträge ist begrenzt, sodass der Producer (der Verzeichnis-Scan)
+    bei vollem Puffer wartet statt den Speicher zu füllen.
+    """
+
+    def __init__(self, copy_func, workers=DEFAULT_WORKERS, large_file_size=DEFAULT_LARGE_FILE_SIZE,
+                 large_workers=None, max_pending=None, initializer=None):
+        workers = max(1, int(workers))
+        self.copy_func = copy_func
+        self.large_file_size = large_file_size
+        self.small_pool = ThreadPoolExecutor(workers, thread_name_prefix="backup-copy", initializer=initializer)
+        self.large_pool = ThreadPoolExecutor(large_workers or max(1, workers // 4),
+                                             thread_name_prefix="backup-copy-large", initializer=initializer)
+        self.slots = threading.BoundedSemaphore(max_pending or workers * 64)
+        self.done = queue.SimpleQueue()
+
+    def submit(self, src, dst, size, tag=None):
+        """Kopierauftrag einreihen; blockiert, solange zu viele Aufträge offen sind"""
+        self.slots.acquire()
+        pool = self.large_pool if size >= self.large_file_size else self.small_pool
+        try:
+            pool.submit(self._run, src, dst, size, tag)
+        except BaseException:
+            self.slots.release()
+            raise
+
+    def _run(self, src, dst, size, tag):
+        try:
+            info = self.copy_func(src, dst)
+            result = CopyResult(tag, src, dst, size, None, info)
+        except Exception as e:
+            result = CopyResult(tag, src, dst, size, e, None)
+        self.done.put(result)
+        self.slots.release()
+
+    def drain(self):
+        """Bereits fertige Ergebnisse liefern, ohne zu warten"""
+        while True:
+            try:
+                yield self.done.get_nowait()
+            except queue.Empty:
+                return
+
+    def finish(self):
+        """Auf alle Aufträge warten und die restlichen Ergebnisse liefern"""
+        self.small_pool.shutdown(wait=True)
+        self.large_pool.shutdown(wait=True)
+        yield from self.drain()
@@ -0,0 +1,284 @@
+"""Wiederherstellung aus dem Backup: einzelne Datei, Teilbaum oder alles, parallel und mit Prüfsummen.
+
+Welche Dateien betroffen sind, kommt aus dem Index (Bereichsabfrage auf den
+Pfad-Präfix) bzw. dem Snapshot-Manifest; der Backup-Ordner wird nicht komplett
+durchsucht.
+"""
+import collections
+import hashlib
+import os
+import shutil
+import sqlite3
+import stat
+import threading
+
+from autobackup.index import query_prefix, INDEX_DIR, INDEX_FILE
+from autobackup.scan import TreeScanner, DestinationDirs
+
+# source: Pfad im Backup (None bei chunks/packs), digest: BLAKE2b aus dem Index, entry: Manifest-Eintrag (chunks/packs)
+RestoreItem = collections.namedtuple("RestoreItem", "rel_path source size digest entry")
+
+TEMP_SUFFIX = ".restore-tmp"
+BUFFER_SIZE = 8 * 1024 * 1024
+
+
+def normalize_prefix(path):
+    """Benutzereingabe wie "Dokumente/Rechnungen/" in einen relativen Index-Pfad umwandeln"""
+    if not path:
+        return ""
+    prefix = os.path.normpath(path.strip("/\\"))
+    return "" if prefix == os.curdir else prefix
+
+
+class RestoreEngine:
+    """Stellt Dateien eines Backups (mirror, snapshots, chunks oder packs) in einem Zielordner wieder her."""
+
+    def __init__(self, config, log=print):
+        self.config = config
+        self.log = log
+        self.chunks = None
+        self.packs = None
+        self.checksums = None
+        self.checksums_lock = threading.Lock()
+
+    def list_files(self, prefix="", snapshot=None):
+        """Alle RestoreItems unter prefix; snapshot wählt bei snapshots/chunks einen älteren Stand"""
+        prefix = normalize_prefix(prefix)
+        if self.config.backup_format == "chunks":
+            return self.list_chunk_files(prefix, snapshot)
+        if self.config.backup_format == "packs":
+            return self.list_pack_files(prefix, snapshot)
+        if self.config.backup_format == "snapshots":
+            return self.list_snapshot_files(prefix, snapshot)
+        if not os.path.isfile(os.path.join(self.config.backup_dir, INDEX_DIR, INDEX_FILE)):
+            # Backup aus einer Version ohne Index: nur den gewünschten Teilbaum durchsuchen
+            return self.list_walk(self.config.backup_dir, prefix)
+        return self.list_indexed(self.config.backup_dir, prefix, INDEX_FILE)
+
+    def list_walk(self, root, prefix):
+        scanner = TreeScanner(root, exclude_patterns=INDEX_DIR)
+        files = scanner.scan_paths([prefix]) if prefix else scanner.scan()
+        return (RestoreItem(rel_path, path, st.st_size, None, None) for rel_path, path, st in files)
+
+    def list_indexed(self, root, prefix, name):
+        for rel_path, size, digest in query_prefix(self.config.backup_dir, prefix, name):
+            yield RestoreItem(rel_path, os.path.join(root, rel_path), size, digest, None)
+
+    def list_snapshot_files(self, prefix, snapshot):
+        from autobackup.snapshots import SnapshotStore, SNAPSHOT_INDEX_FILE
+
+        store = SnapshotStore(self.config.backup_dir)
+        names = store.list_snapshots()
+        if not names:
+            raise FileNotFoundError("Im Backup-Ordner gibt es noch keinen Snapshot.")
+        name = snapshot or names[-1]
+        if name not in names:
+            raise FileNotFoundError(f"Snapshot {name} nicht gefunden.")
+        root = store.path(name)
+        if name == names[-1] and os.path.isfile(os.path.join(self.config.backup_dir, INDEX_DIR, SNAPSHOT_INDEX_FILE)):
+            # Der Snapshot-Index beschreibt immer den neuesten Snapshot
+            return self.list_indexed(root, prefix, SNAPSHOT_INDEX_FILE)
+        # Ältere Snapshots: nur den gewünschten Teilbaum durchsuchen
+        return self.list_walk(root, prefix)
+
+    def list_chunk_files(self, prefix, snapshot):
+        from autobackup.chunkstore import ChunkStore
+
+        self.chunks = ChunkStore(self.config.backup_dir)
+        manifest = self.chunks.load_snapshot(snapshot) if snapshot else self.chunks.load_latest()
+        if manifest is None:
+            raise FileNotFoundError("Im Chunk-Store gibt es noch keinen Snapshot.")
+        return self.list_manifest(manifest, prefix)
+
+    def list_pack_files(self, prefix, snapshot):
+        from autobackup.packs import PackStore
+        from autobackup.storage import open_backend
+        from autobackup.transform import Transform
+
+        # Liest auch Dateien mit anderer Kompression; der Schlüssel wird nur für verschlüsselte Einträge gebraucht
+        transform = Transform.from_config(self.config)
+        self.packs = PackStore(open_backend(self.config), os.path.join(self.config.backup_dir, INDEX_DIR),
+                               transform=transform)
+        names = self.packs.list_manifests()
+        if snapshot and snapshot not in names:
+            raise FileNotFoundError(f"Manifest {snapshot} nicht gefunden.")
+        if not names:
+            raise FileNotFoundError("Im Speicher gibt es noch kein Manifest.")
+        return self.list_manifest(self.packs.load_manifest(snapshot or names[-1]), prefix)
+
+    def list_manifest(self, manifest, prefix):
+        base = prefix + os.sep
+        for rel_path in sorted(manifest["files"]):
+            if not prefix or rel_path == prefix or rel_path.startswith(base):
+                entry = manifest["files"][rel_path]
+                yield RestoreItem(rel_path, None, entry["size"], None, entry)
+
+    def restore(self, target, prefix="", snapshot=None, verify=True):
+        """Dateien unter prefix nach target wiederherstellen; liefert (wiederhergestellt, Fehler)"""
+        from autobackup.pipeline import CopyPipeline
+
+        count = 0
+        failed = 0
+        restored_bytes = 0
+        dirs = DestinationDirs()
+        pipeline = CopyPipeline(lambda item, dst: self.restore_file(item, dst, verify),
+                                workers=self.config.copy_workers, large_file_size=self.config.large_file_size)
+
+        def collect(results):
+            nonlocal count, failed, restored_bytes
+            for result in results:
+                if result.error is not None:
+                    failed += 1
+                    self.log(f"⚠ Fehler beim Wiederherstellen von {result.tag.rel_path}: {result.error}")
+                    continue
+                count += 1
+                restored_bytes += result.size
+
+        try:
+            for item in self.list_files(prefix, snapshot):
+                dst_file = os.path.join(target, item.rel_path)
+                dirs.ensure(os.path.dirname(dst_file))
+                pipeline.submit(item, dst_file, item.size, item)
+                collect(pipeline.drain())
+        finally:
+            collect(pipeline.finish())
+            if self.packs is not None:
+                self.packs.backend.close()
+            if self.checksums:
+                self.checksums.close()
+            self.checksums = None
+
+        if not count and not failed:
+            self.log(f"ℹ Keine Dateien unter {prefix or 'dem Backup'} gefunden.")
+            return 0, 0
+        summary = f"✅ Wiederherstellung abgeschlossen. {count} Dateien ({restored_bytes / (1024 * 1024):.1f} MB) nach {target}."
+        if failed:
+            summary += f" {failed} Fehler."
+        self.log(summary)
+        return count, failed
+
+    def restore_file(self, item, dst, verify=True):
+        """Eine Datei zuerst unter temporärem Namen schreiben und erst nach erfolgreicher Prüfung ersetzen"""
+        tmp_path = dst + TEMP_SUFFIX
+        try:
+            if item.entry is not None and "chunks" in item.entry:
+                self.restore_chunks(item, tmp_path)
+            elif item.entry is not None:
+                self.restore_pack_entry(item, tmp_path, verify)
+            else:
+                # Gehasht wird beim Kopieren; ohne Hash im Index dient die Referenz aus der Prüfung (--verify/Scrubbing)
+                digest, st = copy_hashed(item.source, tmp_path)
+                expected = item.digest or (self.reference_digest(item.rel_path, st) if verify else None)
+                if verify and expected and digest != expected:
+                    raise ValueError("Prüfsumme stimmt nicht, die Sicherung ist beschädigt")
+            if verify and item.size is not None and os.path.getsize(tmp_path) != item.size:
+                raise ValueError(f"Größe stimmt nicht ({os.path.getsize(tmp_path)} statt {item.size} Bytes)")
+            os.replace(tmp_path, dst)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def reference_digest(self, rel_path, st):
+        """Hash der Backup-Datei aus .autobackup/checksums.sqlite, solange Größe und mtime dazu passen"""
+        from autobackup.verify import CHECKSUM_FILE
+
+        with self.checksums_lock:
+            if self.checksums is None:
+                path = os.path.join(self.config.backup_dir, INDEX_DIR, CHECKSUM_FILE)
+                # Nur lesen: die Wiederherstellung legt im Backup-Ordner nichts an
+                self.checksums = (sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+                                  if os.path.isfile(path) else False)
+            if not self.checksums:
+                return None
+            row = self.checksums.execute("SELECT size, mtime_ns, digest FROM checksums WHERE path = ?",
+                                         (rel_path,)).fetchone()
+        if row is None or (row[0], row[1]) != (st.st_size, st.st_mtime_ns):
+            return None
+        return row[2]
+
+    def restore_chunks(self, item, path):
+        # get_chunk prüft jeden Chunk gegen seinen Digest
+        with open(path, "wb") as f:
+            for digest in item.entry["chunks"]:
+                f.write(self.chunks.get_chunk(digest))
+        os.chmod(path, stat.S_IMODE(item.entry["mode"]))
+        os.utime(path, ns=(item.entry["mtime_ns"], item.entry["mtime_ns"]))
+
+    def restore_pack_entry(self, item, path, verify=True):
+        # Gehasht wird beim Schreiben, die Datei wird zur Prüfung nicht noch einmal gelesen
+        entry = item.entry
+        with open(path, "wb") as f:
+            writer = HashingWriter(f, lambda: self.packs.hasher(entry))
+            if "pack" in entry:
+                writer.write(self.packs.read(entry))
+            else:
+                self.packs.read_into(entry, writer)
+        if verify and writer.hexdigest() != entry["hash"]:
+            raise ValueError("Prüfsumme stimmt nicht, die Sicherung ist beschädigt")
+        os.chmod(path, stat.S_IMODE(entry["mode"]))
+        os.utime(path, ns=(entry["mtime_ns"], entry["mtime_ns"]))
+
+
+class HashingWriter:
+    """Datei-Objekt, das alles Geschriebene hasht; seek(0)/truncate() beginnen neu (Wiederholung beim Abruf)
+
+    Mit f=None wird nur gehasht (Prüfung ohne Zieldatei).
+    """
+
+    def __init__(self, f, new_hash=lambda: hashlib.blake2b(digest_size=32)):
+        self.f = f
+        self.new_hash = new_hash
+        self.hash = new_hash()
+
+    def write(self, data):
+        self.hash.update(data)
+        if self.f is not None:
+            self.f.write(data)
+
+    def seek(self, offset):
+        if self.f is not None:
+            self.f.seek(offset)
+        self.hash = self.new_hash()
+
+    def truncate(self):
+        if self.f is not None:
+            self.f.truncate()
+
+    def hexdigest(self):
+        return self.hash.hexdigest()
+
+
+def copy_hashed(src, dst):
+    """Datei samt Metadaten kopieren und dabei hashen; liefert (BLAKE2b-Hash, stat der Quelle)
+
+    Jeder Block wird genau einmal gelesen, gehasht und geschrieben. Bei
+    lückenhaften Quellen werden Null-Blöcke übersprungen, sodass das Ziel
+    ebenfalls lückenhaft bleibt.
+    """
+    from autobackup.fastcopy import is_sparse, preallocate
+
+    h = hashlib.blake2b(digest_size=32)
+    with open(src, "rb", buffering=0) as fsrc, open(dst, "wb", buffering=0) as fdst:
+        st = os.fstat(fsrc.fileno())
+        sparse = is_sparse(st)
+        if not sparse:
+            preallocate(fdst.fileno(), st.st_size)
+        buf = bytearray(max(1, min(BUFFER_SIZE, st.st_size + 1)))
+        view = memoryview(buf)
+        while True:
+            n = fsrc.readinto(buf)
+            if not n:
+                break
+            h.update(view[:n])
+            if sparse and not buf[0] and not buf[n - 1] and buf.count(0, 0, n) == n:
+                fdst.seek(n, os.SEEK_CUR)
+                continue
+            data = view[:n]
+            while data:
+                data = data[fdst.write(data):]
+        fdst.truncate()
+    shutil.copystat(src, dst)
+    return h.hexdigest(), st
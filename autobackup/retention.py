@@ -0,0 +1,190 @@
+"""Aufbewahrungsregeln für versionierte Backups (snapshots, chunks und packs).
+
+Die Regeln funktionieren wie bei restic/borg: keep_last behält die neuesten N
+Stände, keep_hourly/daily/weekly/monthly jeweils den neuesten Stand der
+letzten N Stunden, Tage, Wochen bzw. Monate, in denen es einen Stand gibt.
+Der neueste Stand bleibt immer erhalten.
+"""
+import os
+import time
+
+BUCKETS = (
+    ("keep_hourly", "%Y-%m-%d %H"),
+    ("keep_daily", "%Y-%m-%d"),
+    ("keep_weekly", "%G-%V"),
+    ("keep_monthly", "%Y-%m"),
+)
+POLICY_KEYS = ("keep_last",) + tuple(key for key, _ in BUCKETS)
+
+
+def policy_enabled(config):
+    return any(getattr(config, key) for key in POLICY_KEYS)
+
+
+def select_keep(times, config):
+    """times: {Name: Unix-Zeit}; liefert die Namen, die nach der Richtlinie erhalten bleiben"""
+    ordered = sorted(times, key=lambda name: (times[name], name), reverse=True)
+    keep = set(ordered[:max(1, config.keep_last)])
+    for key, fmt in BUCKETS:
+        limit = getattr(config, key)
+        buckets = set()
+        for name in ordered:
+            if len(buckets) >= limit:
+                break
+            bucket = time.strftime(fmt, time.localtime(times[name]))
+            if bucket not in buckets:
+                buckets.add(bucket)
+                keep.add(name)
+    return keep
+
+
+class Retention:
+    """Wendet die Richtlinie einer BackupConfig auf deren Backup-Ordner an"""
+
+    def __init__(self, config, log=print):
+        self.config = config
+        self.log = log
+
+    def prune(self, dry_run=False):
+        """Abgelaufene Stände löschen; liefert (gelöschte Namen, freigegebene Bytes)"""
+        if not policy_enabled(self.config):
+            return [], 0
+        if self.config.backup_format == "snapshots":
+            removed, freed = self.prune_snapshots(dry_run)
+        elif self.config.backup_format == "chunks":
+            removed, freed = self.prune_chunks(dry_run)
+        elif self.config.backup_format == "packs":
+            removed, freed = self.prune_packs(dry_run)
+        else:
+            self.log("ℹ Aufbewahrungsregeln gelten nur für die Formate snapshots, chunks und packs.")
+            return [], 0
+        if removed:
+            verb = "würden gelöscht" if dry_run else "gelöscht"
+            self.log(f"🗑 {len(removed)} alte Stände {verb}, {freed / (1024 * 1024):.1f} MB frei.")
+        return removed, freed
+
+    def prune_snapshots(self, dry_run):
+        from autobackup.snapshots import SnapshotStore, snapshot_time
+
+        store = SnapshotStore(self.config.backup_dir)
+        times = {name: snapshot_time(name) for name in store.list_snapshots()}
+        expired = sorted(set(times) - select_keep(times, self.config))
+        if dry_run:
+            return expired, self.estimate_snapshot_space(store, expired)
+        freed = 0
+        removed = []
+        for name in expired:
+            try:
+                # Hardlink-Zähler als Referenzzähler: nur Dateien ohne weitere Snapshots geben Platz frei
+                freed += store.remove(name)
+                removed.append(name)
+            except OSError as e:
+                self.log(f"⚠ Snapshot {name} konnte nicht gelöscht werden: {e}")
+        return removed, freed
+
+    def estimate_snapshot_space(self, store, names):
+        """Freiwerdende Bytes: Inodes, deren sämtliche Hardlinks in den zu löschenden Snapshots liegen"""
+        links = {}
+        for name in names:
+            for dirpath, _, filenames in os.walk(store.path(name)):
+                for filename in filenames:
+                    try:
+                        st = os.lstat(os.path.join(dirpath, filename))
+                    except OSError:
+                        continue
+                    key = (st.st_dev, st.st_ino)
+                    count, nlink, size = links.get(key, (0, st.st_nlink, st.st_size))
+                    links[key] = (count + 1, nlink, size)
+        return sum(size for count, nlink, size in links.values() if count >= nlink)
+
+    def prune_chunks(self, dry_run):
+        from autobackup.chunkstore import ChunkStore
+
+        store = ChunkStore(self.config.backup_dir)
+        manifests = {name: store.load_snapshot(name) for name in store.list_snapshots()}
+        times = {name: manifest.get("created", 0) for name, manifest in manifests.items()}
+        keep = select_keep(times, self.config)
+        expired = sorted(set(manifests) - keep)
+        if not expired:
+            return [], 0
+
+        # Referenzen nur aus den Manifesten: der Chunk-Ordner wird nicht durchsucht
+        referenced = {digest for name in keep for entry in manifests[name]["files"].values() for digest in entry["chunks"]}
+        # Auch Chunks eines unterbrochenen Laufs behalten, der beim nächsten Mal fortgesetzt wird
+        referenced.update(digest for entry in store.load_partial().values() for digest in entry["chunks"])
+        candidates = {digest for name in expired for entry in manifests[name]["files"].values()
+                      for digest in entry["chunks"]} - referenced
+        if dry_run:
+            freed = sum(os.path.getsize(store.chunk_path(digest)) for digest in candidates
+                        if os.path.exists(store.chunk_path(digest)))
+            return expired, freed
+
+        # Erst Chunks, dann Manifeste: bricht der Lauf ab, wird ein abgelaufener Stand beim nächsten Mal erneut
+        # gelöscht, und kein noch behaltener Stand verliert Chunks
+        freed = 0
+        failed = 0
+        for digest in candidates:
+            try:
+                freed += store.delete_chunk(digest)
+            except OSError as e:
+                failed += 1
+                self.log(f"⚠ Chunk {digest} konnte nicht gelöscht werden: {e}")
+        if failed:
+            # Manifeste behalten, damit die übrigen Chunks beim nächsten Lauf erneut versucht werden
+            return [], freed
+        for name in expired:
+            store.delete_snapshot(name)
+        return expired, freed
+
+    def prune_packs(self, dry_run):
+        from autobackup.index import INDEX_DIR
+        from autobackup.packs import PackStore
+        from autobackup.storage import open_backend
+        from autobackup.transform import Transform
+
+        # Verschlüsselte Manifeste brauchen den Schlüssel
+        transform = Transform.from_config(self.config)
+        store = PackStore(open_backend(self.config), os.path.join(self.config.backup_dir, INDEX_DIR),
+                          transform=transform)
+        try:
+            manifests = {name: store.load_manifest(name) for name in store.list_manifests()}
+            times = {name: manifest.get("created", 0) for name, manifest in manifests.items()}
+            keep = select_keep(times, self.config)
+            expired = sorted(set(manifests) - keep)
+            if not expired:
+                return [], 0
+
+            # Ein Pack bleibt, solange ein behaltener Stand (oder ein unterbrochener Lauf) eine Datei darin braucht;
+            # es wird nicht umgepackt, teilweise abgelaufene Packs belegen ihren Platz also weiter
+            referenced = {pack_key(entry) for name in keep for entry in manifests[name]["files"].values()}
+            referenced.update(pack_key(entry) for entry in store.load_partial().values())
+            stored = {}
+            for name in expired:
+                for entry in manifests[name]["files"].values():
+                    key = pack_key(entry)
+                    if key not in referenced:
+                        stored.setdefault(key, set()).add((entry.get("offset", 0), entry["length"]))
+            freed = sum(length for members in stored.values() for _, length in members)
+            if dry_run:
+                return expired, freed
+
+            # Wie beim Chunk-Store erst die Daten, dann die Manifeste
+            failed = 0
+            for key in stored:
+                try:
+                    store.backend.delete(key)
+                except OSError as e:
+                    failed += 1
+                    self.log(f"⚠ {key} konnte nicht gelöscht werden: {e}")
+            if failed:
+                return [], 0
+            for name in expired:
+                store.delete_manifest(name)
+            return expired, freed
+        finally:
+            store.backend.close()
+
+
+def pack_key(entry):
+    """Pack bzw. Objekt, in dem ein Manifest-Eintrag liegt"""
+    return entry["pack"] if "pack" in entry else entry["object"]
@@ -0,0 +1,302 @@
+"""S3-kompatibler Objektspeicher (AWS, MinIO, Ceph …) nur mit der Standardbibliothek.
+
+Anfragen werden mit AWS Signature V4 signiert und über einen Pool von
+Keep-Alive-Verbindungen geschickt; große Dateien gehen als Multipart-Upload
+mit mehreren Teilen gleichzeitig hoch. Adressiert wird im Pfad-Stil
+(endpoint/bucket/key), den alle S3-kompatiblen Server verstehen.
+"""
+import datetime
+import hashlib
+import hmac
+import http.client
+import os
+import queue
+import threading
+import time
+import urllib.parse
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from autobackup.config import DEFAULT_UPLOAD_PART_SIZE
+from autobackup.storage import StorageBackend, read_blocks
+
+MIN_PART_SIZE = 5 * 1024 * 1024  # S3 verlangt so viel pro Teil (außer dem letzten)
+DEFAULT_CONNECTIONS = 8
+TIMEOUT = 60
+RETRIES = 3
+RETRY_STATUS = {500, 502, 503, 504}
+ALGORITHM = "AWS4-HMAC-SHA256"
+
+
+class S3Error(OSError):
+    """Fehlerantwort des Objektspeichers"""
+
+    def __init__(self, status, code, message, key=""):
+        super().__init__(f"S3 {status} {code}: {message}" + (f" ({key})" if key else ""))
+        self.status = status
+        self.code = code
+
+
+def parse_url(url):
+    """s3://bucket/präfix in (bucket, präfix mit abschließendem "/" oder leer)"""
+    parts = urllib.parse.urlsplit(url)
+    if parts.scheme != "s3" or not parts.netloc:
+        raise ValueError(f"Ungültige S3-Adresse: {url!r} (erwartet s3://bucket/präfix)")
+    prefix = parts.path.strip("/")
+    return parts.netloc, prefix + "/" if prefix else ""
+
+
+def _quote(value, safe="-_.~"):
+    return urllib.parse.quote(value, safe=safe)
+
+
+def canonical_query(query):
+    return "&".join(f"{_quote(k)}={_quote(v)}" for k, v in sorted(query.items()))
+
+
+def signature(secret_key, region, amz_date, method, path, query, headers, signed_headers, payload_hash, service="s3"):
+    """Signatur nach AWS Signature V4; path ist unkodiert, headers mit kleingeschriebenen Namen"""
+    canonical_headers = "".join(f"{name}:{' '.join(str(headers[name]).split())}\n" for name in signed_headers)
+    canonical_request = "\n".join([
+        method, _quote(path, "-_.~/"), canonical_query(query),
+        canonical_headers, ";".join(signed_headers), payload_hash])
+    date = amz_date[:8]
+    scope = f"{date}/{region}/{service}/aws4_request"
+    string_to_sign = "\n".join([ALGORITHM, amz_date, scope, hashlib.sha256(canonical_request.encode("utf-8")).hexdigest()])
+    key = ("AWS4" + secret_key).encode("utf-8")
+    for part in (date, region, service, "aws4_request"):
+        key = hmac.new(key, part.encode("utf-8"), hashlib.sha256).digest()
+    return scope, hmac.new(key, string_to_sign.encode("utf-8"), hashlib.sha256).hexdigest()
+
+
+class ConnectionPool:
+    """Begrenzte Anzahl wiederverwendbarer HTTP(S)-Verbindungen zu einem Host"""
+
+    def __init__(self, host, port, secure, size=DEFAULT_CONNECTIONS, timeout=TIMEOUT):
+        self.factory = http.client.HTTPSConnection if secure else http.client.HTTPConnection
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.idle = queue.LifoQueue()
+        self.slots = threading.BoundedSemaphore(max(1, size))
+
+    def acquire(self):
+        self.slots.acquire()
+        try:
+            return self.idle.get_nowait()
+        except queue.Empty:
+            return self.factory(self.host, self.port, timeout=self.timeout)
+
+    def release(self, conn, reuse=True):
+        if reuse:
+            self.idle.put(conn)
+        else:
+            conn.close()
+        self.slots.release()
+
+    def close(self):
+        while True:
+            try:
+                self.idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+class S3Backend(StorageBackend):
+    """Objekte in einem Bucket unterhalb eines Präfixes"""
+
+    def __init__(self, endpoint, bucket, prefix="", access_key="", secret_key="", region="us-east-1",
+                 connections=DEFAULT_CONNECTIONS, part_size=DEFAULT_UPLOAD_PART_SIZE):
+        parts = urllib.parse.urlsplit(endpoint)
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            raise ValueError(f"Ungültiger S3-Endpunkt: {endpoint!r}")
+        self.host = parts.netloc
+        self.bucket = bucket
+        self.prefix = prefix
+        self.access_key = access_key
+        self.secret_key = secret_key
+        self.region = region
+        self.part_size = max(MIN_PART_SIZE, int(part_size))
+        self.connections = max(1, int(connections))
+        self.pool = ConnectionPool(parts.hostname, parts.port, parts.scheme == "https", self.connections)
+        self.uploads = ThreadPoolExecutor(self.connections, thread_name_prefix="backup-upload")
+
+    @classmethod
+    def from_config(cls, config):
+        bucket, prefix = parse_url(config.storage)
+        region = config.s3_region or "us-east-1"
+        return cls(config.s3_endpoint or f"https://s3.{region}.amazonaws.com", bucket, prefix,
+                   config.s3_access_key or os.environ.get("AWS_ACCESS_KEY_ID", ""),
+                   config.s3_secret_key or os.environ.get("AWS_SECRET_ACCESS_KEY", ""),
+                   region, config.upload_connections, config.upload_part_size)
+
+    def sign(self, method, path, query, headers, payload_hash):
+        amz_date = datetime.datetime.now(datetime.timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        headers = dict(headers, host=self.host)
+        headers["x-amz-date"] = amz_date
+        headers["x-amz-content-sha256"] = payload_hash
+        signed = ["host", "x-amz-content-sha256", "x-amz-date"]
+        scope, sig = signature(self.secret_key, self.region, amz_date, method, path, query, headers, signed,
+                               payload_hash)
+        headers["authorization"] = (f"{ALGORITHM} Credential={self.access_key}/{scope}, "
+                                    f"SignedHeaders={';'.join(signed)}, Signature={sig}")
+        return headers
+
+    def request(self, method, key="", query=None, body=b"", headers=None, ok=(200,), stream=None):
+        """Signierte Anfrage mit Wiederholung bei Verbindungsabbruch oder 5xx; liefert (Antwort, Inhalt)
+
+        Mit stream (Datei-Objekt) wird der Inhalt blockweise dorthin geschrieben statt geliefert.
+        """
+        query = query or {}
+        path = f"/{self.bucket}/{self.prefix}{key}" if key else f"/{self.bucket}"
+        url = _quote(path, "-_.~/") + ("?" + canonical_query(query) if query else "")
+        payload_hash = hashlib.sha256(body).hexdigest()
+        for attempt in range(RETRIES):
+            request_headers = self.sign(method, path, query, headers or {}, payload_hash)
+            conn = self.pool.acquire()
+            try:
+                conn.request(method, url, body=body, headers=request_headers)
+                response = conn.getresponse()
+                if stream is not None and response.status in ok:
+                    stream.seek(0)
+                    stream.truncate()
+                    for data in read_blocks(response):
+                        stream.write(data)
+                    data = b""
+                else:
+                    data = response.read()
+            except (http.client.HTTPException, OSError):
+                # Z.B. eine vom Server geschlossene Keep-Alive-Verbindung: neu verbinden und wiederholen
+                self.pool.release(conn, reuse=False)
+                if attempt == RETRIES - 1:
+                    raise
+                continue
+            self.pool.release(conn, reuse=not response.will_close)
+            if response.status in RETRY_STATUS and attempt < RETRIES - 1:
+                time.sleep(0.5 * 2 ** attempt)
+                continue
+            if response.status not in ok:
+                raise self.error(response.status, data, key)
+            return response, data
+
+    def error(self, status, data, key=""):
+        code, message = "Error", http.client.responses.get(status, "")
+        try:
+            root = ET.fromstring(data)
+            code = root.findtext("Code") or code
+            message = root.findtext("Message") or message
+        except ET.ParseError:
+            pass
+        return S3Error(status, code, message, key)
+
+    def put(self, key, data):
+        self.request("PUT", key, body=data)
+
+    def put_blocks(self, key, blocks):
+        # Blöcke zu Teilen von part_size sammeln; was in einen Teil passt, geht als einfaches PUT hoch.
+        # Höchstens so viele Teile wie Verbindungen liegen gleichzeitig im Speicher.
+        buffer = bytearray()
+        upload_id = None
+        slots = threading.BoundedSemaphore(self.connections)
+        futures = []
+        written = 0
+        try:
+            for data in blocks:
+                buffer += data
+                written += len(data)
+                while len(buffer) > self.part_size:
+                    if upload_id is None:
+                        upload_id = self.create_multipart(key)
+                    for future in futures:
+                        if future.done() and future.exception() is not None:
+                            raise future.exception()
+                    part = bytes(buffer[:self.part_size])
+                    del buffer[:self.part_size]
+                    slots.acquire()
+                    future = self.uploads.submit(self.upload_part, key, upload_id, len(futures) + 1, part)
+                    future.add_done_callback(lambda _: slots.release())
+                    futures.append(future)
+            if upload_id is None:
+                self.put(key, buffer)
+                return written
+            futures.append(self.uploads.submit(self.upload_part, key, upload_id, len(futures) + 1, bytes(buffer)))
+            etags = [future.result() for future in futures]
+            self.complete_multipart(key, upload_id, etags)
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            wait(futures)
+            if upload_id is not None:
+                try:
+                    self.request("DELETE", key, {"uploadId": upload_id}, ok=(200, 204))
+                except OSError:
+                    pass
+            raise
+        return written
+
+    def create_multipart(self, key):
+        _, data = self.request("POST", key, {"uploads": ""})
+        upload_id = _find(ET.fromstring(data), "UploadId")
+        if not upload_id:
+            raise S3Error(200, "InvalidResponse", "Keine UploadId erhalten", key)
+        return upload_id
+
+    def upload_part(self, key, upload_id, number, data):
+        response, _ = self.request("PUT", key, {"partNumber": str(number), "uploadId": upload_id}, body=data)
+        return response.getheader("ETag")
+
+    def complete_multipart(self, key, upload_id, etags):
+        body = "<CompleteMultipartUpload>" + "".join(
+            f"<Part><PartNumber>{number}</PartNumber><ETag>{etag}</ETag></Part>"
+            for number, etag in enumerate(etags, 1)) + "</CompleteMultipartUpload>"
+        _, data = self.request("POST", key, {"uploadId": upload_id}, body=body.encode("utf-8"))
+        # S3 kann trotz Status 200 einen Fehler im Inhalt melden
+        if b"<Error>" in data:
+            raise self.error(200, data, key)
+
+    def get(self, key, offset=0, length=None):
+        if length == 0:
+            # "bytes=N-(N-1)" ist ungültig: S3 liefert dann das ganze Objekt, MinIO antwortet 416
+            return b""
+        if not offset and length is None:
+            return self.request("GET", key)[1]
+        end = "" if length is None else str(offset + length - 1)
+        return self.request("GET", key, headers={"range": f"bytes={offset}-{end}"}, ok=(200, 206))[1]
+
+    def get_into(self, key, f):
+        self.request("GET", key, stream=f)
+
+    def list(self, prefix=""):
+        keys = []
+        query = {"list-type": "2", "prefix": self.prefix + prefix}
+        while True:
+            _, data = self.request("GET", query=query)
+            root = ET.fromstring(data)
+            for element in root.iter():
+                if _local(element.tag) == "Contents":
+                    key = _find(element, "Key")
+                    if key is not None:
+                        keys.append(key[len(self.prefix):])
+            token = _find(root, "NextContinuationToken")
+            if _find(root, "IsTruncated") != "true" or not token:
+                return sorted(keys)
+            query = dict(query, **{"continuation-token": token})
+
+    def delete(self, key):
+        self.request("DELETE", key, ok=(200, 204))
+
+    def close(self):
+        self.uploads.shutdown(wait=True)
+        self.pool.close()
+
+
+def _local(tag):
+    return tag.rsplit("}", 1)[-1]
+
+
+def _find(element, name):
+    """Text des ersten direkten Kindelements name, unabhängig vom XML-Namensraum"""
+    for child in element:
+        if _local(child.tag) == name:
+            return child.text
+    return None
@@ -0,0 +1,225 @@
+"""Minimaler S3-kompatibler Server im Arbeitsspeicher, um das S3-Backend ohne echten Objektspeicher zu betreiben.
+
+Im eigenen Prozess:   python -m autobackup.s3fake --port 9000
+Im selben Prozess:    server = FakeS3Server(); ...; server.close()
+
+Unterstützt genau das, was autobackup.s3 verwendet: PUT/GET (auch mit Range),
+DELETE, ListObjectsV2 und Multipart-Uploads. Mit Zugangsdaten wird jede
+Signatur geprüft, sonst nur ihr Format und die Nutzlast-Prüfsumme. Mit
+server.store.failures = N scheitern die nächsten N Anfragen mit 503.
+"""
+import argparse
+import hashlib
+import http.server
+import re
+import threading
+import urllib.parse
+import uuid
+from xml.sax.saxutils import escape
+
+from autobackup.s3 import ALGORITHM, signature
+
+MAX_KEYS = 1000
+AUTH_PATTERN = re.compile(ALGORITHM + r" Credential=([^/]+)/(\S+), SignedHeaders=(\S+), Signature=([0-9a-f]+)")
+
+
+class FakeS3Store:
+    """Buckets und Objekte als dict; wird von allen Handler-Threads unter einer Sperre geteilt"""
+
+    def __init__(self, access_key="", secret_key=""):
+        self.lock = threading.Lock()
+        self.objects = {}  # (bucket, key) -> bytes
+        self.uploads = {}  # upload_id -> (bucket, key, {Teilnummer: bytes})
+        self.access_key = access_key
+        self.secret_key = secret_key
+        self.requests = 0
+        self.failures = 0  # so viele Anfragen noch mit 503 beantworten, um Wiederholungen zu prüfen
+
+
+class FakeS3Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-Alive, damit der Verbindungs-Pool etwas zu tun hat
+    disable_nagle_algorithm = True  # Kopfzeilen und Inhalt gehen getrennt raus; sonst 40 ms pro Antwort
+
+    def log_message(self, format, *args):
+        pass
+
+    @property
+    def store(self):
+        return self.server.store
+
+    def reply(self, status, body=b"", headers=None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def fail(self, status, code, message=""):
+        body = f"<Error><Code>{code}</Code><Message>{escape(message)}</Message></Error>".encode("utf-8")
+        self.reply(status, body, {"Content-Type": "application/xml"})
+
+    def handle_request(self):
+        parts = urllib.parse.urlsplit(self.path)
+        path = urllib.parse.unquote(parts.path)
+        query = dict(urllib.parse.parse_qsl(parts.query, keep_blank_values=True))
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        with self.store.lock:
+            self.store.requests += 1
+            failing = self.store.failures > 0
+            if failing:
+                self.store.failures -= 1
+        if failing:
+            self.fail(503, "SlowDown", "Bitte später erneut versuchen")
+            return
+        error = self.check_auth(path, query, body)
+        if error:
+            self.fail(403, *error)
+            return
+        bucket, _, key = path.lstrip("/").partition("/")
+        if not bucket:
+            self.fail(400, "InvalidBucketName", "Nur Pfad-Stil wird unterstützt")
+            return
+        getattr(self, "do_" + self.command.lower() + "_object")(bucket, key, query, body)
+
+    do_GET = do_PUT = do_POST = do_DELETE = do_HEAD = handle_request
+
+    def check_auth(self, path, query, body):
+        match = AUTH_PATTERN.fullmatch(self.headers.get("Authorization", ""))
+        if not match:
+            return "AccessDenied", "Anfrage ist nicht signiert"
+        if self.headers.get("x-amz-content-sha256") != hashlib.sha256(body).hexdigest():
+            return "XAmzContentSHA256Mismatch", "Prüfsumme der Nutzlast stimmt nicht"
+        if not self.store.secret_key:
+            return None
+        access_key, _, signed, sig = match.groups()
+        if access_key != self.store.access_key:
+            return "InvalidAccessKeyId", "Unbekannter Zugangsschlüssel"
+        signed_headers = signed.split(";")
+        headers = {name: self.headers.get(name, "") for name in signed_headers}
+        _, region, service, _ = (match.group(2).split("/") + ["", "", "", ""])[:4]
+        _, expected = signature(self.store.secret_key, region, self.headers.get("x-amz-date", ""), self.command,
+                                path, query, headers, signed_headers, self.headers.get("x-amz-content-sha256"),
+                                service)
+        if expected != sig:
+            return "SignatureDoesNotMatch", "Signatur stimmt nicht"
+        return None
+
+    def do_put_object(self, bucket, key, query, body):
+        with self.store.lock:
+            if "uploadId" in query:
+                upload = self.store.uploads.get(query["uploadId"])
+                if upload is None:
+                    self.fail(404, "NoSuchUpload")
+                    return
+                upload[2][int(query["partNumber"])] = body
+            else:
+                self.store.objects[(bucket, key)] = body
+        self.reply(200, headers={"ETag": f'"{hashlib.md5(body).hexdigest()}"'})
+
+    def do_post_object(self, bucket, key, query, body):
+        with self.store.lock:
+            if "uploads" in query:
+                upload_id = uuid.uuid4().hex
+                self.store.uploads[upload_id] = (bucket, key, {})
+                xml = f"<InitiateMultipartUploadResult><UploadId>{upload_id}</UploadId></InitiateMultipartUploadResult>"
+                self.reply(200, xml.encode("utf-8"))
+                return
+            upload = self.store.uploads.pop(query.get("uploadId"), None)
+            if upload is None:
+                self.fail(404, "NoSuchUpload")
+                return
+            numbers = [int(n) for n in re.findall(rb"<PartNumber>(\d+)</PartNumber>", body)]
+            if numbers != sorted(upload[2]) or not numbers:
+                self.fail(400, "InvalidPart", "Teile fehlen oder sind ungeordnet")
+                return
+            self.store.objects[(upload[0], upload[1])] = b"".join(upload[2][n] for n in numbers)
+        self.reply(200, b"<CompleteMultipartUploadResult></CompleteMultipartUploadResult>")
+
+    def do_get_object(self, bucket, key, query, body):
+        if not key:
+            self.list_objects(bucket, query)
+            return
+        with self.store.lock:
+            data = self.store.objects.get((bucket, key))
+        if data is None:
+            self.fail(404, "NoSuchKey", key)
+            return
+        # Wie RFC 7233 und S3: ungültige Bereiche (Ende vor Anfang) werden ignoriert,
+        # ein Anfang hinter dem Objektende ist nicht erfüllbar
+        match = re.fullmatch(r"bytes=(\d+)-(\d*)", self.headers.get("Range", ""))
+        if match and (not match.group(2) or int(match.group(2)) >= int(match.group(1))):
+            start = int(match.group(1))
+            if start >= len(data):
+                self.fail(416, "InvalidRange", key)
+                return
+            end = int(match.group(2)) + 1 if match.group(2) else len(data)
+            self.reply(206, data[start:end])
+        else:
+            self.reply(200, data)
+
+    do_head_object = do_get_object
+
+    def do_delete_object(self, bucket, key, query, body):
+        with self.store.lock:
+            if "uploadId" in query:
+                self.store.uploads.pop(query["uploadId"], None)
+            else:
+                self.store.objects.pop((bucket, key), None)
+        self.reply(204)
+
+    def list_objects(self, bucket, query):
+        prefix = query.get("prefix", "")
+        after = query.get("continuation-token", "")
+        with self.store.lock:
+            keys = sorted(key for b, key in self.store.objects if b == bucket and key.startswith(prefix) and key > after)
+            sizes = {key: len(self.store.objects[(bucket, key)]) for key in keys[:MAX_KEYS]}
+        page = keys[:MAX_KEYS]
+        truncated = len(keys) > MAX_KEYS
+        xml = ['<?xml version="1.0" encoding="UTF-8"?>',
+               '<ListBucketResult xmlns="http://s3.amazonaws.com/doc/2006-03-01/">',
+               f"<Name>{escape(bucket)}</Name><Prefix>{escape(prefix)}</Prefix><KeyCount>{len(page)}</KeyCount>",
+               f"<MaxKeys>{MAX_KEYS}</MaxKeys><IsTruncated>{'true' if truncated else 'false'}</IsTruncated>"]
+        xml.extend(f"<Contents><Key>{escape(key)}</Key><Size>{sizes[key]}</Size></Contents>" for key in page)
+        if truncated:
+            xml.append(f"<NextContinuationToken>{escape(page[-1])}</NextContinuationToken>")
+        xml.append("</ListBucketResult>")
+        self.reply(200, "".join(xml).encode("utf-8"), {"Content-Type": "application/xml"})
+
+
+class FakeS3Server(http.server.ThreadingHTTPServer):
+    """Startet sofort in einem Hintergrund-Thread; endpoint ist z.B. http://127.0.0.1:40123"""
+
+    daemon_threads = True
+
+    def __init__(self, host="127.0.0.1", port=0, access_key="", secret_key=""):
+        super().__init__((host, port), FakeS3Handler)
+        self.store = FakeS3Store(access_key, secret_key)
+        self.endpoint = f"http://{host}:{self.server_address[1]}"
+        self.thread = threading.Thread(target=self.serve_forever, name="fake-s3", daemon=True)
+        self.thread.start()
+
+    def close(self):
+        self.shutdown()
+        self.server_close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="autobackup.s3fake", description="S3-Attrappe im Arbeitsspeicher")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--access-key", default="", help="Mit --secret-key: Signaturen vollständig prüfen")
+    parser.add_argument("--secret-key", default="")
+    args = parser.parse_args(argv)
+    server = FakeS3Server(args.host, args.port, args.access_key, args.secret_key)
+    print(f"S3-Attrappe läuft auf {server.endpoint} (Strg+C beendet)")
+    try:
+        server.thread.join()
+    except KeyboardInterrupt:
+        server.close()
+
+
+if __name__ == "__main__":
+    main()
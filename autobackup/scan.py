@@ -0,0 +1,155 @@
+"""Schneller Verzeichnis-Scan mit os.scandir, kompilierten Filtern und Ausschluss-Mustern."""
+import fnmatch
+import os
+import re
+import stat
+
+
+def split_list(text):
+    """Kommagetrennte Eingabe aus der GUI in eine Liste umwandeln"""
+    if isinstance(text, (list, tuple)):
+        return [item.strip() for item in text if item.strip()]
+    return [item.strip() for item in (text or "").split(",") if item.strip()]
+
+
+def compile_filter(filter_types):
+    """Dateitypen-Filter als Tupel für str.endswith; None = alle Dateien"""
+    suffixes = tuple(ft.lower() for ft in split_list(filter_types))
+    return suffixes or None
+
+
+def compile_excludes(patterns):
+    """Glob-Muster (z.B. node_modules, .git, *.tmp) in zwei reguläre Ausdrücke übersetzen.
+
+    Muster ohne Pfadtrenner gelten für den Namen eines Eintrags, Muster mit
+    "/" für den relativen Pfad. Liefert (name_regex, path_regex), jeweils None
+    wenn es keine passenden Muster gibt.
+    """
+    flags = re.IGNORECASE if os.name == "nt" else 0
+    name_patterns = []
+    path_patterns = []
+    for pattern in split_list(patterns):
+        pattern = pattern.replace("\\", "/").strip("/")
+        if "/" in pattern:
+            path_patterns.append(fnmatch.translate(pattern))
+        else:
+            name_patterns.append(fnmatch.translate(pattern))
+    name_regex = re.compile("|".join(name_patterns), flags) if name_patterns else None
+    path_regex = re.compile("|".join(path_patterns), flags) if path_patterns else None
+    return name_regex, path_regex
+
+
+def in_scope(rel_path, paths):
+    """Liegt rel_path in einem der gescannten Pfade (der Pfad selbst oder darunter; "" = alles)?"""
+    for path in paths:
+        if not path or rel_path == path or rel_path.startswith(path + os.sep):
+            return True
+    return False
+
+
+class TreeScanner:
+    """Iterativer scandir-Walker, der ausgeschlossene Unterbäume gar nicht erst betritt."""
+
+    def __init__(self, root, filter_types="", exclude_patterns="", on_error=None):
+        self.root = root
+        self.suffixes = compile_filter(filter_types)
+        self.name_regex, self.path_regex = compile_excludes(exclude_patterns)
+        self.on_error = on_error
+        self.stack = []
+        self.current = None
+
+    def is_excluded(self, name, rel_path):
+        if self.name_regex is not None and self.name_regex.match(name):
+            return True
+        if self.path_regex is not None and self.path_regex.match(rel_path.replace(os.sep, "/")):
+            return True
+        return False
+
+    def matches(self, name):
+        return self.suffixes is None or name.lower().endswith(self.suffixes)
+
+    def error(self, path, exc):
+        if self.on_error is not None:
+            self.on_error(path, exc)
+
+    def pending_dirs(self):
+        """Noch nicht (vollständig) gescannte Ordner; mit scan(resume=...) lässt sich dort weitermachen"""
+        return self.stack + ([self.current] if self.current is not None else [])
+
+    def scan(self, rel_dir="", resume=None):
+        """Liefert (relativer Pfad, Quellpfad, stat) für alle passenden Dateien unterhalb von rel_dir"""
+        suffixes = self.suffixes
+        stack = self.stack = list(resume) if resume is not None else [rel_dir]
+        while stack:
+            rel_dir = self.current = stack.pop()
+            prefix = rel_dir + os.sep if rel_dir else ""
+            subdirs = []
+            try:
+                with os.scandir(os.path.join(self.root, rel_dir) if rel_dir else self.root) as it:
+                    for entry in it:
+                        name = entry.name
+                        rel_path = prefix + name
+                        try:
+                            if entry.is_dir(follow_symlinks=False):
+                                if not self.is_excluded(name, rel_path):
+                                    subdirs.append(rel_path)
+                                continue
+                            if not entry.is_file():
+                                continue
+                            if suffixes is not None and not name.lower().endswith(suffixes):
+                                continue
+                            if self.is_excluded(name, rel_path):
+                                continue
+                            st = entry.stat()
+                        except FileNotFoundError:
+                            continue
+                        except OSError as e:
+                            self.error(entry.path, e)
+                            continue
+                        yield rel_path, entry.path, st
+            except FileNotFoundError:
+                continue
+            except OSError as e:
+                self.error(os.path.join(self.root, rel_dir), e)
+                continue
+            # Umgekehrt auf den Stack, damit Unterordner in Namensreihenfolge des Verzeichnisses folgen
+            stack.extend(reversed(subdirs))
+        self.current = None
+
+    def scan_paths(self, paths):
+        """Nur die angegebenen relativen Pfade (Dateien oder Ordner) scannen"""
+        paths = set(paths)
+        if "" in paths:
+            # Der Quellordner selbst (z.B. nach dem Löschen einer Datei direkt darin)
+            yield from self.scan()
+            return
+        for rel_path in sorted(paths):
+            parts = rel_path.split(os.sep)
+            if any(os.sep.join(parts[:i]) in paths for i in range(1, len(parts))):
+                continue  # wird bereits über einen übergeordneten Ordner gescannt
+            if any(self.is_excluded(part, os.sep.join(parts[:i + 1])) for i, part in enumerate(parts)):
+                continue
+            full_path = os.path.join(self.root, rel_path)
+            try:
+                st = os.stat(full_path)
+            except FileNotFoundError:
+                continue  # zwischen Ereignis und Backup gelöscht
+            except OSError as e:
+                self.error(full_path, e)
+                continue
+            if stat.S_ISDIR(st.st_mode):
+                yield from self.scan(rel_path)
+            elif self.matches(parts[-1]):
+                yield rel_path, full_path, st
+
+
+class DestinationDirs:
+    """Zielordner nur einmal pro Ordner anlegen statt einmal pro Datei."""
+
+    def __init__(self):
+        self.created = set()
+
+    def ensure(self, path):
+        if path not in self.created:
+            os.makedirs(path, exist_ok=True)
+            self.created.add(path)
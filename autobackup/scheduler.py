@@ -0,0 +1,268 @@
+"""Mehrere Backup-Jobs aus einer settings.json: Intervall oder Cron, Prioritäten und Parallelitätsgrenzen.
+
+Termine liegen auf festen Uhrzeit-Rastern (Intervall ab Epoche bzw. Cron-Minuten)
+und verschieben sich nicht um die Laufzeit eines Backups.
+"""
+import datetime
+import os
+import threading
+import time
+from collections import Counter
+
+from autobackup.config import OVERRUN_POLICIES
+from autobackup.engine import BackupEngine
+from autobackup.metrics import job_textfile
+
+MAX_QUEUED_RUNS = 100
+THROTTLE_KEYS = ("max_bytes_per_second", "max_files_per_second", "adaptive_throttle")
+
+CRON_ALIASES = {
+    "@hourly": "0 * * * *",
+    "@daily": "0 0 * * *",
+    "@weekly": "0 0 * * 0",
+    "@monthly": "0 0 1 * *",
+    "@yearly": "0 0 1 1 *",
+}
+
+
+def _parse_field(field, low, high):
+    values = set()
+    for part in field.split(","):
+        part, _, step = part.partition("/")
+        step = int(step) if step else 1
+        if part == "*":
+            start, end = low, high
+        elif "-" in part:
+            start, end = (int(v) for v in part.split("-", 1))
+        else:
+            start = int(part)
+            end = high if step > 1 else start
+        if step < 1 or start < low or end > high or start > end:
+            raise ValueError(f"Ungültiges Cron-Feld: {field!r}")
+        values.update(range(start, end + 1, step))
+    return values
+
+
+class CronSchedule:
+    """Cron-Ausdruck mit fünf Feldern (Minute Stunde Tag Monat Wochentag), z.B. "*/15 * * * *" """
+
+    def __init__(self, expression):
+        self.expression = expression
+        fields = CRON_ALIASES.get(expression.strip(), expression).split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron-Ausdruck braucht 5 Felder: {expression!r}")
+        self.minutes = _parse_field(fields[0], 0, 59)
+        self.hours = _parse_field(fields[1], 0, 23)
+        self.days = _parse_field(fields[2], 1, 31)
+        self.months = _parse_field(fields[3], 1, 12)
+        # 0 und 7 sind Sonntag; datetime.weekday() zählt ab Montag = 0
+        self.weekdays = {(d - 1) % 7 for d in _parse_field(fields[4], 0, 7)}
+        self.any_day = fields[2] == "*"
+        self.any_weekday = fields[4] == "*"
+
+    def day_matches(self, day):
+        dom = day.day in self.days
+        dow = day.weekday() in self.weekdays
+        # Wie cron: sind Tag und Wochentag eingeschränkt, reicht einer von beiden
+        if self.any_day or self.any_weekday:
+            return dom and dow
+        return dom or dow
+
+    def next_after(self, timestamp):
+        """Nächster Termin (Unix-Zeit) strikt nach timestamp"""
+        t = datetime.datetime.fromtimestamp(timestamp).replace(second=0, microsecond=0) + datetime.timedelta(minutes=1)
+        limit = t + datetime.timedelta(days=366 * 5)
+        while t < limit:
+            if t.month not in self.months or not self.day_matches(t):
+                t = (t + datetime.timedelta(days=1)).replace(hour=0, minute=0)
+            elif t.hour not in self.hours:
+                t = (t + datetime.timedelta(hours=1)).replace(minute=0)
+            elif t.minute not in self.minutes:
+                t += datetime.timedelta(minutes=1)
+            else:
+                return t.timestamp()
+        raise ValueError(f"Cron-Ausdruck trifft nie zu: {self.expression!r}")
+
+
+def _devices(config):
+    devices = set()
+    paths = [config.source_dir, config.backup_dir] + list(config.extra_backup_dirs)
+    if config.storage and not config.storage.startswith("s3://"):
+        paths.append(config.storage)
+    for path in paths:
+        try:
+            devices.add(os.stat(path).st_dev)
+        except OSError:
+            pass
+    return devices
+
+
+class Job:
+    """Ein Backup-Job mit eigener Engine, Zeitplan und Überlauf-Verhalten"""
+
+    def __init__(self, name, config, log=print):
+        if config.overrun not in OVERRUN_POLICIES:
+            raise ValueError(f"Job {name}: unbekanntes overrun {config.overrun!r} (erlaubt: {', '.join(OVERRUN_POLICIES)})")
+        self.name = name
+        self.config = config
+        self.cron = CronSchedule(config.cron) if config.cron else None
+        self.engine = BackupEngine(config, log=log)
+        self.devices = _devices(config)
+        self.next_run = None
+        self.due = None
+        self.running = False
+        self.waiting = False
+        self.pending = 0
+
+    @property
+    def priority(self):
+        return self.config.priority
+
+    def next_tick(self, now):
+        """Nächster Termin nach now; Intervalle laufen auf einem festen Raster ab der Epoche"""
+        if self.cron is not None:
+            return self.cron.next_after(now)
+        interval = max(1, self.config.interval)
+        return (now // interval + 1) * interval
+
+
+def job_configs(config):
+    """(Name, BackupConfig) pro Job; jeder Eintrag in config.jobs überschreibt nur einzelne Werte"""
+    if not config.jobs:
+        return [(config.job_name, config.copy(jobs=[]))]
+    configs = []
+    for i, values in enumerate(config.jobs, 1):
+        values = dict(values)
+        name = values.pop("name", None) or values.pop("job_name", None) or f"job{i}"
+        if config.metrics_textfile and "metrics_textfile" not in values:
+            # Ein gemeinsames Textfile würde jeder Lauf mit seinem Job überschreiben
+            values["metrics_textfile"] = job_textfile(config.metrics_textfile, name)
+        configs.append((name, config.copy(jobs=[], job_name=name, **values)))
+    return configs
+
+
+def build_jobs(config, log=print):
+    if not config.jobs:
+        return [Job(config.job_name, config.copy(jobs=[]), log)]
+    return [Job(name, job_config, lambda message, name=name: log(f"[{name}] {message}"))
+            for name, job_config in job_configs(config)]
+
+
+class Scheduler:
+    """Startet fällige Jobs nach Priorität, begrenzt gleichzeitige Jobs insgesamt und pro Laufwerk"""
+
+    def __init__(self, jobs, max_concurrent=2, max_per_device=1, log=print):
+        self.jobs = jobs
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_per_device = max(1, max_per_device)
+        self.log = log
+        self.cond = threading.Condition()
+        self.ready = []
+        self.threads = {}
+        self.device_load = Counter()
+        self.stopped = False
+
+    def stop(self):
+        with self.cond:
+            self.stopped = True
+            for job in self.jobs:
+                job.engine.stop()
+            self.cond.notify_all()
+
+    def update_limits(self, config):
+        """Drosselung aller Jobs aus neu geladenen Einstellungen übernehmen, ohne die Schleife neu zu starten"""
+        configs = dict(job_configs(config))
+        for job in self.jobs:
+            new = configs.get(job.name)
+            if new is not None:
+                job.engine.update_limits(**{key: getattr(new, key) for key in THROTTLE_KEYS})
+
+    def run_all_once(self):
+        """Jeden Job einmal nacheinander ausführen (höchste Priorität zuerst); liefert die Anzahl Fehler"""
+        failed = 0
+        for job in sorted(self.jobs, key=lambda job: -job.priority):
+            if self.stopped:
+                break
+            job.engine.run_once()
+            failed += job.engine.last_backup_failed
+        for job in self.jobs:
+            job.engine.wait_scrub()
+        return failed
+
+    def run(self):
+        """Bis stop() Jobs zu ihren Terminen starten; laufende Jobs werden zu Ende geführt
+
+        Jobs im Watch-Modus laufen dauerhaft in eigenen Threads und zählen nicht
+        zu max_concurrent bzw. max_jobs_per_device.
+        """
+        watchers = [threading.Thread(target=job.engine.run_loop, name=f"watch-{job.name}", daemon=True)
+                    for job in self.jobs if job.config.watch_mode]
+        scheduled = [job for job in self.jobs if not job.config.watch_mode]
+        for thread in watchers:
+            thread.start()
+        with self.cond:
+            now = time.time()
+            for job in scheduled:
+                job.next_run = job.next_tick(now)
+            while not self.stopped:
+                now = time.time()
+                for job in scheduled:
+                    if job.next_run <= now:
+                        self.tick(job, job.next_run)
+                        job.next_run = job.next_tick(now)
+                self.dispatch()
+                # Nur Watch-Jobs: bis stop() warten
+                self.cond.wait(max(0.0, min(job.next_run for job in scheduled) - time.time()) if scheduled else None)
+            threads = list(self.threads.values())
+        for thread in threads + watchers:
+            thread.join()
+        for job in scheduled:
+            job.engine.wait_scrub(cancel=True)
+
+    def tick(self, job, due):
+        if job.waiting:
+            # Wartet noch auf einen freien Platz: ein weiterer Termin zählt nur bei "queue"
+            if job.config.overrun == "queue":
+                job.pending = min(MAX_QUEUED_RUNS, job.pending + 1)
+        elif job.running:
+            if job.config.overrun == "skip":
+                job.engine.log("⏭ Termin übersprungen, der vorherige Lauf ist noch aktiv.")
+            elif job.config.overrun == "coalesce":
+                job.pending = 1
+            else:
+                job.pending = min(MAX_QUEUED_RUNS, job.pending + 1)
+        else:
+            self.enqueue(job, due)
+
+    def enqueue(self, job, due):
+        job.waiting = True
+        job.due = due
+        self.ready.append(job)
+
+    def dispatch(self):
+        self.ready.sort(key=lambda job: (-job.priority, job.due))
+        for job in list(self.ready):
+            if len(self.threads) >= self.max_concurrent:
+                break
+            if any(self.device_load[device] >= self.max_per_device for device in job.devices):
+                continue
+            self.ready.remove(job)
+            job.waiting = False
+            job.running = True
+            self.device_load.update(job.devices)
+            thread = threading.Thread(target=self.execute, args=(job,), name=f"backup-{job.name}", daemon=True)
+            self.threads[job] = thread
+            thread.start()
+
+    def execute(self, job):
+        try:
+            job.engine.run_once()
+        finally:
+            with self.cond:
+                job.running = False
+                self.device_load.subtract(job.devices)
+                del self.threads[job]
+                if job.pending and not self.stopped:
+                    job.pending -= 1
+                    self.enqueue(job, time.time())
+                self.cond.notify_all()
@@ -0,0 +1,100 @@
+"""Versionierte Snapshots mit Hardlinks auf unveränderte Dateien (wie rsync --link-dest)."""
+import os
+import shutil
+import time
+
+SNAPSHOT_FORMAT = "%Y-%m-%d_%H-%M-%S"
+IN_PROGRESS_SUFFIX = ".inprogress"
+SNAPSHOT_INDEX_FILE = "snapshots.sqlite"
+
+
+def snapshot_time(name):
+    """Zeitpunkt eines Snapshots aus seinem Namen (Unix-Zeit)"""
+    return time.mktime(time.strptime(name.split("+", 1)[0], SNAPSHOT_FORMAT))
+
+
+def remove_tree(path):
+    """Ordner löschen; liefert die Bytes von Dateien, deren letzter Hardlink dabei entfernt wurde"""
+    freed = 0
+    for dirpath, dirnames, filenames in os.walk(path, topdown=False):
+        for filename in filenames:
+            file_path = os.path.join(dirpath, filename)
+            try:
+                st = os.lstat(file_path)
+                os.remove(file_path)
+            except FileNotFoundError:
+                continue
+            # Der Link-Zähler ist der Referenzzähler: nur die letzte Kopie gibt Platz frei
+            if st.st_nlink == 1:
+                freed += st.st_size
+        for dirname in dirnames:
+            dir_path = os.path.join(dirpath, dirname)
+            if os.path.islink(dir_path):
+                os.remove(dir_path)
+            else:
+                os.rmdir(dir_path)
+    os.rmdir(path)
+    return freed
+
+
+def is_snapshot_name(name):
+    try:
+        time.strptime(name.split("+", 1)[0], SNAPSHOT_FORMAT)
+        return True
+    except ValueError:
+        return False
+
+
+class SnapshotStore:
+    """Ein Ordner pro Lauf im Backup-Ordner; jeder Snapshot ist ein normaler, durchsuchbarer Ordner."""
+
+    def __init__(self, root):
+        self.root = root
+
+    def list_snapshots(self):
+        """Namen aller fertigen Snapshots, älteste zuerst"""
+        try:
+            names = os.listdir(self.root)
+        except FileNotFoundError:
+            return []
+        return sorted(name for name in names
+                      if is_snapshot_name(name) and os.path.isdir(os.path.join(self.root, name)))
+
+    def path(self, name):
+        return os.path.join(self.root, name)
+
+    def latest(self):
+        names = self.list_snapshots()
+        return names[-1] if names else None
+
+    def begin(self):
+        """Neuen Snapshot-Ordner mit Endung .inprogress anlegen; liefert dessen Namen"""
+        for name in os.listdir(self.root):
+            if name.endswith(IN_PROGRESS_SUFFIX):
+                # Reste eines abgebrochenen Laufs: Hardlinks darin nie weiterverwenden
+                shutil.rmtree(os.path.join(self.root, name), ignore_errors=True)
+        base = time.strftime(SNAPSHOT_FORMAT)
+        name = base
+        suffix = 1
+        while os.path.exists(self.path(name)):
+            suffix += 1
+            name = f"{base}+{suffix}"
+        os.makedirs(self.path(name + IN_PROGRESS_SUFFIX))
+        return name
+
+    def work_path(self, name):
+        return self.path(name + IN_PROGRESS_SUFFIX)
+
+    def finish(self, name):
+        """Fertigen Snapshot unter seinem endgültigen Namen sichtbar machen"""
+        os.replace(self.work_path(name), self.path(name))
+
+    def abort(self, name):
+        shutil.rmtree(self.work_path(name), ignore_errors=True)
+
+    def remove(self, name):
+        """Snapshot löschen; liefert die freigegebenen Bytes"""
+        # Erst umbenennen: ein halb gelöschter Snapshot darf nie als fertiger Snapshot erscheinen
+        work = self.work_path(name)
+        os.replace(self.path(name), work)
+        return remove_tree(work)
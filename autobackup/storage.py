@@ -0,0 +1,127 @@
+"""Speicher-Backends für das Format "packs": lokaler bzw. Netzwerk-Ordner oder S3-kompatibler Objektspeicher.
+
+Schlüssel sind relative Namen mit "/" als Trenner, z.B. "packs/1f3a….pack".
+"""
+import os
+import time
+
+from autobackup.chunkstore import write_atomic
+
+READ_SIZE = 8 * 1024 * 1024
+
+
+class StorageBackend:
+    """Schnittstelle aller Backends; Methoden werden aus mehreren Worker-Threads gleichzeitig aufgerufen."""
+
+    def put(self, key, data):
+        """Objekt vollständig und atomar ablegen (bytes oder bytearray)"""
+        raise NotImplementedError
+
+    def put_blocks(self, key, blocks):
+        """Objekt aus einem Strom von Blöcken ablegen, ohne es ganz im Speicher zu halten; liefert die Bytes"""
+        raise NotImplementedError
+
+    def get(self, key, offset=0, length=None):
+        """Objekt oder einen Bereich daraus lesen"""
+        raise NotImplementedError
+
+    def get_into(self, key, f):
+        """Objekt blockweise in f schreiben; bei einer Wiederholung wird f per seek(0) und truncate() geleert"""
+        raise NotImplementedError
+
+    def list(self, prefix=""):
+        """Alle Schlüssel, die mit prefix beginnen, sortiert"""
+        raise NotImplementedError
+
+    def delete(self, key):
+        """Objekt löschen; ein fehlendes Objekt ist kein Fehler"""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+def read_blocks(f, throttle=None, block_size=READ_SIZE):
+    """Datei blockweise lesen, gedrosselt wie beim Kopieren"""
+    while True:
+        start = time.perf_counter()
+        data = f.read(block_size)
+        if not data:
+            return
+        if throttle:
+            throttle.data(len(data), time.perf_counter() - start)
+        yield data
+
+
+class LocalBackend(StorageBackend):
+    """Objekte als Dateien unterhalb eines (auch eingebundenen Netzwerk-)Ordners."""
+
+    def __init__(self, root):
+        self.root = root
+
+    def path(self, key):
+        return os.path.join(self.root, *key.split("/"))
+
+    def put(self, key, data):
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        write_atomic(path, data)
+
+    def put_blocks(self, key, blocks):
+        target = self.path(key)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        tmp_path = target + ".tmp"
+        written = 0
+        try:
+            with open(tmp_path, "wb") as f:
+                for data in blocks:
+                    f.write(data)
+                    written += len(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, target)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+        return written
+
+    def get(self, key, offset=0, length=None):
+        with open(self.path(key), "rb") as f:
+            f.seek(offset)
+            return f.read() if length is None else f.read(length)
+
+    def get_into(self, key, f):
+        with open(self.path(key), "rb") as fsrc:
+            for data in read_blocks(fsrc):
+                f.write(data)
+
+    def list(self, prefix=""):
+        # Nur den Ordner des Präfixes durchsuchen, nicht den ganzen Speicher
+        base = prefix.rsplit("/", 1)[0] if "/" in prefix else ""
+        keys = []
+        for folder, _, names in os.walk(self.path(base) if base else self.root):
+            rel_folder = os.path.relpath(folder, self.root).replace(os.sep, "/")
+            for name in names:
+                key = name if rel_folder == "." else f"{rel_folder}/{name}"
+                if key.startswith(prefix) and ".tmp" not in name:
+                    keys.append(key)
+        return sorted(keys)
+
+    def delete(self, key):
+        try:
+            os.remove(self.path(key))
+        except FileNotFoundError:
+            pass
+
+
+def open_backend(config):
+    """Backend für config.storage (leer = backup_dir, s3://bucket/präfix = Objektspeicher)"""
+    storage = config.storage or config.backup_dir
+    if storage.startswith("s3://"):
+        from autobackup.s3 import S3Backend
+
+        return S3Backend.from_config(config)
+    return LocalBackend(storage)
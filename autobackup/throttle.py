@@ -0,0 +1,208 @@
+"""Drosselung der Kopierpfade: Token-Buckets für Bytes/s und Dateien/s, adaptive Pause bei steigender
+Leselatenz und niedrige CPU-/I/O-Priorität für Backup-Threads.
+
+Alle Grenzen lassen sich zur Laufzeit mit configure() ändern; laufende Kopien
+übernehmen sie beim nächsten Block.
+"""
+import ctypes
+import os
+import platform
+import sys
+import threading
+import time
+
+THROTTLE_CHUNK = 4 * 1024 * 1024  # gedrosselte Kopien laufen in Blöcken dieser Größe
+SAMPLE_INTERVAL = 0.5  # Sekunden zwischen zwei Latenz-Messungen
+LATENCY_FACTOR = 2.0  # Latenz über dem Doppelten der Grundlinie gilt als Überlast
+MIN_LATENCY = 0.001  # darunter wird nie gebremst
+MIN_SPEED = 1 / 16  # stärkste adaptive Bremse: 1/16 der normalen Geschwindigkeit
+
+IOPRIO_CLASS_SHIFT = 13
+IOPRIO_WHO_PROCESS = 1
+IOPRIO_CLASSES = {"best-effort": (2, 7), "idle": (3, 0)}
+IOPRIO_SET = {"x86_64": 251, "i386": 289, "i686": 289, "aarch64": 30, "armv7l": 314}
+THREAD_MODE_BACKGROUND_BEGIN = 0x00010000
+
+
+class TokenBucket:
+    """Thread-sicherer Token-Bucket; rate 0 = unbegrenzt.
+
+    Entnahmen dürfen den Bucket ins Minus ziehen; der Aufrufer wartet die
+    Schuld ab. So kommen auch Blöcke größer als burst durch.
+    """
+
+    def __init__(self, rate=0):
+        self.lock = threading.Lock()
+        self.tokens = 0.0
+        self.set_rate(rate)
+
+    def set_rate(self, rate):
+        with self.lock:
+            self.rate = max(0.0, float(rate or 0))
+            self.burst = max(self.rate, 1.0)  # höchstens eine Sekunde Vorrat
+            self.tokens = min(self.tokens, self.burst)
+            self.updated = time.monotonic()
+
+    def reserve(self, n):
+        """n Tokens entnehmen; liefert die Wartezeit in Sekunden"""
+        with self.lock:
+            if not self.rate:
+                return 0.0
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= n
+            return max(0.0, -self.tokens / self.rate)
+
+
+class DeviceLatency:
+    """Mittlere Leselatenz eines Block-Geräts aus /sys/dev/block/<major>:<minor>/stat (nur Linux)"""
+
+    def __init__(self, path):
+        dev = os.stat(path).st_dev
+        self.stat_path = f"/sys/dev/block/{os.major(dev)}:{os.minor(dev)}/stat"
+        self.last = self.read()
+
+    @classmethod
+    def open(cls, path):
+        if not sys.platform.startswith("linux"):
+            return None
+        try:
+            probe = cls(path)
+        except (OSError, ValueError, IndexError):
+            return None
+        return probe
+
+    def read(self):
+        with open(self.stat_path) as f:
+            fields = f.read().split()
+        return int(fields[0]), int(fields[3])  # abgeschlossene Lesevorgänge, Millisekunden beim Lesen
+
+    def sample(self):
+        """Latenz pro Lesevorgang seit der letzten Messung in Sekunden (None ohne Lesevorgänge)"""
+        reads, ticks = self.read()
+        last_reads, last_ticks = self.last
+        self.last = (reads, ticks)
+        if reads <= last_reads:
+            return None
+        return (ticks - last_ticks) / 1000 / (reads - last_reads)
+
+
+class Throttle:
+    """Bremst die Kopier-Worker eines Jobs nach den Grenzen aus der BackupConfig.
+
+    Im adaptiven Modus wird nach jedem Block zusätzlich pausiert, sobald die
+    Leselatenz des Quell-Laufwerks deutlich über ihre Grundlinie steigt. Ohne
+    Gerätestatistik (z.B. Windows) dient die eigene Lesezeit pro MiB als Signal.
+    """
+
+    chunk_size = THROTTLE_CHUNK
+
+    def __init__(self, config, stop_event=None):
+        self.stop_event = stop_event or threading.Event()
+        self.bytes = TokenBucket()
+        self.files = TokenBucket()
+        self.lock = threading.Lock()
+        self.probe = None
+        self.baseline = None
+        self.speed = 1.0
+        self.next_sample = 0.0
+        self.op_time = 0.0
+        self.op_bytes = 0
+        self.configure(config)
+
+    def configure(self, config):
+        """Grenzen (neu) übernehmen; darf jederzeit aus einem anderen Thread aufgerufen werden"""
+        self.bytes.set_rate(config.max_bytes_per_second)
+        self.files.set_rate(config.max_files_per_second)
+        self.adaptive = bool(config.adaptive_throttle)
+        if self.adaptive and self.probe is None:
+            self.probe = DeviceLatency.open(config.source_dir)
+        if not self.adaptive:
+            self.speed = 1.0
+
+    @property
+    def active(self):
+        return bool(self.bytes.rate or self.files.rate or self.adaptive)
+
+    def wait(self, seconds):
+        if seconds > 0:
+            self.stop_event.wait(seconds)
+
+    def file(self):
+        """Vor jeder Datei aufrufen"""
+        self.wait(self.files.reserve(1))
+
+    def data(self, n, seconds):
+        """Nach jedem kopierten Block aufrufen: n Bytes in seconds Sekunden"""
+        delay = self.bytes.reserve(n)
+        if self.adaptive:
+            self.observe(n, seconds)
+            # Bei Überlast Pausen einlegen, sodass nur noch der Anteil speed der Zeit kopiert wird
+            delay = max(delay, seconds * (1 / self.speed - 1))
+        self.wait(delay)
+
+    def observe(self, n, seconds):
+        with self.lock:
+            self.op_time += seconds
+            self.op_bytes += n
+            now = time.monotonic()
+            if now < self.next_sample:
+                return
+            self.next_sample = now + SAMPLE_INTERVAL
+            if self.probe is not None:
+                try:
+                    latency = self.probe.sample()
+                except OSError:
+                    self.probe = None
+                    latency = None
+            else:
+                latency = self.op_time / max(1, self.op_bytes / (1024 * 1024))
+            self.op_time = 0.0
+            self.op_bytes = 0
+            if latency is None:
+                return
+            if self.baseline is None:
+                self.baseline = latency
+            elif latency > max(self.baseline * LATENCY_FACTOR, MIN_LATENCY):
+                self.speed = max(MIN_SPEED, self.speed / 2)
+                return
+            else:
+                # Grundlinie nur aus unbelasteten Messungen nachführen
+                self.baseline = self.baseline * 0.9 + latency * 0.1
+            self.speed = min(1.0, self.speed * 1.25)
+
+
+def _ioprio_set(io_class):
+    number = IOPRIO_SET.get(platform.machine())
+    if number is None:
+        raise OSError("ioprio_set wird auf dieser Architektur nicht unterstützt")
+    klass, level = IOPRIO_CLASSES[io_class]
+    libc = ctypes.CDLL(None, use_errno=True)
+    if libc.syscall(number, IOPRIO_WHO_PROCESS, threading.get_native_id(), (klass << IOPRIO_CLASS_SHIFT) | level) != 0:
+        raise OSError(ctypes.get_errno(), "ioprio_set fehlgeschlagen")
+
+
+def lower_priority(config):
+    """Aktuellen Thread auf config.nice und config.io_priority setzen
+
+    Linux: nice und ioprio pro Thread; Windows: Hintergrundmodus des Threads
+    (niedrige CPU- und I/O-Priorität); sonst ohne Wirkung.
+    """
+    if sys.platform == "win32":
+        if config.nice or config.io_priority:
+            kernel32 = ctypes.windll.kernel32
+            kernel32.SetThreadPriority(kernel32.GetCurrentThread(), THREAD_MODE_BACKGROUND_BEGIN)
+        return
+    if not sys.platform.startswith("linux"):
+        return
+    if config.nice:
+        try:
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), int(config.nice))
+        except OSError:
+            pass
+    if config.io_priority in IOPRIO_CLASSES:
+        try:
+            _ioprio_set(config.io_priority)
+        except OSError:
+            pass
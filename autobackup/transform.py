@@ -0,0 +1,308 @@
+"""Optionale Transformation vor dem Speichern (Format "packs"): Kompression pro Datei und Verschlüsselung.
+
+Kompression: zlib oder lzma aus der Standardbibliothek, zstd wenn das Paket
+zstandard installiert ist. Bereits komprimierte Dateitypen werden unverändert
+übernommen. Verschlüsselung: AES-256-GCM aus dem optionalen Paket
+cryptography, als Strom aus Segmenten von 1 MiB. Jedes Segment ist einzeln
+authentifiziert; das letzte ist markiert, damit auch abgeschnittene Daten
+auffallen. Der Schlüssel wird per scrypt aus einer Passphrase abgeleitet.
+
+Die Kompressoren geben die GIL frei; alles läuft auf dem Worker-Pool der
+Engine, sodass mehrere Kerne gleichzeitig komprimieren.
+"""
+import hashlib
+import lzma
+import os
+import struct
+import zlib
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    from cryptography.exceptions import InvalidTag
+    from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+except ImportError:
+    AESGCM = None
+
+COMPRESSIONS = ("zlib", "lzma", "zstd")
+DEFAULT_LEVELS = {"zlib": 6, "lzma": 6, "zstd": 3}
+# Komprimieren lohnt hier nicht: Archive, Medien und Office-Formate (intern ZIP)
+COMPRESSED_EXTENSIONS = frozenset((
+    ".7z", ".gz", ".tgz", ".bz2", ".xz", ".lz", ".lz4", ".lzma", ".zst", ".zip", ".rar", ".cab", ".jar", ".apk",
+    ".jpg", ".jpeg", ".png", ".gif", ".webp", ".heic", ".avif",
+    ".mp3", ".aac", ".ogg", ".opus", ".flac", ".m4a", ".mp4", ".m4v", ".mkv", ".mov", ".avi", ".webm",
+    ".docx", ".xlsx", ".pptx", ".odt", ".ods", ".odp", ".epub", ".pdf",
+))
+
+MAGIC = b"ABE1"
+SALT_SIZE = 16
+NONCE_PREFIX_SIZE = 8
+SEGMENT_SIZE = 1024 * 1024
+SCRYPT_N = 2 ** 14
+PROBE_SIZE = 256 * 1024  # so viel vom Anfang großer Dateien probeweise komprimieren
+PROBE_RATIO = 0.95  # weniger Ersparnis: unkomprimiert ablegen
+
+
+def derive_key(passphrase, salt):
+    return hashlib.scrypt(passphrase.encode("utf-8"), salt=salt, n=SCRYPT_N, r=8, p=1, dklen=32)
+
+
+def read_key_file(path):
+    """Passphrase aus einer Datei (erste Zeile), damit sie nicht in settings.json steht"""
+    with open(path, "r", encoding="utf-8") as f:
+        passphrase = f.readline().strip()
+    if not passphrase:
+        raise ValueError(f"Schlüsseldatei {path} ist leer")
+    return passphrase
+
+
+def _compressor(name, level):
+    if name == "zlib":
+        return zlib.compressobj(level)
+    if name == "lzma":
+        return lzma.LZMACompressor(preset=level)
+    return zstandard.ZstdCompressor(level=level).compressobj()
+
+
+def _decompressor(name):
+    if name == "zlib":
+        return zlib.decompressobj()
+    if name == "lzma":
+        return lzma.LZMADecompressor()
+    return zstandard.ZstdDecompressor().decompressobj()
+
+
+class Encryptor:
+    """Teilt den Strom in Segmente; ein Segment wird erst versiegelt, wenn klar ist, ob es das letzte ist"""
+
+    def __init__(self, key, salt):
+        self.aead = AESGCM(key)
+        self.prefix = os.urandom(NONCE_PREFIX_SIZE)
+        self.header = MAGIC + salt + self.prefix
+        self.counter = 0
+        self.buffer = bytearray()
+
+    def seal(self, data, final):
+        nonce = self.prefix + struct.pack(">I", self.counter)
+        self.counter += 1
+        sealed = self.aead.encrypt(nonce, bytes(data), b"\x01" if final else b"\x00")
+        return struct.pack(">I", len(sealed)) + sealed
+
+    def update(self, data):
+        self.buffer += data
+        out = [self.header]
+        self.header = b""
+        while len(self.buffer) > SEGMENT_SIZE:
+            out.append(self.seal(self.buffer[:SEGMENT_SIZE], False))
+            del self.buffer[:SEGMENT_SIZE]
+        return b"".join(out)
+
+    def finish(self):
+        out = self.header + self.seal(self.buffer, True)
+        self.header = b""
+        self.buffer = bytearray()
+        return out
+
+
+class Decryptor:
+    def __init__(self, transform):
+        self.transform = transform
+        self.aead = None
+        self.buffer = bytearray()
+        self.counter = 0
+        self.done = False
+
+    def update(self, data):
+        self.buffer += data
+        out = []
+        if self.aead is None:
+            header_size = len(MAGIC) + SALT_SIZE + NONCE_PREFIX_SIZE
+            if len(self.buffer) < header_size:
+                return b""
+            if self.buffer[:len(MAGIC)] != MAGIC:
+                raise ValueError("Unbekanntes Verschlüsselungsformat")
+            salt = bytes(self.buffer[len(MAGIC):len(MAGIC) + SALT_SIZE])
+            self.prefix = bytes(self.buffer[len(MAGIC) + SALT_SIZE:header_size])
+            self.aead = AESGCM(self.transform.key_for(salt))
+            del self.buffer[:header_size]
+        while len(self.buffer) >= 4:
+            size = struct.unpack(">I", self.buffer[:4])[0]
+            if len(self.buffer) < 4 + size:
+                break
+            if self.done:
+                raise ValueError("Daten nach dem letzten Segment")
+            out.append(self.open(bytes(self.buffer[4:4 + size])))
+            del self.buffer[:4 + size]
+        return b"".join(out)
+
+    def open(self, sealed):
+        nonce = self.prefix + struct.pack(">I", self.counter)
+        self.counter += 1
+        for final in (False, True):
+            try:
+                data = self.aead.decrypt(nonce, sealed, b"\x01" if final else b"\x00")
+            except InvalidTag:
+                continue
+            self.done = final
+            return data
+        raise ValueError("Entschlüsselung fehlgeschlagen: falscher Schlüssel oder beschädigte Daten")
+
+    def finish(self):
+        if self.aead is None or not self.done or self.buffer:
+            raise ValueError("Verschlüsselte Daten sind unvollständig")
+        return b""
+
+
+class Encoder:
+    """Strom-Transformation einer Datei: update() pro Block, am Ende finish()"""
+
+    def __init__(self, transform, encoding):
+        self.compressor = _compressor(encoding["compression"], transform.level) if encoding.get("compression") else None
+        self.encryptor = transform.new_encryptor() if encoding.get("encrypted") else None
+
+    def update(self, data):
+        if self.compressor is not None:
+            data = self.compressor.compress(data)
+        if self.encryptor is not None:
+            data = self.encryptor.update(data)
+        return data
+
+    def finish(self):
+        data = self.compressor.flush() if self.compressor is not None else b""
+        if self.encryptor is not None:
+            data = self.encryptor.update(data) + self.encryptor.finish()
+        return data
+
+
+class Decoder:
+    def __init__(self, transform, encoding):
+        self.decryptor = Decryptor(transform) if encoding.get("encrypted") else None
+        self.decompressor = _decompressor(encoding["compression"]) if encoding.get("compression") else None
+
+    def update(self, data):
+        if self.decryptor is not None:
+            data = self.decryptor.update(data)
+        if self.decompressor is not None:
+            data = self.decompressor.decompress(data)
+        return data
+
+    def finish(self):
+        data = self.decryptor.finish() if self.decryptor is not None else b""
+        if self.decompressor is not None:
+            # zstd lässt nach dem Ende keinen weiteren Aufruf zu
+            data = self.decompressor.decompress(data) if data else b""
+            if not self.decompressor.eof:
+                raise ValueError("Komprimierte Daten sind unvollständig")
+        return data
+
+
+class DecodingWriter:
+    """Datei-Objekt, das beim Schreiben dekodiert; seek(0)/truncate() beginnen neu (Wiederholung beim Abruf)"""
+
+    def __init__(self, f, transform, encoding):
+        self.f = f
+        self.transform = transform
+        self.encoding = encoding
+        self.decoder = Decoder(transform, encoding)
+
+    def write(self, data):
+        self.f.write(self.decoder.update(data))
+
+    def seek(self, offset):
+        self.f.seek(offset)
+        self.decoder = Decoder(self.transform, self.encoding)
+
+    def truncate(self):
+        self.f.truncate()
+
+    def close(self):
+        self.f.write(self.decoder.finish())
+
+
+class Transform:
+    """Einstellungen der Transformation; ein Objekt pro Lauf, von allen Workern gemeinsam genutzt"""
+
+    def __init__(self, compression="", level=0, passphrase=""):
+        if compression and compression not in COMPRESSIONS:
+            raise ValueError(f"Unbekannte Kompression {compression!r} (erlaubt: {', '.join(COMPRESSIONS)})")
+        if compression == "zstd" and zstandard is None:
+            raise ValueError("Für zstd fehlt das Paket zstandard (pip install zstandard)")
+        if passphrase and AESGCM is None:
+            raise ValueError("Für die Verschlüsselung fehlt das Paket cryptography (pip install cryptography)")
+        self.compression = compression
+        self.level = level or DEFAULT_LEVELS.get(compression, 0)
+        self.passphrase = passphrase
+        self.keys = {}
+        self.hash_keys = {}
+        # Ein Salz pro Lauf, schon hier gewählt, damit parallele Worker nicht verschiedene erzeugen
+        self.salt = os.urandom(SALT_SIZE)
+
+    @classmethod
+    def from_config(cls, config):
+        passphrase = read_key_file(config.encryption_key_file) if config.encryption_key_file else ""
+        return cls(config.compression, config.compression_level, passphrase)
+
+    @property
+    def active(self):
+        return bool(self.compression or self.passphrase)
+
+    def encoding_for(self, name):
+        """Kodierung für eine Datei als Manifest-Felder, z.B. {"compression": "zstd", "encrypted": True}"""
+        encoding = {}
+        if self.compression and os.path.splitext(name)[1].lower() not in COMPRESSED_EXTENSIONS:
+            encoding["compression"] = self.compression
+        if self.passphrase:
+            encoding["encrypted"] = True
+        return encoding
+
+    def probe(self, sample, encoding):
+        """Kodierung für eine große Datei anhand ihres Anfangs: ohne Kompression, wenn sie kaum etwas bringt"""
+        if encoding.get("compression") and sample:
+            compressor = _compressor(encoding["compression"], self.level)
+            size = len(compressor.compress(sample[:PROBE_SIZE])) + len(compressor.flush())
+            if size >= PROBE_RATIO * min(len(sample), PROBE_SIZE):
+                return {key: value for key, value in encoding.items() if key != "compression"}
+        return encoding
+
+    def key_for(self, salt):
+        # scrypt ist absichtlich langsam: einmal pro Salz (und damit pro Lauf) statt pro Datei
+        key = self.keys.get(salt)
+        if key is None:
+            if not self.passphrase:
+                raise ValueError("Daten sind verschlüsselt, aber encryption_key_file ist nicht gesetzt")
+            key = self.keys[salt] = derive_key(self.passphrase, salt)
+        return key
+
+    def new_encryptor(self):
+        return Encryptor(self.key_for(self.salt), self.salt)
+
+    def hasher(self, salt=None):
+        """BLAKE2b über den Klartext; mit salt geschlüsselt, damit der Hash nicht verrät, ob eine geratene Datei gesichert ist"""
+        if salt is None:
+            return hashlib.blake2b(digest_size=32)
+        key = self.hash_keys.get(salt)
+        if key is None:
+            # Eigener Schlüssel für den Hash, abgeleitet aus dem scrypt-Schlüssel des Salzes
+            key = self.hash_keys[salt] = hashlib.blake2b(b"autobackup-hash", key=self.key_for(salt),
+                                                         digest_size=32).digest()
+        return hashlib.blake2b(digest_size=32, key=key)
+
+    def encode(self, data, encoding):
+        encoder = Encoder(self, encoding)
+        return encoder.update(data) + encoder.finish()
+
+    def decode(self, data, encoding):
+        decoder = Decoder(self, encoding)
+        return decoder.update(data) + decoder.finish()
+
+    def encode_blocks(self, blocks, encoding):
+        encoder = Encoder(self, encoding)
+        for data in blocks:
+            data = encoder.update(data)
+            if data:
+                yield data
+        yield encoder.finish()
+
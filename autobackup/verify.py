@@ -0,0 +1,349 @@
+"""Integritätsprüfung des Backups: vollständiger Abgleich mit der Quelle und rotierendes Scrubbing.
+
+Referenz-Hashes liegen in .autobackup/checksums.sqlite. Eine Backup-Datei gilt
+als beschädigt, wenn ihr Inhalt nicht mehr zum gespeicherten Hash passt,
+obwohl Größe und mtime unverändert sind (stiller Datenverlust auf dem Medium).
+Im Format packs ist die Referenz der Hash aus dem neuesten Manifest: jede
+Datei wird aus ihrem Pack bzw. Objekt abgerufen, dekodiert und gehasht.
+"""
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter
+
+from autobackup.index import INDEX_DIR, INDEX_FILE, query_prefix, query_paths, file_digest
+
+CHECKSUM_FILE = "checksums.sqlite"
+SYNC_INTERVAL = 3600  # Dateiliste der Prüfsummen-DB höchstens stündlich mit dem Backup abgleichen
+
+# Ergebnis pro Datei
+OK = "ok"
+NEW = "new"  # noch keine Referenz: Hash wird als Referenz gespeichert
+CORRUPT = "corrupt"
+MISSING = "missing"
+CHANGED = "changed"  # Quelle wurde seit dem letzten Backup geändert
+
+
+class ChecksumDB:
+    """Referenz-Hashes und Prüfzeitpunkte pro Datei im Backup"""
+
+    def __init__(self, backup_dir):
+        self.path = os.path.join(backup_dir, INDEX_DIR, CHECKSUM_FILE)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS checksums ("
+            " path TEXT PRIMARY KEY,"
+            " size INTEGER,"
+            " mtime_ns INTEGER,"
+            " digest TEXT,"
+            " verified_at REAL NOT NULL DEFAULT 0,"
+            " status TEXT"
+            ") WITHOUT ROWID")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS checksums_verified ON checksums (verified_at)")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value REAL)")
+
+    def get_meta(self, key, default=None):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return default if row is None else row[0]
+
+    def set_meta(self, key, value):
+        self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def sync(self, paths):
+        """Neue Pfade aufnehmen (noch nie geprüft) und nicht mehr vorhandene entfernen"""
+        with self.lock:
+            self.conn.execute("CREATE TEMP TABLE IF NOT EXISTS current (path TEXT PRIMARY KEY) WITHOUT ROWID")
+            self.conn.execute("DELETE FROM current")
+            self.conn.executemany("INSERT OR IGNORE INTO current (path) VALUES (?)", ((path,) for path in paths))
+            self.conn.execute("INSERT OR IGNORE INTO checksums (path) SELECT path FROM current")
+            self.conn.execute("DELETE FROM checksums WHERE path NOT IN (SELECT path FROM current)")
+            self.set_meta("synced_at", time.time())
+            self.conn.commit()
+
+    def count(self):
+        return self.conn.execute("SELECT COUNT(*) FROM checksums").fetchone()[0]
+
+    def oldest(self, limit):
+        """Die am längsten nicht geprüften Pfade"""
+        return [row[0] for row in self.conn.execute(
+            "SELECT path FROM checksums ORDER BY verified_at LIMIT ?", (limit,))]
+
+    def get(self, path):
+        with self.lock:
+            return self.conn.execute("SELECT size, mtime_ns, digest FROM checksums WHERE path = ?", (path,)).fetchone()
+
+    def record(self, path, status, st=None, digest=None):
+        with self.lock:
+            if digest is None:
+                # Beschädigt, fehlend oder packs (Referenz im Manifest): nur Status und Zeitpunkt setzen
+                self.conn.execute(
+                    "INSERT INTO checksums (path, verified_at, status) VALUES (?, ?, ?)"
+                    " ON CONFLICT(path) DO UPDATE SET verified_at = excluded.verified_at, status = excluded.status",
+                    (path, time.time(), status))
+            else:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO checksums (path, size, mtime_ns, digest, verified_at, status)"
+                    " VALUES (?, ?, ?, ?, ?, ?)",
+                    (path, st.st_size, st.st_mtime_ns, digest, time.time(), status))
+
+    def remove(self, path):
+        with self.lock:
+            self.conn.execute("DELETE FROM checksums WHERE path = ?", (path,))
+
+    def close(self):
+        with self.lock:
+            self.conn.commit()
+            self.conn.close()
+
+
+class Verifier:
+    """Prüft die Backup-Dateien eines Jobs parallel auf dem Worker-Pool der Engine"""
+
+    def __init__(self, config, log=print, throttle=None, initializer=None, cancelled=None):
+        self.config = config
+        self.log = log
+        self.throttle = throttle
+        self.initializer = initializer
+        self.cancelled = cancelled or (lambda: False)  # zwischen zwei Dateien abfragen (Scrubbing im Hintergrund)
+        self.root = config.backup_dir
+        self.expected = {}
+        self.packs = None
+        self.pack_entries = None
+
+    def open_packs(self):
+        """Manifest-Einträge des neuesten Laufs (Format packs); das Backend bleibt bis close_packs() offen"""
+        if self.pack_entries is None:
+            from autobackup.packs import PackStore
+            from autobackup.storage import open_backend
+            from autobackup.transform import Transform
+
+            transform = Transform.from_config(self.config)
+            self.packs = PackStore(open_backend(self.config), os.path.join(self.root, INDEX_DIR), transform=transform)
+            manifest = self.packs.load_latest()
+            self.pack_entries = {} if manifest is None else manifest["files"]
+        return self.pack_entries
+
+    def close_packs(self):
+        if self.packs is not None:
+            self.packs.backend.close()
+        self.packs = None
+        self.pack_entries = None
+
+    def targets(self):
+        """(relativer Pfad, Pfad im Backup bzw. Manifest-Eintrag bei packs, Quellpfad oder None, erwarteter Hash oder None)"""
+        backup_dir = self.config.backup_dir
+        if self.config.backup_format == "packs":
+            for rel_path, entry in sorted(self.open_packs().items()):
+                yield rel_path, entry, os.path.join(self.config.source_dir, rel_path), entry["hash"]
+            return
+        if self.config.backup_format == "chunks":
+            from autobackup.chunkstore import ChunkStore
+
+            # Chunks heißen wie ihr Hash; mit der Quelle lässt sich nichts direkt vergleichen
+            store = ChunkStore(backup_dir)
+            for prefix in sorted(os.listdir(store.chunk_dir)):
+                prefix_dir = os.path.join(store.chunk_dir, prefix)
+                if not os.path.isdir(prefix_dir):
+                    continue
+                for digest in sorted(os.listdir(prefix_dir)):
+                    if len(digest) == 64:
+                        yield os.path.join(prefix, digest), os.path.join(prefix_dir, digest), None, digest
+            return
+        name = INDEX_FILE
+        if self.config.backup_format == "snapshots":
+            from autobackup.snapshots import SnapshotStore, SNAPSHOT_INDEX_FILE
+
+            store = SnapshotStore(backup_dir)
+            latest = store.latest()
+            if latest is None:
+                return
+            backup_dir = store.path(latest)
+            name = SNAPSHOT_INDEX_FILE
+        for rel_path, _, digest in query_prefix(self.config.backup_dir, "", name):
+            yield rel_path, os.path.join(backup_dir, rel_path), os.path.join(self.config.source_dir, rel_path), digest
+
+    def check(self, db, rel_path, backup_path, source_path, expected):
+        """Eine Datei prüfen (läuft im Worker-Pool); liefert den Status"""
+        if self.config.backup_format == "packs":
+            return self.check_pack(db, rel_path, backup_path, source_path, expected)
+        try:
+            st = os.stat(backup_path)
+        except FileNotFoundError:
+            db.record(rel_path, MISSING)
+            return MISSING
+        digest = file_digest(backup_path, throttle=self.throttle)
+        if expected is None:
+            row = db.get(rel_path)
+            if row is not None and row[2] and (row[0], row[1]) == (st.st_size, st.st_mtime_ns):
+                expected = row[2]
+        if expected is not None and digest != expected:
+            db.record(rel_path, CORRUPT)
+            return CORRUPT
+        status = OK if expected is not None else NEW
+        db.record(rel_path, status, st, digest)
+        if source_path is not None:
+            try:
+                if file_digest(source_path, throttle=self.throttle) != digest:
+                    return CHANGED
+            except FileNotFoundError:
+                return CHANGED
+        return status
+
+    def check_pack(self, db, rel_path, entry, source_path, expected):
+        """Datei aus Pack bzw. Objekt abrufen, entschlüsseln/entpacken und gegen den Manifest-Hash prüfen"""
+        from autobackup.restore import HashingWriter
+        from autobackup.s3 import S3Error
+
+        packs = self.packs
+        writer = HashingWriter(None, lambda: packs.hasher(entry))
+        start = time.perf_counter()
+        try:
+            if "pack" in entry:
+                writer.write(packs.read(entry))
+            else:
+                packs.read_into(entry, writer)
+        except (FileNotFoundError, S3Error) as e:
+            if isinstance(e, S3Error) and e.status != 404:
+                raise
+            db.record(rel_path, MISSING)
+            return MISSING
+        except ValueError:
+            # Authentifizierung oder Dekompression fehlgeschlagen: die gespeicherten Daten wurden verändert
+            db.record(rel_path, CORRUPT)
+            return CORRUPT
+        if self.throttle:
+            self.throttle.data(entry["size"], time.perf_counter() - start)
+        if writer.hexdigest() != expected:
+            db.record(rel_path, CORRUPT)
+            return CORRUPT
+        db.record(rel_path, OK)
+        if source_path is not None:
+            try:
+                if file_digest(source_path, throttle=self.throttle, new_hash=lambda: packs.hasher(entry)) != expected:
+                    return CHANGED
+            except FileNotFoundError:
+                return CHANGED
+        return OK
+
+    def run(self, items, db):
+        from autobackup.pipeline import CopyPipeline
+
+        counts = Counter()
+        pipeline = CopyPipeline(lambda item, _: self.check(db, *item), workers=self.config.copy_workers,
+                                large_file_size=self.config.large_file_size, initializer=self.initializer)
+
+        def collect(results):
+            for result in results:
+                rel_path = result.tag
+                if result.error is not None:
+                    counts["error"] += 1
+                    self.log(f"⚠ Fehler beim Prüfen von {rel_path}: {result.error}")
+                    continue
+                counts[result.info] += 1
+                if result.info == CORRUPT:
+                    self.log(f"⚠ Beschädigt im Backup: {rel_path}")
+                elif result.info == MISSING:
+                    self.log(f"⚠ Fehlt im Backup: {rel_path}")
+
+        try:
+            for item in items:
+                if self.cancelled():
+                    break
+                pipeline.submit(item, None, 0, item[0])
+                collect(pipeline.drain())
+        finally:
+            collect(pipeline.finish())
+        return counts
+
+    def verify(self, compare_source=True):
+        """Alle Dateien prüfen, optional zusätzlich gegen die Quelle; liefert Zähler pro Status"""
+        db = ChecksumDB(self.root)
+        try:
+            items = list(self.targets())
+            db.sync(item[0] for item in items)
+            if not compare_source:
+                items = [(rel_path, path, None, expected) for rel_path, path, _, expected in items]
+            counts = self.run(items, db)
+        finally:
+            db.close()
+            self.close_packs()
+        self.log_summary("Prüfung", counts)
+        return counts
+
+    def scrub(self, period, now=None):
+        """Einen Ausschnitt prüfen, sodass alle Dateien innerhalb von period Sekunden einmal drankommen"""
+        now = now or time.time()
+        db = ChecksumDB(self.root)
+        try:
+            if now - db.get_meta("synced_at", 0) >= SYNC_INTERVAL:
+                db.sync(item[0] for item in self.targets())
+            last = db.get_meta("scrubbed_at")
+            elapsed = self.config.interval if last is None else now - last
+            total = db.count()
+            limit = min(total, math.ceil(total * max(0.0, elapsed) / period))
+            if not limit:
+                return Counter()
+            paths = db.oldest(limit)
+            expected = {rel_path: (path, digest) for rel_path, path, _, digest in self.targets_for(paths)}
+            items = []
+            for rel_path in paths:
+                if rel_path in expected:
+                    path, digest = expected[rel_path]
+                    items.append((rel_path, path, None, digest))
+                else:
+                    db.remove(rel_path)  # seit dem letzten Abgleich aus dem Backup verschwunden
+            counts = self.run(items, db)
+            if not self.cancelled():
+                # Abgebrochen: beim nächsten Mal kommen die übrigen Dateien als älteste zuerst dran
+                db.set_meta("scrubbed_at", now)
+        finally:
+            db.close()
+            self.close_packs()
+        if counts[CORRUPT] or counts[MISSING] or counts["error"]:
+            self.log_summary("Scrubbing", counts)
+        return counts
+
+    def targets_for(self, paths):
+        """targets() nur für die angegebenen Pfade, über Index-Abfragen statt einer vollständigen Liste"""
+        if self.config.backup_format == "packs":
+            entries = self.open_packs()
+            for rel_path in paths:
+                if rel_path in entries:
+                    yield rel_path, entries[rel_path], None, entries[rel_path]["hash"]
+            return
+        if self.config.backup_format == "chunks":
+            from autobackup.chunkstore import CHUNK_DIR
+
+            for rel_path in paths:
+                yield rel_path, os.path.join(self.config.backup_dir, CHUNK_DIR, rel_path), None, os.path.basename(rel_path)
+            return
+        root = self.config.backup_dir
+        name = INDEX_FILE
+        if self.config.backup_format == "snapshots":
+            from autobackup.snapshots import SnapshotStore, SNAPSHOT_INDEX_FILE
+
+            store = SnapshotStore(root)
+            latest = store.latest()
+            if latest is None:
+                return
+            root = store.path(latest)
+            name = SNAPSHOT_INDEX_FILE
+        for rel_path, _, digest in query_paths(self.config.backup_dir, paths, name):
+            yield rel_path, os.path.join(root, rel_path), None, digest
+
+    def log_summary(self, what, counts):
+        parts = [f"{counts[OK] + counts[NEW]} in Ordnung"]
+        if counts[NEW]:
+            parts.append(f"{counts[NEW]} davon erstmals erfasst")
+        for status, label in ((CHANGED, "seit dem Backup geändert"), (CORRUPT, "beschädigt"),
+                              (MISSING, "fehlend"), ("error", "nicht lesbar")):
+            if counts[status]:
+                parts.append(f"{counts[status]} {label}")
+        prefix = "⚠" if counts[CORRUPT] or counts[MISSING] or counts["error"] else "✅"
+        self.log(f"{prefix} {what} abgeschlossen: " + ", ".join(parts) + ".")
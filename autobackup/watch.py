@@ -0,0 +1,203 @@
+"""Ereignisgesteuerte Überwachung des Quellordners (inotify mit Polling-Fallback)."""
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import sys
+import time
+
+from autobackup.config import DEFAULT_DEBOUNCE
+
+DEFAULT_MAX_DELAY = 30.0
+DEFAULT_POLL_INTERVAL = 10.0
+
+# inotify-Konstanten aus <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+              | IN_MOVED_FROM | IN_DELETE | IN_DELETE_SELF)
+REMOVED_MASK = IN_MOVED_FROM | IN_DELETE | IN_DELETE_SELF
+
+EVENT_HEADER = struct.Struct("iIII")
+
+
+def parent_dir(rel_path):
+    """Elternordner eines relativen Pfads; "" steht für den Quellordner selbst"""
+    parent = os.path.dirname(rel_path)
+    return "" if parent == "." else parent
+
+
+class Watcher:
+    """Gemeinsame Entprell-Logik: Ereignisse werden zu einer Menge geänderter Pfade zusammengefasst."""
+
+    def read_events(self, timeout):
+        """Liefert relative Pfade seit dem letzten Aufruf, None bei verlorenen Ereignissen"""
+        raise NotImplementedError
+
+    def wait_for_changes(self, timeout, debounce=DEFAULT_DEBOUNCE, max_delay=DEFAULT_MAX_DELAY):
+        """Warte bis zu timeout Sekunden auf Änderungen und sammle sie, bis debounce Sekunden Ruhe ist.
+
+        Rückgabe: Menge relativer Pfade (leer = nichts passiert) oder None,
+        wenn Ereignisse verloren gingen und ein vollständiger Scan nötig ist.
+        """
+        dirty = set()
+        overflow = False
+        deadline = None
+        wait = timeout
+        while True:
+            events = self.read_events(wait)
+            if events is None:
+                overflow = True
+            elif events:
+                dirty |= events
+            elif dirty or overflow:
+                break
+            else:
+                return dirty
+
+            now = time.monotonic()
+            if deadline is None:
+                deadline = now + max_delay
+            if now >= deadline:
+                break
+            wait = min(debounce, deadline - now)
+        return None if overflow else dirty
+
+    def close(self):
+        pass
+
+
+class InotifyWatcher(Watcher):
+    """Linux-inotify über ctypes, rekursiv für alle Unterordner."""
+
+    def __init__(self, root):
+        self.root = root
+        self.libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 fehlgeschlagen")
+        self.watches = {}
+        try:
+            self.add_tree("")
+        except Exception:
+            os.close(self.fd)
+            raise
+
+    def add_tree(self, rel_dir):
+        """Alle Ordner unterhalb von rel_dir beobachten"""
+        for root, _, _ in os.walk(os.path.join(self.root, rel_dir)):
+            wd = self.libc.inotify_add_watch(self.fd, os.fsencode(root), WATCH_MASK)
+            if wd < 0:
+                err = ctypes.get_errno()
+                if err in (errno.ENOENT, errno.ENOTDIR):
+                    continue
+                raise OSError(err, f"inotify_add_watch fehlgeschlagen für {root}")
+            self.watches[wd] = os.path.relpath(root, self.root)
+
+    def read_events(self, timeout):
+        ready, _, _ = select.select([self.fd], [], [], max(0, timeout))
+        if not ready:
+            return set()
+        try:
+            data = os.read(self.fd, 256 * 1024)
+        except BlockingIOError:
+            return set()
+
+        changed = set()
+        overflow = False
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b"\0"))
+            offset += length
+
+            if mask & IN_Q_OVERFLOW:
+                overflow = True
+                continue
+            if mask & IN_IGNORED:
+                self.watches.pop(wd, None)
+                continue
+            rel_dir = self.watches.get(wd)
+            if rel_dir is None:
+                continue
+            if mask & IN_DELETE_SELF:
+                # Beobachteter Ordner selbst gelöscht (z.B. der Quellordner): seinen Elternordner neu scannen
+                changed.add(parent_dir(rel_dir))
+                continue
+            if not name:
+                continue
+            rel_path = os.path.normpath(os.path.join(rel_dir, name))
+            if mask & REMOVED_MASK:
+                # Gelöscht oder wegbenannt: der Elternordner zeigt, was noch da ist
+                changed.add(parent_dir(rel_path))
+                continue
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    # Neuer Ordner: beobachten und komplett als geändert markieren
+                    self.add_tree(rel_path)
+                    changed.add(rel_path)
+                continue
+            changed.add(rel_path)
+        return None if overflow else changed
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+class PollingWatcher(Watcher):
+    """Fallback ohne inotify: vergleicht periodisch Größe und mtime aller Dateien."""
+
+    def __init__(self, root, poll_interval=DEFAULT_POLL_INTERVAL):
+        self.root = root
+        self.poll_interval = poll_interval
+        self.snapshot = self.take_snapshot()
+        self.last_poll = time.monotonic()
+
+    def take_snapshot(self):
+        snapshot = {}
+        for root, _, files in os.walk(self.root):
+            for file in files:
+                path = os.path.join(root, file)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                snapshot[os.path.relpath(path, self.root)] = (st.st_size, st.st_mtime_ns)
+        return snapshot
+
+    def read_events(self, timeout):
+        time.sleep(max(0, timeout))
+        if time.monotonic() - self.last_poll < self.poll_interval:
+            return set()
+        snapshot = self.take_snapshot()
+        self.last_poll = time.monotonic()
+        changed = {path for path, state in snapshot.items() if self.snapshot.get(path) != state}
+        changed.update(parent_dir(path) for path in self.snapshot if path not in snapshot)
+        self.snapshot = snapshot
+        return changed
+
+
+def create_watcher(root, poll_interval=DEFAULT_POLL_INTERVAL):
+    """inotify verwenden, wenn verfügbar, sonst auf Polling zurückfallen"""
+    if sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(root)
+        except (OSError, AttributeError):
+            pass
+    return PollingWatcher(root, poll_interval)
@@ -0,0 +1,317 @@
+"""Reproduzierbare Benchmarks für die Backup-Engine (V4 vs. V6 vs. neue Modi).
+
+Erzeugt synthetische Quellbäume in einem temporären Ordner, misst kalte und
+warme Läufe, Wiederholungen ohne Änderungen und nach kleinen Änderungen und
+gibt die Ergebnisse als JSON aus. Jede Messung läuft in einem eigenen
+Prozess, damit Spitzen-RSS und Syscall-Zähler nur diesen Lauf enthalten.
+
+Beispiele:
+    python benchmarks/bench_backup.py --shape tiny --files 1000000
+    python benchmarks/bench_backup.py --shape huge --huge-count 4 --huge-size 2G --out result.json
+    python benchmarks/bench_backup.py --variants v6,mirror,snapshots --scenarios warm,unchanged
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+VARIANTS = ("v4", "v6", "mirror", "snapshots", "chunks")
+SCENARIOS = ("cold", "warm", "unchanged", "mutation")
+SHAPES = ("tiny", "huge", "deep", "mixed")
+EXTENSIONS = (".txt", ".pdf", ".docx", ".csv", ".jpg", ".log", ".py", ".bin")
+
+
+def parse_size(text):
+    units = {"k": 1024, "m": 1024 ** 2, "g": 1024 ** 3}
+    text = str(text).strip().lower().rstrip("b")
+    if text and text[-1] in units:
+        return int(float(text[:-1]) * units[text[-1]])
+    return int(text)
+
+
+# Nachbauten der ursprünglichen Backup-Schleifen aus "AB V4.py" und "AB V6.py"
+# (die Skripte selbst lassen sich ohne Display nicht instanziieren).
+
+def legacy_v4_backup(source, backup, filter_types):
+    filter_list = [ft.strip().lower() for ft in filter_types.split(",") if ft.strip()]
+    count = 0
+    for foldername, subfolders, filenames in os.walk(source):
+        backup_folder = foldername.replace(source, backup)
+        if not os.path.exists(backup_folder):
+            os.makedirs(backup_folder)
+        for filename in filenames:
+            ext = os.path.splitext(filename)[1].lower()
+            if filter_list and ext not in filter_list:
+                continue
+            source_file = os.path.join(foldername, filename)
+            backup_file = os.path.join(backup_folder, filename)
+            if (not os.path.exists(backup_file)) or \
+                    (os.path.getmtime(source_file) > os.path.getmtime(backup_file)):
+                shutil.copy2(source_file, backup_file)
+                count += 1
+    return count
+
+
+def legacy_v6_backup(src, dst, filter_types):
+    filetypes = [ftype.strip().lower() for ftype in filter_types.split(",") if ftype.strip()]
+    count = 0
+    for root, _, files in os.walk(src):
+        for file in files:
+            if filetypes and not any(file.lower().endswith(ft) for ft in filetypes):
+                continue
+            src_file = os.path.join(root, file)
+            rel_path = os.path.relpath(src_file, src)
+            dst_file = os.path.join(dst, rel_path)
+            os.makedirs(os.path.dirname(dst_file), exist_ok=True)
+            shutil.copy2(src_file, dst_file)
+            count += 1
+    return count
+
+
+def generate_tree(root, args):
+    """Synthetischen Quellbaum erzeugen; liefert (Dateien, Bytes)"""
+    rng = random.Random(args.seed)
+    files = 0
+    total = 0
+
+    def write(path, size):
+        nonlocal files, total
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            remaining = size
+            block = rng.randbytes(min(size, 1024 * 1024)) if size else b""
+            while remaining > 0:
+                f.write(block[:remaining])
+                remaining -= len(block)
+        files += 1
+        total += size
+
+    if args.shape in ("tiny", "mixed"):
+        per_dir = max(1, args.files_per_dir)
+        for i in range(args.files):
+            ext = rng.choice(EXTENSIONS) if args.shape == "mixed" else ".txt"
+            size = rng.randint(0, args.file_size * 2) if args.shape == "mixed" else args.file_size
+            write(os.path.join(root, f"d{i // per_dir:05d}", f"f{i:07d}{ext}"), size)
+    if args.shape == "deep":
+        for i in range(args.files):
+            parts = [f"level{j}" for j in range(i % args.depth + 1)]
+            write(os.path.join(root, *parts, f"f{i:07d}{rng.choice(EXTENSIONS)}"), args.file_size)
+    if args.shape in ("huge", "mixed"):
+        for i in range(args.huge_count):
+            write(os.path.join(root, "huge", f"image{i}.bin"), args.huge_size)
+    return files, total
+
+
+def mutate_tree(root, fraction, seed):
+    """Einen kleinen Anteil der Dateien ändern (anhängen und mtime erhöhen)"""
+    rng = random.Random(seed)
+    paths = [os.path.join(r, f) for r, _, fs in os.walk(root) for f in fs]
+    changed = rng.sample(paths, max(1, int(len(paths) * fraction))) if paths else []
+    for path in changed:
+        with open(path, "ab") as f:
+            f.write(b"mutation\n")
+        st = os.stat(path)
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+    return len(changed)
+
+
+def drop_caches():
+    """Page-Cache leeren (nur als root unter Linux möglich)"""
+    try:
+        os.sync()
+        with open("/proc/sys/vm/drop_caches", "w") as f:
+            f.write("3\n")
+        return True
+    except OSError:
+        return False
+
+
+def read_proc_io():
+    try:
+        with open("/proc/self/io") as f:
+            return {key: int(value) for key, value in (line.split(": ") for line in f.read().splitlines())}
+    except OSError:
+        return {}
+
+
+def run_worker(variant, src, dst, filter_types):
+    """Einen einzelnen Backup-Lauf messen (läuft im Kindprozess)"""
+    import resource
+
+    io_before = read_proc_io()
+    start = time.perf_counter()
+    if variant == "v4":
+        count = legacy_v4_backup(src, dst, filter_types)
+    elif variant == "v6":
+        count = legacy_v6_backup(src, dst, filter_types)
+    else:
+        from autobackup.config import BackupConfig
+        from autobackup.engine import BackupEngine
+
+        # Ohne Scrubbing im Hintergrund: gemessen wird nur der Backup-Lauf
+        config = BackupConfig(source_dir=src, backup_dir=dst, filter_types=filter_types, backup_format=variant,
+                              scrub_period=0)
+        engine = BackupEngine(config, log=lambda message: None)
+        engine.run_once()
+        count = engine.last_backup_count
+    elapsed = time.perf_counter() - start
+    io_after = read_proc_io()
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    delta = {key: io_after[key] - io_before.get(key, 0) for key in io_after}
+    return {
+        "seconds": elapsed,
+        "files_copied": count,
+        "peak_rss_kb": usage.ru_maxrss,
+        "bytes_read": delta.get("rchar"),
+        "bytes_written": delta.get("wchar"),
+        "syscalls": {"read": delta.get("syscr"), "write": delta.get("syscw")},
+        "context_switches": usage.ru_nvcsw + usage.ru_nivcsw,
+    }
+
+
+def count_syscalls(cmd):
+    """Alle Syscalls eines Laufs mit strace -c -f zählen (falls installiert)"""
+    with tempfile.NamedTemporaryFile("r", suffix=".strace") as out:
+        subprocess.run(["strace", "-c", "-f", "-o", out.name] + cmd, check=True, stdout=subprocess.DEVNULL)
+        lines = out.read().splitlines()
+    for line in reversed(lines):
+        fields = line.split()
+        if fields and fields[-1] == "total":
+            return int(fields[3]) if len(fields) >= 5 else int(fields[2])
+    return None
+
+
+def measure_chunking(size, seed):
+    """Durchsatz der inhaltsdefinierten Zerlegung allein (ohne Hashen und Schreiben der Chunks)"""
+    import io
+
+    from autobackup.chunkstore import iter_chunks
+
+    data = random.Random(seed).randbytes(size)
+    start = time.perf_counter()
+    chunks = sum(1 for _ in iter_chunks(io.BytesIO(data)))
+    seconds = time.perf_counter() - start or 1e-9
+    return {
+        "bytes": len(data),
+        "chunks": chunks,
+        "seconds": seconds,
+        "mb_per_s": len(data) / seconds / (1024 * 1024),
+    }
+
+
+def measure(variant, scenario, src, dst, args, tree_files, tree_bytes):
+    cmd = [sys.executable, os.path.abspath(__file__), "--worker", variant, src, dst, "--filter", args.filter]
+    cache_dropped = drop_caches() if scenario == "cold" else None
+    proc = subprocess.run(cmd, check=True, capture_output=True, text=True)
+    result = json.loads(proc.stdout)
+    if args.strace and shutil.which("strace"):
+        result["syscalls"]["total"] = count_syscalls(cmd)
+    seconds = result["seconds"] or 1e-9
+    # Durchsatz bezogen auf den ganzen Quellbaum, damit Läufe ohne Kopien vergleichbar bleiben
+    # (copy_file_range und Reflinks tauchen in rchar/wchar gar nicht auf)
+    result.update({
+        "variant": variant,
+        "scenario": scenario,
+        "files_per_s": tree_files / seconds,
+        "mb_per_s": tree_bytes / seconds / (1024 * 1024),
+    })
+    if cache_dropped is not None:
+        result["cache_dropped"] = cache_dropped
+    return result
+
+
+def run_benchmarks(args):
+    variants = [v.strip() for v in args.variants.split(",") if v.strip()]
+    scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    workdir = tempfile.mkdtemp(prefix="autobackup-bench-", dir=args.tmpdir)
+    try:
+        src = os.path.join(workdir, "source")
+        tree_files, tree_bytes = generate_tree(src, args)
+        results = []
+        for variant in variants:
+            for scenario in scenarios:
+                dst = os.path.join(workdir, f"backup-{variant}")
+                if scenario in ("cold", "warm"):
+                    # Erstsicherung in ein leeres Ziel
+                    shutil.rmtree(dst, ignore_errors=True)
+                    os.makedirs(dst)
+                elif not os.path.isdir(dst):
+                    os.makedirs(dst)
+                    measure(variant, "warm", src, dst, args, tree_files, tree_bytes)
+                if scenario == "mutation":
+                    mutate_tree(src, args.mutate, args.seed + len(results))
+                results.append(measure(variant, scenario, src, dst, args, tree_files, tree_bytes))
+                print(f"{variant:10} {scenario:10} {results[-1]['seconds']:8.3f} s", file=sys.stderr)
+        report = {
+            "machine": {
+                "platform": platform.platform(),
+                "python": platform.python_version(),
+                "cpus": os.cpu_count(),
+            },
+            "tree": {
+                "shape": args.shape,
+                "files": tree_files,
+                "bytes": tree_bytes,
+                "seed": args.seed,
+                "filter": args.filter,
+            },
+            "results": results,
+        }
+        if args.chunking_size:
+            report["chunking"] = measure_chunking(args.chunking_size, args.seed)
+            print(f"{'chunking':10} {'':10} {report['chunking']['mb_per_s']:8.1f} MB/s", file=sys.stderr)
+        return report
+    finally:
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--worker", nargs=3, metavar=("VARIANT", "SRC", "DST"), help=argparse.SUPPRESS)
+    parser.add_argument("--shape", choices=SHAPES, default="mixed")
+    parser.add_argument("--files", type=int, default=10000, help="Anzahl kleiner Dateien")
+    parser.add_argument("--files-per-dir", type=int, default=500)
+    parser.add_argument("--file-size", type=parse_size, default="4k")
+    parser.add_argument("--huge-count", type=int, default=2)
+    parser.add_argument("--huge-size", type=parse_size, default="256m")
+    parser.add_argument("--depth", type=int, default=32)
+    parser.add_argument("--filter", default="", help="filter_types wie in settings.json, z.B. .txt,.pdf")
+    parser.add_argument("--mutate", type=float, default=0.01, help="Anteil geänderter Dateien im Szenario mutation")
+    parser.add_argument("--variants", default=",".join(VARIANTS))
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--chunking-size", type=parse_size, default="128m",
+                        help="Datenmenge für den Durchsatz der Chunk-Zerlegung (0 = nicht messen)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--strace", action="store_true", help="Zusätzlich alle Syscalls per strace zählen")
+    parser.add_argument("--tmpdir", help="Ordner für die temporären Bäume (Standard: System-Temp)")
+    parser.add_argument("--keep", action="store_true", help="Temporäre Bäume nicht löschen")
+    parser.add_argument("--out", help="JSON-Ergebnis in diese Datei statt auf stdout")
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        variant, src, dst = args.worker
+        print(json.dumps(run_worker(variant, src, dst, args.filter)))
+        return 0
+
+    report = run_benchmarks(args)
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,57 @@
+"""Sicherungspunkte: Journal im Änderungs-Index und Fortsetzen eines abgebrochenen Laufs."""
+import os
+
+from autobackup.config import BackupConfig
+from autobackup.engine import BackupEngine
+from autobackup.index import FileIndex
+
+
+def write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def test_checkpoint_survives_crash(tmp_path):
+    index = FileIndex(str(tmp_path))
+    index.record("a", os.stat(tmp_path))
+    state = {"dirs": ["x", "y"], "files": ["a"]}
+    index.checkpoint(state)
+    index.record("b", os.stat(tmp_path))  # nach dem Sicherungspunkt: geht verloren
+
+    # Zweite Verbindung statt close(), wie nach einem Absturz
+    reopened = FileIndex(str(tmp_path))
+    assert reopened.load_journal() == state
+    assert sorted(reopened.entries) == ["a"]
+    reopened.clear_journal()
+    reopened.commit()
+    reopened.close()
+    index.conn.close()
+    assert FileIndex(str(tmp_path)).load_journal() is None
+
+
+def test_resume(tmp_path):
+    src = str(tmp_path / "src")
+    dst = str(tmp_path / "dst")
+    for name in ("a", "b"):
+        for i in range(3):
+            write(os.path.join(src, name, f"{i}.txt"), f"{name}{i}".encode())
+    os.makedirs(dst)
+    # Sicherungspunkt eines abgebrochenen Laufs: Ordner b noch offen, a/1.txt war gerade in Arbeit
+    index = FileIndex(dst)
+    index.checkpoint({"dirs": ["b"], "files": [os.path.join("a", "1.txt")]})
+    index.close()
+
+    config = BackupConfig(source_dir=src, backup_dir=dst, delta_threshold=0, scrub_period=0)
+    engine = BackupEngine(config, log=lambda message: None)
+    engine.run_once()
+    copied = sorted(os.path.relpath(os.path.join(root, name), dst)
+                    for root, _, names in os.walk(dst) if ".autobackup" not in root for name in names)
+    assert copied == [os.path.join("a", "1.txt")] + [os.path.join("b", f"{i}.txt") for i in range(3)]
+    assert FileIndex(dst).load_journal() is None
+
+    # Der nächste Lauf ist wieder vollständig und holt den Rest nach
+    engine.run_once()
+    assert engine.last_backup_count == 2
+    engine.run_once()
+    assert engine.last_backup_count == 0
@@ -0,0 +1,62 @@
+"""Chunk-Store: inhaltsdefinierte Zerlegung, Deduplizierung und Rundlauf über Backup und Wiederherstellung."""
+import io
+import os
+import random
+
+from autobackup.chunkstore import MAX_CHUNK_SIZE, MIN_CHUNK_SIZE, ChunkStore, iter_chunks
+from autobackup.config import BackupConfig
+from autobackup.engine import BackupEngine
+from autobackup.restore import RestoreEngine
+
+
+def random_bytes(size, seed):
+    return random.Random(seed).randbytes(size)
+
+
+def test_chunk_sizes():
+    data = random_bytes(12 * 1024 * 1024, 1)
+    chunks = list(iter_chunks(io.BytesIO(data)))
+    assert b"".join(chunks) == data
+    assert all(MIN_CHUNK_SIZE <= len(chunk) <= MAX_CHUNK_SIZE for chunk in chunks[:-1])
+    assert len(chunks[-1]) <= MAX_CHUNK_SIZE
+    assert list(iter_chunks(io.BytesIO(b""))) == []
+
+
+def test_boundaries_follow_content(tmp_path):
+    # Eingefügte Bytes am Anfang verschieben nur die ersten Schnittpunkte, der Rest wird wiederverwendet
+    data = random_bytes(16 * 1024 * 1024, 2)
+    store = ChunkStore(str(tmp_path))
+    (tmp_path / "a").write_bytes(data)
+    (tmp_path / "b").write_bytes(b"neu" * 1000 + data)
+    first, written_a = store.store_file(str(tmp_path / "a"))
+    second, written_b = store.store_file(str(tmp_path / "b"))
+    assert written_a == len(data)
+    assert len(set(first) & set(second)) >= len(first) - 2
+    assert written_b < 2 * MAX_CHUNK_SIZE
+    assert b"".join(store.get_chunk(digest) for digest in second) == b"neu" * 1000 + data
+
+
+def test_roundtrip(tmp_path):
+    src = tmp_path / "src"
+    (src / "sub").mkdir(parents=True)
+    files = {
+        "leer.txt": b"",
+        "klein.txt": b"Hallo",
+        os.path.join("sub", "gross.bin"): random_bytes(6 * 1024 * 1024, 3),
+        os.path.join("sub", "kopie.bin"): random_bytes(6 * 1024 * 1024, 3),
+    }
+    for rel_path, data in files.items():
+        (src / rel_path).write_bytes(data)
+    (tmp_path / "dst").mkdir()
+    config = BackupConfig(source_dir=str(src), backup_dir=str(tmp_path / "dst"), backup_format="chunks",
+                          scrub_period=0)
+    BackupEngine(config, log=lambda message: None).run_once()
+    # Die beiden gleichen Dateien belegen ihre Chunks nur einmal
+    stored = sum(os.path.getsize(os.path.join(root, name))
+                 for root, _, names in os.walk(tmp_path / "dst" / "chunks") for name in names)
+    assert stored == 6 * 1024 * 1024 + 5
+
+    target = tmp_path / "restore"
+    assert RestoreEngine(config, log=lambda message: None).restore(str(target)) == (len(files), 0)
+    for rel_path, data in files.items():
+        assert (target / rel_path).read_bytes() == data
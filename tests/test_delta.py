@@ -0,0 +1,107 @@
+"""Block-Delta: nur geänderte Blöcke schreiben, das Ziel muss danach exakt der Quelle entsprechen."""
+import os
+
+import pytest
+
+from autobackup.config import BackupConfig
+from autobackup.delta import SignatureCache, delta_copy
+from autobackup.engine import BackupEngine
+
+BLOCK = 4096
+
+
+@pytest.fixture
+def files(tmp_path):
+    src = tmp_path / "quelle.img"
+    dst = tmp_path / "backup" / "quelle.img"
+    dst.parent.mkdir()
+    data = os.urandom(10 * BLOCK + 123)
+    src.write_bytes(data)
+    dst.write_bytes(data)
+    cache = SignatureCache(str(tmp_path / "backup"))
+    yield src, dst, cache
+    cache.close()
+
+
+def copy(src, dst, cache):
+    return delta_copy(str(src), str(dst), cache, threshold=0, block_size=BLOCK)
+
+
+def test_unchanged(files):
+    src, dst, cache = files
+    assert copy(src, dst, cache) == 0
+    assert dst.read_bytes() == src.read_bytes()
+
+
+def test_modified_middle_block(files):
+    src, dst, cache = files
+    with open(src, "r+b") as f:
+        f.seek(5 * BLOCK + 100)
+        f.write(b"geaendert")
+    assert copy(src, dst, cache) == BLOCK
+    assert dst.read_bytes() == src.read_bytes()
+    assert os.stat(dst).st_mtime_ns == os.stat(src).st_mtime_ns
+
+
+def test_truncated(files):
+    src, dst, cache = files
+    with open(src, "r+b") as f:
+        f.truncate(3 * BLOCK + 7)
+    assert copy(src, dst, cache) == 7
+    assert dst.read_bytes() == src.read_bytes()
+
+
+def test_appended(files):
+    src, dst, cache = files
+    with open(src, "ab") as f:
+        f.write(os.urandom(2 * BLOCK))
+    # Der bisher unvollständige letzte Block und die neuen Blöcke
+    assert copy(src, dst, cache) == 2 * BLOCK + 123
+    assert dst.read_bytes() == src.read_bytes()
+
+
+def test_cached_signatures(files):
+    src, dst, cache = files
+    copy(src, dst, cache)
+    with open(src, "r+b") as f:
+        f.seek(BLOCK)
+        f.write(b"x")
+    assert cache.get(str(dst), os.stat(dst), BLOCK) is not None
+    assert copy(src, dst, cache) == BLOCK
+    assert dst.read_bytes() == src.read_bytes()
+
+
+@pytest.mark.parametrize("change", ["content", "size"])
+def test_stale_cache(files, change):
+    src, dst, cache = files
+    copy(src, dst, cache)
+    # Backup-Kopie außerhalb der Engine verändert: die zwischengespeicherten Signaturen gelten nicht mehr
+    with open(dst, "r+b") as f:
+        if change == "size":
+            f.truncate(4 * BLOCK)
+        else:
+            f.seek(2 * BLOCK)
+            f.write(b"\0" * 10)
+    os.utime(dst, ns=(0, os.stat(src).st_mtime_ns + 1))
+    assert cache.get(str(dst), os.stat(dst), BLOCK) is None
+    copy(src, dst, cache)
+    assert dst.read_bytes() == src.read_bytes()
+
+
+def test_mirror_uses_delta(tmp_path):
+    src = tmp_path / "src"
+    src.mkdir()
+    (tmp_path / "dst").mkdir()
+    image = src / "vm.img"
+    image.write_bytes(os.urandom(3 * 1024 * 1024 + 5))
+    config = BackupConfig(source_dir=str(src), backup_dir=str(tmp_path / "dst"), delta_threshold=1, scrub_period=0)
+    messages = []
+    engine = BackupEngine(config, log=messages.append)
+    engine.run_once()
+    with open(image, "r+b") as f:
+        f.seek(1024 * 1024 + 10)
+        f.write(b"neu")
+    engine.run_once()
+    assert engine.last_backup_count == 1
+    assert "ℹ Kopierstrategie: delta 1" in messages
+    assert (tmp_path / "dst" / "vm.img").read_bytes() == image.read_bytes()
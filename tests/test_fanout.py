@@ -0,0 +1,126 @@
+"""Fan-out: eine Quelle einmal lesen und in mehrere Ziele schreiben, auch wenn eines davon ausfällt."""
+import hashlib
+import os
+
+import pytest
+
+from autobackup import fanout
+from autobackup.config import BackupConfig
+from autobackup.engine import BackupEngine, TEMP_SUFFIX
+from autobackup.fanout import TargetWriter, fan_out_copy
+
+
+@pytest.fixture(params=["klein", "groß"])
+def small_chunks(request, monkeypatch):
+    # Kleine Blöcke, damit auch kleine Testdateien über die Writer-Threads laufen
+    if request.param == "groß":
+        monkeypatch.setattr(fanout, "CHUNK_SIZE", 4096)
+    return request.param
+
+
+def test_all_targets(tmp_path, small_chunks):
+    data = os.urandom(50000)
+    src = tmp_path / "quelle.bin"
+    src.write_bytes(data)
+    dsts = [str(tmp_path / f"ziel{i}") for i in range(3)]
+    errors, read, digest = fan_out_copy(str(src), dsts, buffer_size=8192, digest=True)
+    assert errors == [None] * 3 and read == len(data)
+    assert digest == hashlib.blake2b(data, digest_size=32).hexdigest()
+    for dst in dsts:
+        with open(dst, "rb") as f:
+            assert f.read() == data
+        assert os.stat(dst).st_mtime_ns == os.stat(src).st_mtime_ns
+
+
+def test_one_target_fails(tmp_path, small_chunks):
+    data = os.urandom(50000)
+    src = tmp_path / "quelle.bin"
+    src.write_bytes(data)
+    dsts = [str(tmp_path / "ziel0"), str(tmp_path / "fehlt" / "ziel1"), str(tmp_path / "ziel2")]
+    errors, _, _ = fan_out_copy(str(src), dsts, buffer_size=8192)
+    assert errors[0] is None and errors[2] is None
+    assert isinstance(errors[1], OSError)
+    for dst in (dsts[0], dsts[2]):
+        with open(dst, "rb") as f:
+            assert f.read() == data
+
+
+def test_sparse_source(tmp_path, monkeypatch):
+    monkeypatch.setattr(fanout, "CHUNK_SIZE", 64 * 1024)
+    src = tmp_path / "image.raw"
+    with open(src, "wb") as f:
+        f.write(b"Anfang")
+        f.seek(4 * 1024 * 1024)
+        f.write(b"Ende")
+        f.truncate(8 * 1024 * 1024)
+    dsts = [str(tmp_path / "ziel0"), str(tmp_path / "ziel1")]
+    assert fan_out_copy(str(src), dsts)[0] == [None, None]
+    for dst in dsts:
+        with open(dst, "rb") as f, open(src, "rb") as g:
+            assert f.read() == g.read()
+
+
+class ResizingThrottle:
+    """Ändert die Quelle nach dem ersten gelesenen Block, wie ein Programm, das gerade schreibt"""
+
+    def __init__(self, path, size):
+        self.path = path
+        self.size = size
+        self.done = False
+
+    def data(self, n, seconds):
+        if not self.done:
+            self.done = True
+            with open(self.path, "r+b") as f:
+                f.truncate(self.size)
+
+
+@pytest.mark.parametrize("new_size", [30000, 80000])
+def test_source_changes_size(tmp_path, monkeypatch, new_size):
+    monkeypatch.setattr(fanout, "CHUNK_SIZE", 4096)
+    src = tmp_path / "quelle.bin"
+    src.write_bytes(os.urandom(50000))
+    dsts = [str(tmp_path / "ziel0"), str(tmp_path / "ziel1")]
+    errors, _, _ = fan_out_copy(str(src), dsts, buffer_size=8192, throttle=ResizingThrottle(src, new_size))
+    assert all(isinstance(error, ValueError) for error in errors)
+
+
+def test_writer_truncates_to_written(tmp_path):
+    path = str(tmp_path / "ziel")
+    writer = TargetWriter(path, 10000, 4)
+    writer.put(b"abc")
+    writer.put(100)
+    assert isinstance(writer.finish(), ValueError)
+    assert os.path.getsize(path) == 103
+
+
+def test_mirror_extra_targets(tmp_path):
+    src = tmp_path / "src"
+    (src / "sub").mkdir(parents=True)
+    files = {"notiz.txt": b"Hallo", os.path.join("sub", "gross.bin"): os.urandom(6 * 1024 * 1024)}
+    for rel_path, data in files.items():
+        (src / rel_path).write_bytes(data)
+    dsts = [tmp_path / name for name in ("dst", "usb", "nas")]
+    for dst in dsts:
+        dst.mkdir()
+    # Auf dem NAS belegt ein Ordner den temporären Namen: nur dieses Ziel schlägt für notiz.txt fehl
+    (dsts[2] / ("notiz.txt" + TEMP_SUFFIX)).mkdir()
+    config = BackupConfig(source_dir=str(src), backup_dir=str(dsts[0]), extra_backup_dirs=[str(dsts[1]), str(dsts[2])],
+                          scrub_period=0)
+    messages = []
+    engine = BackupEngine(config, log=messages.append)
+    engine.run_once()
+    for dst in dsts:
+        for rel_path, data in files.items():
+            if dst == dsts[2] and rel_path == "notiz.txt":
+                assert not (dst / rel_path).exists()
+                continue
+            assert (dst / rel_path).read_bytes() == data
+    assert engine.last_backup_failed == 1
+    assert any("notiz.txt" in message and str(dsts[2]) in message for message in messages)
+
+    # Nach Behebung holt der nächste Lauf nur das fehlende Ziel nach
+    (dsts[2] / ("notiz.txt" + TEMP_SUFFIX)).rmdir()
+    engine.run_once()
+    assert (dsts[2] / "notiz.txt").read_bytes() == b"Hallo"
+    assert engine.last_backup_failed == 0
@@ -0,0 +1,102 @@
+"""Kopier-Backend: Inhalt und Metadaten, Lücken lückenhafter Dateien und Rückfall auf die gepufferte Kopie."""
+import errno
+import filecmp
+import os
+
+import pytest
+
+from autobackup import fastcopy
+from autobackup.fastcopy import STRATEGIES, copy_data, copy_file, is_sparse
+
+MB = 1024 * 1024
+
+
+@pytest.fixture(autouse=True)
+def fresh_unsupported(monkeypatch):
+    # Fehlgeschlagene Strategien werden pro Gerätepaar gemerkt; jeder Test beginnt ohne diesen Zustand
+    monkeypatch.setattr(fastcopy, "_unsupported", set())
+
+
+def make_sparse(path, size=64 * MB):
+    with open(path, "wb") as f:
+        f.write(b"Anfang" * 1000)
+        f.seek(32 * MB)
+        f.write(os.urandom(MB))
+        f.truncate(size)
+
+
+def test_copy_file(tmp_path):
+    src = tmp_path / "quelle.bin"
+    src.write_bytes(os.urandom(3 * MB + 17))
+    os.utime(src, ns=(1_000_000_000, 1_500_000_000_123))
+    strategy = copy_file(str(src), str(tmp_path / "ziel.bin"))
+    assert strategy in STRATEGIES
+    assert filecmp.cmp(src, tmp_path / "ziel.bin", shallow=False)
+    assert os.stat(tmp_path / "ziel.bin").st_mtime_ns == 1_500_000_000_123
+
+
+def test_sparse_keeps_holes(tmp_path):
+    src = tmp_path / "image.raw"
+    make_sparse(src)
+    strategy = copy_file(str(src), str(tmp_path / "kopie.raw"))
+    assert filecmp.cmp(src, tmp_path / "kopie.raw", shallow=False)
+    st_src = os.stat(src)
+    st_dst = os.stat(tmp_path / "kopie.raw")
+    assert st_dst.st_size == st_src.st_size
+    if not is_sparse(st_src):
+        pytest.skip("Dateisystem legt keine Lücken an")
+    assert strategy in ("reflink", "sparse")
+    # Belegt wird höchstens wenig mehr als in der Quelle, weit unter der Dateigröße
+    assert st_dst.st_blocks * 512 <= st_src.st_blocks * 512 + MB
+    assert st_dst.st_blocks * 512 < st_dst.st_size // 4
+
+
+@pytest.mark.skipif(not hasattr(os, "SEEK_DATA"), reason="SEEK_DATA nicht verfügbar")
+def test_data_extents(tmp_path):
+    src = tmp_path / "image.raw"
+    make_sparse(src)
+    with open(src, "rb") as f:
+        if not is_sparse(os.fstat(f.fileno())):
+            pytest.skip("Dateisystem legt keine Lücken an")
+        extents = list(fastcopy._data_extents(f.fileno(), 64 * MB))
+    assert extents[0][0] == 0
+    assert any(start <= 32 * MB < end for start, end in extents)
+    assert extents[-1][1] <= 64 * MB
+    assert sum(end - start for start, end in extents) < 8 * MB
+
+
+def test_fallback_without_seek_data(tmp_path, monkeypatch):
+    src = tmp_path / "image.raw"
+    make_sparse(src, 40 * MB)
+    lseek = os.lseek
+
+    def lseek_without_data(fd, offset, whence):
+        if whence in (getattr(os, "SEEK_DATA", -1), getattr(os, "SEEK_HOLE", -1)):
+            raise OSError(errno.EINVAL, "SEEK_DATA nicht unterstützt")
+        return lseek(fd, offset, whence)
+
+    monkeypatch.setattr(fastcopy.os, "lseek", lseek_without_data)
+    # Nur die Lücken-Strategie anbieten: sie schlägt fehl, übrig bleibt die gepufferte Kopie
+    monkeypatch.setattr(fastcopy, "_candidates", lambda sparse=False: iter([("sparse", fastcopy._sparse)]))
+    monkeypatch.setattr(fastcopy, "is_sparse", lambda st: True)
+    with open(src, "rb") as fsrc, open(tmp_path / "kopie.raw", "wb") as fdst:
+        assert copy_data(fsrc.fileno(), fdst.fileno(), 40 * MB) == "buffer"
+    assert filecmp.cmp(src, tmp_path / "kopie.raw", shallow=False)
+
+
+def test_unsupported_strategy_is_remembered(tmp_path, monkeypatch):
+    src = tmp_path / "quelle.bin"
+    src.write_bytes(os.urandom(MB))
+    calls = []
+
+    def failing(fsrc, fdst, size, throttle=None):
+        calls.append(size)
+        os.write(fdst, b"halb")
+        raise OSError(errno.EXDEV, "anderes Dateisystem")
+
+    monkeypatch.setattr(fastcopy, "_candidates", lambda sparse=False: iter([("copy_file_range", failing)]))
+    for name in ("a", "b"):
+        with open(src, "rb") as fsrc, open(tmp_path / name, "wb") as fdst:
+            assert copy_data(fsrc.fileno(), fdst.fileno(), MB, devices=(1, 2)) == "buffer"
+        assert filecmp.cmp(src, tmp_path / name, shallow=False)
+    assert calls == [MB]
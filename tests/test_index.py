@@ -0,0 +1,49 @@
+"""Änderungs-Index: Erkennung geänderter Dateien und Austragen gelöschter Pfade."""
+import os
+from types import SimpleNamespace
+
+from autobackup.index import FileIndex
+
+
+def test_is_changed(tmp_path):
+    path = tmp_path / "datei.txt"
+    path.write_bytes(b"eins")
+    index = FileIndex(str(tmp_path / "backup"))
+    st = os.stat(path)
+    assert index.is_changed("datei.txt", st)
+    index.record("datei.txt", st)
+    index.commit()
+    index.close()
+
+    index = FileIndex(str(tmp_path / "backup"))
+    assert not index.is_changed("datei.txt", os.stat(path))
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1))
+    assert index.is_changed("datei.txt", os.stat(path))
+    index.close()
+
+
+def test_is_changed_without_inode(tmp_path):
+    """Windows: DirEntry.stat() liefert st_ino 0, os.stat() die echte Nummer"""
+    index = FileIndex(str(tmp_path))
+    index.record("scan.txt", SimpleNamespace(st_size=4, st_mtime_ns=10, st_ino=0))
+    index.record("stat.txt", SimpleNamespace(st_size=4, st_mtime_ns=10, st_ino=1234))
+    index.commit()
+    assert not index.is_changed("scan.txt", SimpleNamespace(st_size=4, st_mtime_ns=10, st_ino=1234))
+    assert not index.is_changed("stat.txt", SimpleNamespace(st_size=4, st_mtime_ns=10, st_ino=0))
+    assert index.is_changed("stat.txt", SimpleNamespace(st_size=4, st_mtime_ns=10, st_ino=99))
+    assert index.is_changed("scan.txt", SimpleNamespace(st_size=5, st_mtime_ns=10, st_ino=0))
+    index.close()
+
+
+def test_prune(tmp_path):
+    index = FileIndex(str(tmp_path))
+    st = os.stat(tmp_path)
+    for rel_path in ("a", os.path.join("sub", "b"), os.path.join("sub", "c")):
+        index.record(rel_path, st)
+    index.commit()
+    index.seen = {"a"}
+    # Teil-Scan: nur Pfade unterhalb von sub gelten als gelöscht
+    assert sorted(index.removed([os.path.join("sub", "b")])) == [os.path.join("sub", "b")]
+    index.commit(prune=True, paths=["sub"])
+    assert sorted(index.entries) == ["a"]
+    index.close()
@@ -0,0 +1,93 @@
+"""Rundlauf Mirror-Backup -> Wiederherstellung, mit Prüfung gegen den Index-Hash."""
+import filecmp
+import os
+
+import pytest
+
+from autobackup.config import BackupConfig
+from autobackup.engine import BackupEngine
+from autobackup.restore import RestoreEngine
+from autobackup.verify import Verifier
+
+
+def corrupt(path):
+    """Inhalt ändern, Größe und mtime beibehalten (stiller Datenverlust)"""
+    st = os.stat(path)
+    with open(path, "r+b") as f:
+        f.seek(1000)
+        f.write(b"\0" * 8)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns))
+
+
+@pytest.fixture(params=[True, False], ids=["index_hash", "checksums"])
+def mirror(tmp_path, request):
+    src = tmp_path / "src"
+    files = {
+        "notiz.txt": b"Hallo",
+        "leer.txt": b"",
+        os.path.join("Dokumente", "bericht.bin"): os.urandom(300000),
+        os.path.join("Dokumente", "Rechnungen", "2026.pdf"): os.urandom(5000),
+    }
+    for rel_path, data in files.items():
+        path = src / rel_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+    (tmp_path / "dst").mkdir()
+    config = BackupConfig(source_dir=str(src), backup_dir=str(tmp_path / "dst"), index_hash=request.param,
+                          scrub_period=0)
+    engine = BackupEngine(config, log=lambda message: None)
+    engine.run_once()
+    assert engine.last_backup_count == len(files)
+    if not config.index_hash:
+        # Ohne Hash im Index ist die Referenz die von --verify gespeicherte Prüfsumme
+        Verifier(config, log=lambda message: None).verify(compare_source=False)
+    return config, files
+
+
+def test_roundtrip(tmp_path, mirror):
+    config, files = mirror
+    target = tmp_path / "restore"
+    count, failed = RestoreEngine(config, log=lambda message: None).restore(str(target))
+    assert (count, failed) == (len(files), 0)
+    for rel_path in files:
+        assert filecmp.cmp(os.path.join(config.source_dir, rel_path), target / rel_path, shallow=False)
+        assert os.stat(target / rel_path).st_mtime_ns == os.stat(os.path.join(config.source_dir, rel_path)).st_mtime_ns
+
+
+def test_restore_prefix(tmp_path, mirror):
+    config, _ = mirror
+    target = tmp_path / "restore"
+    count, failed = RestoreEngine(config, log=lambda message: None).restore(str(target), "Dokumente/Rechnungen/")
+    assert (count, failed) == (1, 0)
+    assert sorted(os.listdir(target)) == ["Dokumente"]
+    assert os.listdir(target / "Dokumente") == ["Rechnungen"]
+
+
+def test_corrupt_backup_detected(tmp_path, mirror):
+    config, _ = mirror
+    corrupt(os.path.join(config.backup_dir, "Dokumente", "bericht.bin"))
+    messages = []
+    target = tmp_path / "restore"
+    count, failed = RestoreEngine(config, log=messages.append).restore(str(target))
+    assert failed == 1 and count == 3
+    assert not (target / "Dokumente" / "bericht.bin").exists()
+    assert any("bericht.bin" in message for message in messages)
+
+
+def test_sparse_backup_file(tmp_path):
+    src = tmp_path / "src"
+    src.mkdir()
+    with open(src / "image.raw", "wb") as f:
+        f.write(b"Anfang")
+        f.seek(64 * 1024 * 1024)
+        f.write(b"Ende")
+    (tmp_path / "dst").mkdir()
+    config = BackupConfig(source_dir=str(src), backup_dir=str(tmp_path / "dst"), index_hash=True, scrub_period=0)
+    BackupEngine(config, log=lambda message: None).run_once()
+    target = tmp_path / "restore"
+    assert RestoreEngine(config, log=lambda message: None).restore(str(target)) == (1, 0)
+    assert filecmp.cmp(src / "image.raw", target / "image.raw", shallow=False)
+    st = os.stat(src / "image.raw")
+    if st.st_blocks * 512 < st.st_size:
+        # Dateisystem mit Lücken: die Wiederherstellung bleibt lückenhaft
+        assert os.stat(target / "image.raw").st_blocks * 512 < st.st_size
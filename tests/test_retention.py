@@ -0,0 +1,88 @@
+"""Aufbewahrungsregeln: welche Stände select_keep behält und was prune löscht."""
+import glob
+import os
+import time
+
+from autobackup.config import BackupConfig
+from autobackup.engine import BackupEngine
+from autobackup.packs import PackStore
+from autobackup.restore import RestoreEngine
+from autobackup.retention import policy_enabled, select_keep
+from autobackup.storage import LocalBackend
+
+
+def local(day, hour, minute=0, month=3):
+    return time.mktime((2026, month, day, hour, minute, 0, 0, 0, -1))
+
+
+def snapshots():
+    """Vier Stände pro Tag vom 1. bis 10. März, Name = Zeitpunkt"""
+    times = {}
+    for day in range(1, 11):
+        for hour in (0, 6, 12, 18):
+            times[f"{day:02d}-{hour:02d}"] = local(day, hour)
+    return times
+
+
+def test_policy_enabled():
+    assert not policy_enabled(BackupConfig())
+    assert policy_enabled(BackupConfig(keep_hourly=1))
+
+
+def test_newest_always_kept():
+    assert select_keep(snapshots(), BackupConfig()) == {"10-18"}
+    assert select_keep({}, BackupConfig(keep_last=3)) == set()
+
+
+def test_keep_last():
+    assert select_keep(snapshots(), BackupConfig(keep_last=3)) == {"10-18", "10-12", "10-06"}
+
+
+def test_keep_daily():
+    # Pro Tag der neueste Stand
+    assert select_keep(snapshots(), BackupConfig(keep_daily=3)) == {"10-18", "09-18", "08-18"}
+
+
+def test_keep_hourly_counts_hours_with_snapshots():
+    times = {"a": local(10, 9, 5), "b": local(10, 9, 40), "c": local(10, 7, 0), "d": local(9, 23, 0)}
+    assert select_keep(times, BackupConfig(keep_hourly=2)) == {"b", "c"}
+
+
+def test_keep_weekly_and_monthly():
+    times = snapshots()
+    times["feb"] = local(20, 12, month=2)
+    # 2026-03-01 ist ein Sonntag (ISO-Woche 9), der 2. bis 8. März liegen in Woche 10
+    assert select_keep(times, BackupConfig(keep_weekly=3)) == {"10-18", "08-18", "01-18"}
+    assert select_keep(times, BackupConfig(keep_monthly=2)) == {"10-18", "feb"}
+
+
+def test_rules_combine():
+    keep = select_keep(snapshots(), BackupConfig(keep_last=2, keep_daily=2))
+    assert keep == {"10-18", "10-12", "09-18"}
+
+
+def test_prune_packs(tmp_path):
+    src = tmp_path / "src"
+    src.mkdir()
+    (src / "a.txt").write_bytes(b"bleibt" * 10)
+    config = BackupConfig(source_dir=str(src), backup_dir=str(tmp_path / "dst"), backup_format="packs",
+                          pack_size=1, pack_threshold=1000, keep_last=1, scrub_period=0)
+    for run in range(3):
+        (src / "b.txt").write_bytes(b"klein %d" % run)
+        (src / "big.bin").write_bytes(bytes([run]) * 5000)
+        BackupEngine(config, log=lambda message: None).run_once()
+
+    store = PackStore(LocalBackend(config.backup_dir), str(tmp_path / "state"))
+    names = store.list_manifests()
+    assert len(names) == 1
+    # pack_size=1: jede kleine Datei liegt in einem eigenen Pack; das Pack von a.txt aus dem ersten Lauf bleibt
+    keys = {entry.get("pack") or entry["object"] for entry in store.load_manifest(names[0])["files"].values()}
+    stored = {os.path.relpath(path, config.backup_dir).replace(os.sep, "/")
+              for path in glob.glob(os.path.join(config.backup_dir, "packs", "*"))
+              + glob.glob(os.path.join(config.backup_dir, "objects", "*"))}
+    assert stored == keys and len(keys) == 3
+
+    target = tmp_path / "restore"
+    assert RestoreEngine(config, log=lambda message: None).restore(str(target)) == (3, 0)
+    assert (target / "b.txt").read_bytes() == b"klein 2"
+    assert (target / "big.bin").read_bytes() == bytes([2]) * 5000
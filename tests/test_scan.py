@@ -0,0 +1,67 @@
+"""Scanner: Dateityp-Filter und Ausschluss-Muster; ausgeschlossene Ordner werden gar nicht erst betreten."""
+import os
+
+import pytest
+
+from autobackup import scan
+from autobackup.scan import TreeScanner
+
+FILES = [
+    "a.txt",
+    "b.tmp",
+    os.path.join("docs", "c.pdf"),
+    os.path.join("docs", "d.TXT"),
+    os.path.join("node_modules", "pkg", "index.js"),
+    os.path.join("app", "node_modules", "x.txt"),
+    os.path.join("build", "cache", "e.txt"),
+    os.path.join("build", "out", "f.txt"),
+    os.path.join(".git", "HEAD"),
+]
+
+
+@pytest.fixture
+def tree(tmp_path):
+    for rel_path in FILES:
+        path = tmp_path / rel_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b"x")
+    return tmp_path
+
+
+def scanned(scanner, paths=None):
+    items = scanner.scan() if paths is None else scanner.scan_paths(paths)
+    return sorted(rel_path for rel_path, _, _ in items)
+
+
+def test_all_files(tree):
+    assert scanned(TreeScanner(str(tree))) == sorted(FILES)
+
+
+def test_excluded_dirs_are_not_entered(tree, monkeypatch):
+    visited = []
+    scandir = os.scandir
+
+    def recording_scandir(path):
+        visited.append(os.path.relpath(path, tree))
+        return scandir(path)
+
+    monkeypatch.setattr(scan.os, "scandir", recording_scandir)
+    scanner = TreeScanner(str(tree), exclude_patterns="node_modules, .git, *.tmp, build/cache")
+    assert scanned(scanner) == ["a.txt", os.path.join("build", "out", "f.txt"),
+                                os.path.join("docs", "c.pdf"), os.path.join("docs", "d.TXT")]
+    for pruned in ("node_modules", os.path.join("app", "node_modules"), ".git", os.path.join("build", "cache")):
+        assert pruned not in visited
+        assert not any(path.startswith(pruned + os.sep) for path in visited)
+
+
+def test_filter_types(tree):
+    # Dateitypen ohne Rücksicht auf Groß-/Kleinschreibung
+    scanner = TreeScanner(str(tree), filter_types=".txt", exclude_patterns="node_modules,build")
+    assert scanned(scanner) == ["a.txt", os.path.join("docs", "d.TXT")]
+
+
+def test_scan_paths_respects_excludes(tree):
+    scanner = TreeScanner(str(tree), exclude_patterns="node_modules,build/cache")
+    paths = ["docs", os.path.join("docs", "c.pdf"), os.path.join("app", "node_modules", "x.txt"),
+             os.path.join("build", "cache"), "fehlt.txt"]
+    assert scanned(scanner, paths) == [os.path.join("docs", "c.pdf"), os.path.join("docs", "d.TXT")]
@@ -0,0 +1,77 @@
+"""Cron-Ausdrücke: Felder, Aliase und nächster Termin (in lokaler Zeit); Watch-Jobs im Scheduler."""
+import datetime
+import threading
+import time
+
+import pytest
+
+from autobackup.config import BackupConfig
+from autobackup.scheduler import CronSchedule, Scheduler, build_jobs
+
+
+def next_after(expression, start):
+    timestamp = CronSchedule(expression).next_after(start.timestamp())
+    return datetime.datetime.fromtimestamp(timestamp)
+
+
+@pytest.mark.parametrize("expression, start, expected", [
+    ("*/15 * * * *", datetime.datetime(2026, 3, 9, 10, 7, 30), datetime.datetime(2026, 3, 9, 10, 15)),
+    ("*/15 * * * *", datetime.datetime(2026, 3, 9, 10, 15), datetime.datetime(2026, 3, 9, 10, 30)),
+    ("30 2 * * *", datetime.datetime(2026, 3, 9, 3, 0), datetime.datetime(2026, 3, 10, 2, 30)),
+    ("0 9-17/4 * * *", datetime.datetime(2026, 3, 9, 13, 0), datetime.datetime(2026, 3, 9, 17, 0)),
+    ("@daily", datetime.datetime(2026, 3, 9, 23, 59), datetime.datetime(2026, 3, 10, 0, 0)),
+    ("@monthly", datetime.datetime(2026, 12, 15, 8, 0), datetime.datetime(2027, 1, 1, 0, 0)),
+    # 2026-03-09 ist ein Montag; 0 und 7 stehen beide für Sonntag
+    ("0 0 * * 5", datetime.datetime(2026, 3, 9, 12, 0), datetime.datetime(2026, 3, 13, 0, 0)),
+    ("0 0 * * 7", datetime.datetime(2026, 3, 9, 12, 0), datetime.datetime(2026, 3, 15, 0, 0)),
+    ("0 0 29 2 *", datetime.datetime(2026, 3, 9, 12, 0), datetime.datetime(2028, 2, 29, 0, 0)),
+])
+def test_next_after(expression, start, expected):
+    assert next_after(expression, start) == expected
+
+
+def test_day_or_weekday():
+    # Wie cron: sind Tag und Wochentag eingeschränkt, genügt einer von beiden
+    start = datetime.datetime(2026, 3, 9, 12, 0)
+    assert next_after("0 0 12 * 5", start) == datetime.datetime(2026, 3, 12, 0, 0)
+    assert next_after("0 0 12 * 5", datetime.datetime(2026, 3, 12, 0, 0)) == datetime.datetime(2026, 3, 13, 0, 0)
+    assert next_after("0 0 13 * 5", start) == datetime.datetime(2026, 3, 13, 0, 0)
+
+
+@pytest.mark.parametrize("expression", ["* * * *", "60 * * * *", "* 24 * * *", "0 0 0 * *", "*/0 * * * *",
+                                        "5-1 * * * *", "x * * * *"])
+def test_invalid_expression(expression):
+    with pytest.raises(ValueError):
+        CronSchedule(expression)
+
+
+def test_never_matches():
+    with pytest.raises(ValueError):
+        CronSchedule("0 0 31 2 *").next_after(datetime.datetime(2026, 3, 9).timestamp())
+
+
+def test_run_watches_every_job(tmp_path):
+    jobs = []
+    for name in ("eins", "zwei"):
+        (tmp_path / name).mkdir()
+        (tmp_path / name / "datei.txt").write_text(name)
+        (tmp_path / f"{name}-backup").mkdir()
+        jobs.append({"name": name, "source_dir": str(tmp_path / name),
+                     "backup_dir": str(tmp_path / f"{name}-backup"), "watch_mode": True})
+    config = BackupConfig(jobs=jobs, scrub_period=0, watch_debounce=0.1)
+    scheduler = Scheduler(build_jobs(config, log=lambda message: None))
+    thread = threading.Thread(target=scheduler.run, daemon=True)
+    thread.start()
+    try:
+        # Beide Jobs sichern zuerst vollständig und reagieren dann auf Änderungen
+        (tmp_path / "zwei" / "neu.txt").write_text("neu")
+        deadline = time.time() + 10
+        while time.time() < deadline and not (
+                (tmp_path / "eins-backup" / "datei.txt").exists() and (tmp_path / "zwei-backup" / "neu.txt").exists()):
+            time.sleep(0.05)
+    finally:
+        scheduler.stop()
+        thread.join(10)
+    assert not thread.is_alive()
+    assert (tmp_path / "eins-backup" / "datei.txt").read_text() == "eins"
+    assert (tmp_path / "zwei-backup" / "neu.txt").read_text() == "neu"
@@ -0,0 +1,37 @@
+"""Snapshots: unveränderte Dateien werden per Hardlink aus dem vorherigen Snapshot übernommen."""
+import os
+
+from autobackup.config import BackupConfig
+from autobackup.engine import BackupEngine
+from autobackup.snapshots import SnapshotStore
+
+
+def test_unchanged_files_are_hardlinked(tmp_path):
+    src = tmp_path / "src"
+    (src / "sub").mkdir(parents=True)
+    (src / "bleibt.txt").write_bytes(b"unveraendert")
+    (src / "sub" / "aendert.txt").write_bytes(b"alt")
+    (src / "weg.txt").write_bytes(b"wird geloescht")
+    (tmp_path / "dst").mkdir()
+    config = BackupConfig(source_dir=str(src), backup_dir=str(tmp_path / "dst"), backup_format="snapshots",
+                          scrub_period=0)
+    engine = BackupEngine(config, log=lambda message: None)
+    engine.run_once()
+
+    (src / "sub" / "aendert.txt").write_bytes(b"neuer Inhalt")
+    os.remove(src / "weg.txt")
+    engine.run_once()
+
+    store = SnapshotStore(str(tmp_path / "dst"))
+    old, new = (store.path(name) for name in store.list_snapshots())
+    st_old = os.stat(os.path.join(old, "bleibt.txt"))
+    st_new = os.stat(os.path.join(new, "bleibt.txt"))
+    assert st_new.st_ino == st_old.st_ino and st_new.st_nlink > 1
+    # Geänderte Dateien sind eigene Kopien, der alte Stand bleibt im alten Snapshot
+    assert os.stat(os.path.join(new, "sub", "aendert.txt")).st_nlink == 1
+    with open(os.path.join(new, "sub", "aendert.txt"), "rb") as f:
+        assert f.read() == b"neuer Inhalt"
+    with open(os.path.join(old, "sub", "aendert.txt"), "rb") as f:
+        assert f.read() == b"alt"
+    assert os.path.exists(os.path.join(old, "weg.txt"))
+    assert not os.path.exists(os.path.join(new, "weg.txt"))
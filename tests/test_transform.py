@@ -0,0 +1,84 @@
+"""Kompression und Verschlüsselung: Rundlauf und Erkennung veränderter Daten."""
+import os
+import zlib
+
+import pytest
+
+from autobackup.transform import MAGIC, SEGMENT_SIZE, Transform
+
+pytest.importorskip("cryptography")
+
+ENCRYPTED = {"encrypted": True}
+
+
+@pytest.fixture(scope="module")
+def transform():
+    return Transform("zlib", passphrase="geheim")
+
+
+@pytest.mark.parametrize("size", [0, 1, SEGMENT_SIZE - 1, SEGMENT_SIZE, 2 * SEGMENT_SIZE + 17])
+def test_roundtrip(transform, size):
+    data = os.urandom(size)
+    encoded = transform.encode(data, ENCRYPTED)
+    assert encoded.startswith(MAGIC)
+    assert transform.decode(encoded, ENCRYPTED) == data
+
+
+def test_compressed_roundtrip(transform):
+    data = b"Backup " * 100000
+    encoding = transform.encoding_for("notiz.txt")
+    assert encoding == {"compression": "zlib", "encrypted": True}
+    encoded = transform.encode(data, encoding)
+    assert len(encoded) < len(data) // 10
+    assert transform.decode(encoded, encoding) == data
+    assert transform.encoding_for("foto.jpg") == ENCRYPTED
+
+
+def test_blocks_roundtrip(transform):
+    blocks = [os.urandom(300000) for _ in range(8)]
+    encoded = b"".join(transform.encode_blocks(blocks, ENCRYPTED))
+    assert transform.decode(encoded, ENCRYPTED) == b"".join(blocks)
+
+
+@pytest.mark.parametrize("offset", [len(MAGIC) + 20, 100, -1])
+def test_tampered(transform, offset):
+    encoded = bytearray(transform.encode(os.urandom(SEGMENT_SIZE + 1000), ENCRYPTED))
+    encoded[offset] ^= 1
+    with pytest.raises(ValueError):
+        transform.decode(bytes(encoded), ENCRYPTED)
+
+
+def test_truncated(transform):
+    data = os.urandom(2 * SEGMENT_SIZE + 1000)
+    encoded = transform.encode(data, ENCRYPTED)
+    # Abgeschnitten nach vollständigen Segmenten oder mitten in einem
+    for length in (len(encoded) - 1, len(encoded) // 2, len(MAGIC) + 10):
+        with pytest.raises(ValueError):
+            transform.decode(encoded[:length], ENCRYPTED)
+    with pytest.raises(ValueError):
+        transform.decode(encoded + b"x", ENCRYPTED)
+
+
+def test_wrong_key(transform):
+    encoded = transform.encode(b"vertraulich", ENCRYPTED)
+    with pytest.raises(ValueError):
+        Transform(passphrase="falsch").decode(encoded, ENCRYPTED)
+    with pytest.raises(ValueError):
+        Transform().decode(encoded, ENCRYPTED)
+
+
+def test_keyed_hash(transform):
+    plain = transform.hasher()
+    keyed = transform.hasher(transform.salt)
+    other = Transform(passphrase="falsch").hasher(transform.salt)
+    for h in (plain, keyed, other):
+        h.update(b"Inhalt")
+    assert len({plain.hexdigest(), keyed.hexdigest(), other.hexdigest()}) == 3
+
+
+def test_corrupt_compression():
+    transform = Transform("zlib")
+    encoding = {"compression": "zlib"}
+    encoded = transform.encode(b"Backup " * 1000, encoding)
+    with pytest.raises((ValueError, zlib.error)):
+        transform.decode(encoded[:len(encoded) // 2], encoding)
@@ -0,0 +1,121 @@
+"""Prüfung und Scrubbing; im Format packs wird jede Datei abgerufen, dekodiert und gegen den Manifest-Hash geprüft."""
+import glob
+import os
+import threading
+
+import pytest
+
+from autobackup.config import BackupConfig
+from autobackup.engine import BackupEngine
+from autobackup.s3fake import FakeS3Server
+from autobackup.verify import CHANGED, CORRUPT, MISSING, OK, ChecksumDB, Verifier
+
+
+def make_source(root):
+    src = os.path.join(root, "src")
+    os.makedirs(os.path.join(src, "sub"))
+    for i in range(10):
+        with open(os.path.join(src, "sub", f"f{i}.txt"), "wb") as f:
+            f.write(os.urandom(200) * (i + 1))
+    with open(os.path.join(src, "big.bin"), "wb") as f:
+        f.write(os.urandom(2 * 1024 * 1024))
+    return src
+
+
+def pack_config(tmp_path, **values):
+    pytest.importorskip("cryptography")
+    key_file = tmp_path / "key"
+    key_file.write_text("geheim")
+    dest = tmp_path / "dst"
+    dest.mkdir()
+    return BackupConfig(source_dir=make_source(str(tmp_path)), backup_dir=str(dest), backup_format="packs",
+                        compression="zlib", encryption_key_file=str(key_file), scrub_period=0, copy_workers=2,
+                        **values)
+
+
+def backup_and_verify(config, compare_source=False):
+    BackupEngine(config, log=lambda message: None).run_once()
+    return Verifier(config, log=lambda message: None).verify(compare_source)
+
+
+def flip_byte(path, offset):
+    with open(path, "r+b") as f:
+        f.seek(offset)
+        value = f.read(1)[0]
+        f.seek(offset)
+        f.write(bytes([value ^ 1]))
+
+
+def test_verify_packs(tmp_path):
+    config = pack_config(tmp_path)
+    counts = backup_and_verify(config, compare_source=True)
+    assert counts[OK] == 11 and sum(counts.values()) == 11
+
+    with open(os.path.join(config.source_dir, "sub", "f3.txt"), "ab") as f:
+        f.write(b"neu")
+    flip_byte(glob.glob(os.path.join(config.backup_dir, "packs", "*.pack"))[0], 100)
+    verifier = Verifier(config, log=lambda message: None)
+    counts = verifier.verify(compare_source=True)
+    assert counts[CORRUPT] == 1 and counts[CHANGED] == 1
+
+    os.remove(glob.glob(os.path.join(config.backup_dir, "objects", "*"))[0])
+    counts = verifier.verify(compare_source=False)
+    assert counts[MISSING] == 1 and counts[CORRUPT] == 1 and counts[OK] == 9
+
+
+def test_verify_packs_s3(tmp_path):
+    server = FakeS3Server(access_key="test", secret_key="geheim")
+    try:
+        config = pack_config(tmp_path, storage="s3://bucket/backup", s3_endpoint=server.endpoint,
+                             s3_access_key="test", s3_secret_key="geheim")
+        assert backup_and_verify(config)[OK] == 11
+
+        objects = [key for key in server.store.objects if key[1].startswith("backup/objects/")]
+        del server.store.objects[objects[0]]
+        counts = Verifier(config, log=lambda message: None).verify(compare_source=False)
+        assert counts[MISSING] == 1 and counts[OK] == 10
+    finally:
+        server.close()
+
+
+def test_scrub_runs_in_background(tmp_path, monkeypatch):
+    src = make_source(str(tmp_path))
+    (tmp_path / "dst").mkdir()
+    config = BackupConfig(source_dir=src, backup_dir=str(tmp_path / "dst"), scrub_period=1)
+    started = threading.Event()
+    release = threading.Event()
+    check = Verifier.check
+
+    def slow_check(self, *args):
+        started.set()
+        release.wait(10)
+        return check(self, *args)
+
+    monkeypatch.setattr(Verifier, "check", slow_check)
+    engine = BackupEngine(config, log=lambda message: None)
+    engine.run_once()
+    # run_once ist zurück, während das Scrubbing noch läuft
+    assert started.wait(10)
+    assert engine.scrub_thread.is_alive()
+    release.set()
+    engine.wait_scrub()
+    db = ChecksumDB(config.backup_dir)
+    try:
+        assert db.conn.execute("SELECT COUNT(*) FROM checksums WHERE verified_at > 0").fetchone()[0] == 11
+        assert db.get_meta("scrubbed_at") is not None
+    finally:
+        db.close()
+
+
+def test_scrub_cancelled_between_files(tmp_path):
+    src = make_source(str(tmp_path))
+    (tmp_path / "dst").mkdir()
+    config = BackupConfig(source_dir=src, backup_dir=str(tmp_path / "dst"), scrub_period=0)
+    BackupEngine(config, log=lambda message: None).run_once()
+    verifier = Verifier(config, log=lambda message: None, cancelled=lambda: True)
+    assert sum(verifier.scrub(1).values()) == 0
+    db = ChecksumDB(config.backup_dir)
+    try:
+        assert db.get_meta("scrubbed_at") is None
+    finally:
+        db.close()